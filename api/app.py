@@ -9,12 +9,13 @@ from flask import Flask
 from flask_cors import CORS
 from elasticsearch import Elasticsearch
 
-from config import ES_PASSWORD, ES_HOST, API_HOST, API_PORT, API_DEBUG
+from config import ES_PASSWORD, ES_HOST, API_HOST, API_PORT, API_DEBUG, CONTENT_STORE_DIR
 from search.bm25_searcher import BM25Searcher
 from search.dense_searcher import DenseSearcher
 from search.dense_reranker import Reranker
 from search.bm25_reranker import BM25Reranker
 from rag.rag_service import RAGService
+from storage.content_store import ContentStore
 from api.routes import register_routes
 
 
@@ -32,6 +33,11 @@ def create_app():
         verify_certs=False
     )
 
+    # Local case-text store (optional; ES is used when it has not been built)
+    content_store = ContentStore.open_if_exists(CONTENT_STORE_DIR)
+    if content_store is not None:
+        print(f"Serving case text from content store ({len(content_store)} documents)")
+
     # Lazy-loaded searchers (initialized on first use)
     searchers = {
         'bm25': None,
@@ -67,11 +73,12 @@ def create_app():
     def get_rag_service():
         if searchers['rag'] is None:
             print("Loading RAG service (first time)...")
-            searchers['rag'] = RAGService(es_client=es)
+            searchers['rag'] = RAGService(es_client=es, content_store=content_store)
         return searchers['rag']
 
     # Register routes
-    register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker, get_bm25_reranker, get_rag_service)
+    register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker, get_bm25_reranker, get_rag_service,
+                    content_store=content_store)
 
     return app
 
@@ -84,6 +91,12 @@ def run_app():
     print("\nEndpoints:")
     print("  GET  /cases?query=<text>&method=<bm25|dense|dense_rerank|bm25_rerank>&size=10&page=1")
     print("       - Get ranking list with specified method")
+    print("  POST /cases/batch")
+    print("       - Run many searches in one request (single ES msearch)")
+    print("  GET  /cases/snippets?query=<text>&ids=<id1,id2,...>")
+    print("       - BM25 highlight snippets for the listed cases")
+    print("  GET  /cases/export?query=<text>&fields=id,name,...")
+    print("       - Stream the full BM25 result set as NDJSON")
     print("  GET  /cases/<doc_id>?index=<bm25|dense>")
     print("       - Get case full details")
     print("  POST /ask")
@@ -0,0 +1,110 @@
+"""
+Response helpers: fast JSON serialization, compression and ETags
+"""
+import gzip
+import json
+import hashlib
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+
+def dumps(payload):
+    """
+    Serialize to JSON bytes, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(*parts):
+    """
+    Strong ETag value from the given parts (e.g. case id + index generation)
+    """
+    return hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def etag_matches(request, etag):
+    """
+    True if the request's If-None-Match covers etag in any content encoding
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        # Encoded variants carry a suffix, e.g. <etag>-gzip
+        if candidate.split("-")[0] == etag:
+            return True
+    return False
+
+
+def choose_encoding(request):
+    """
+    Pick the best content encoding the client accepts: br, gzip or none
+    """
+    accepted = request.headers.get("Accept-Encoding", "").lower()
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def not_modified_response(etag, max_age):
+    """
+    304 response for a matching If-None-Match
+    """
+    response = Response(status=304)
+    response.headers["ETag"] = f'"{etag}"'
+    response.headers["Cache-Control"] = f"private, max-age={max_age}"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def cached_json_response(request, payload, etag, max_age, status=200):
+    """
+    JSON response compressed for the client, with ETag and caching headers
+
+    Args:
+        request: Flask request (for Accept-Encoding)
+        payload: JSON-serializable object
+        etag: ETag value from make_etag
+        max_age: Cache-Control max-age in seconds
+        status: HTTP status code
+    """
+    body = dumps(payload)
+    encoding = choose_encoding(request) if len(body) >= MIN_COMPRESS_BYTES else None
+
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+
+    response = Response(body, status=status, mimetype="application/json")
+    # Each encoding is a different representation, so it gets its own strong ETag
+    response.headers["ETag"] = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+    response.headers["Cache-Control"] = f"private, max-age={max_age}"
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
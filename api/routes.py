@@ -2,10 +2,20 @@
 API Routes for Legal Case Search
 """
 from flask import request, jsonify
-from config import ES_INDEX_BM25, ES_INDEX_DENSE, TOP_K_RERANK
+from elasticsearch import NotFoundError
+from config import (
+    ES_INDEX_BM25, ES_INDEX_DENSE, TOP_K_RERANK, BATCH_MAX_QUERIES, DETAIL_CACHE_MAX_AGE,
+    DETAIL_CHUNK_CHARS, DETAIL_MAX_CHUNK_CHARS,
+)
 from cache.redis import SearchCache 
-
-def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker, get_bm25_reranker, get_rag_service=None):
+from cache.index_generation import IndexGeneration, VectorStoreGeneration
+from api.responses import make_etag, etag_matches, not_modified_response, cached_json_response
+from api.text_ranges import build_toc, char_range, paragraph_range, range_info
+from search.batch_searcher import BatchSearcher
+from search.bm25_searcher import EXPORT_FIELDS, CursorExpiredError
+
+def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker, get_bm25_reranker, get_rag_service=None,
+                    content_store=None):
     """
     Register all API routes
 
@@ -17,8 +27,10 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
         get_reranker: Function to get reranker
         get_bm25_reranker: Function to get BM25 reranker
         get_rag_service: Function to get RAG service (optional)
+        content_store: ContentStore for case text (optional, ES otherwise)
     """
-    cache = SearchCache()
+    index_generation = IndexGeneration(es)
+    cache = SearchCache(index_generation, VectorStoreGeneration())
     @app.route('/cases', methods=['GET'])
     def get_cases():
         """
@@ -29,15 +41,25 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
             method: retrieval method - 'bm25', 'dense', or 'dense_rerank' (default: 'bm25')
             size: number of results (default 10)
             page: page number starting from 1 (default 1)
+            paginate: 'cursor' to page BM25 with point-in-time + search_after
+                      instead of page numbers (response carries 'next_cursor')
+            cursor: next_cursor from the previous BM25 response, with the same
+                    query and filters (400 otherwise); 410 once it has been
+                    idle longer than CURSOR_KEEP_ALIVE
+            highlight: 'true' to include BM25 snippets inline (default: fetch
+                       them separately from /cases/snippets)
 
         Examples:
             GET /cases?query=murder&method=bm25&size=10&page=1
+            GET /cases?query=murder&method=bm25&size=10&paginate=cursor
+            GET /cases?query=murder&method=bm25&size=10&cursor=<next_cursor>
             GET /cases?query=contract&method=dense&size=10
             GET /cases?query=contract&method=dense_rerank&size=10
 
         Response:
         {
             "total": 150,
+            "total_relation": "eq",  // BM25 only; "gte" when total hit the counting cap
             "page": 1,
             "size": 10,
             "method": "bm25",
@@ -81,6 +103,9 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
                     court_name=court_name,
                     start_date=start_date,
                     end_date=end_date,
+                    use_cursor=request.args.get("paginate") == "cursor",
+                    cursor=request.args.get("cursor") or None,
+                    highlight=request.args.get("highlight") == "true",
                 )
                 results["page"] = page
                 results["size"] = size
@@ -89,7 +114,14 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
             elif method == "dense":
                 searcher = get_dense_searcher()
                 from_ = (page - 1) * size
-                results = searcher.search(query_text, size=size, from_=from_)
+                results = searcher.search(
+                    query_text,
+                    size=size,
+                    from_=from_,
+                    court_name=court_name,
+                    start_date=start_date,
+                    end_date=end_date,
+                )
                 results["page"] = page
                 results["size"] = size
                 results["method"] = "dense"
@@ -106,9 +138,11 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
                 start = (page - 1) * size
                 end = start + size
 
+                # Snippets only for the returned page, like the dense path
+                page_results = [dict(result) for result in all_results["results"][start:end]]
                 results = {
                     "total": all_results["total"],
-                    "results": all_results["results"][start:end],
+                    "results": get_reranker().add_snippets(query_text, page_results),
                     "page": page,
                     "size": size,
                     "method": "dense_rerank"
@@ -126,9 +160,10 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
                 start = (page - 1) * size
                 end = start + size
 
+                page_results = [dict(result) for result in all_results["results"][start:end]]
                 results = {
                     "total": all_results["total"],
-                    "results": all_results["results"][start:end],
+                    "results": get_bm25_reranker().add_snippets(query_text, page_results),
                     "page": page,
                     "size": size,
                     "method": "bm25_rerank"
@@ -136,10 +171,244 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
 
             return jsonify(results), 200
 
+        except CursorExpiredError as e:
+            return jsonify({"error": str(e)}), 410
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
+    @app.route('/cases/batch', methods=['POST'])
+    def get_cases_batch():
+        """
+        Run many searches in one request. BM25 and dense queries go out as a
+        single ES msearch, query encodings run as one batched call and
+        reranks share cross-encoder batches.
+
+        Request body (JSON):
+        {
+            "queries": [
+                {"query": "murder", "method": "bm25", "size": 10, "page": 1,
+                 "court": "...", "start_date": "...", "end_date": "..."},
+                {"query": "contract", "method": "dense_rerank"}
+            ]
+        }
+
+        Response:
+        {
+            "results": [
+                {"total": 150, "page": 1, "size": 10, "method": "bm25", "results": [...]},
+                {"error": "..."}
+            ]
+        }
+        Results come back in request order. Per-query failures are
+        reported in place without failing the whole batch.
+        """
+        try:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict) or not isinstance(data.get("queries"), list):
+                return jsonify({"error": "queries field is required in request body"}), 400
+
+            raw_queries = data["queries"]
+            if len(raw_queries) > BATCH_MAX_QUERIES:
+                return jsonify({"error": f"at most {BATCH_MAX_QUERIES} queries per batch"}), 400
+
+            items = []
+            for entry in raw_queries:
+                if not isinstance(entry, dict):
+                    return jsonify({"error": "every query must be an object"}), 400
+                if any(not isinstance(entry.get(field) or "", str)
+                       for field in ("query", "method", "court", "start_date", "end_date")):
+                    return jsonify({"error": "query, method, court, start_date and end_date must be strings"}), 400
+                try:
+                    size = int(entry.get("size", 10))
+                    page = int(entry.get("page", 1))
+                except (TypeError, ValueError):
+                    return jsonify({"error": "size and page must be integers"}), 400
+
+                query_text = (entry.get("query") or "").strip()
+                method = (entry.get("method") or "bm25").lower()
+
+                if not query_text:
+                    return jsonify({"error": "every query needs a query field"}), 400
+
+                if method not in ["bm25", "dense", "dense_rerank", "bm25_rerank"]:
+                    return jsonify({"error": "method must be 'bm25', 'dense', 'dense_rerank', or 'bm25_rerank'"}), 400
+
+                items.append({
+                    "query": query_text,
+                    "method": method,
+                    "size": size,
+                    "page": page,
+                    "from_": (page - 1) * size,
+                    "court_name": (entry.get("court") or "").strip() or None,
+                    "start_date": entry.get("start_date") or None,
+                    "end_date": entry.get("end_date") or None,
+                })
+
+            # Rerank lists are cached per (query, method); only misses are searched
+            outputs = [None] * len(items)
+            pending = []
+            for pos, item in enumerate(items):
+                if item["method"] in ("dense_rerank", "bm25_rerank"):
+                    cached = cache.get(item["query"], item["method"])
+                    if cached:
+                        outputs[pos] = cached
+                        continue
+                pending.append(pos)
+
+            if pending:
+                methods = {items[pos]["method"] for pos in pending}
+                batcher = BatchSearcher(
+                    es,
+                    bm25_searcher=get_bm25_searcher() if "bm25" in methods else None,
+                    dense_searcher=get_dense_searcher() if "dense" in methods else None,
+                    reranker=get_reranker() if "dense_rerank" in methods else None,
+                    bm25_reranker=get_bm25_reranker() if "bm25_rerank" in methods else None,
+                )
+                searched = batcher.search([items[pos] for pos in pending], top_k=TOP_K_RERANK)
+
+                for pos, result in zip(pending, searched):
+                    item = items[pos]
+                    if item["method"] in ("dense_rerank", "bm25_rerank") and "error" not in result:
+                        cache.set(item["query"], item["method"], result)
+                    outputs[pos] = result
+
+            results = []
+            for item, output in zip(items, outputs):
+                if "error" in output:
+                    results.append(output)
+                    continue
+
+                if item["method"] in ("dense_rerank", "bm25_rerank"):
+                    start = item["from_"]
+                    ranker = get_reranker() if item["method"] == "dense_rerank" else get_bm25_reranker()
+                    page_results = [dict(result) for result in output["results"][start:start + item["size"]]]
+                    output = {
+                        "total": output["total"],
+                        "results": ranker.add_snippets(item["query"], page_results),
+                    }
+
+                output["page"] = item["page"]
+                output["size"] = item["size"]
+                output["method"] = item["method"]
+                results.append(output)
+
+            return jsonify({"results": results}), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
+    @app.route('/cases/snippets', methods=['GET'])
+    def get_snippets():
+        """
+        Get BM25 highlight snippets for the cases currently on screen
+
+        Query params:
+            query: search text the cases were retrieved with (required)
+            ids: comma-separated case ids (required, max 100)
+
+        Example: GET /cases/snippets?query=murder&ids=12121253,12121254
+
+        Response:
+        {
+            "snippets": {"12121253": "... <mark>murder</mark> ...", "12121254": null}
+        }
+        """
+        try:
+            query_text = request.args.get("query", "")
+            doc_ids = [i.strip() for i in request.args.get("ids", "").split(",") if i.strip()]
+
+            if not query_text or not doc_ids:
+                return jsonify({"error": "query and ids parameters are required"}), 400
+
+            if len(doc_ids) > 100:
+                return jsonify({"error": "at most 100 ids per request"}), 400
+
+            searcher = get_bm25_searcher()
+            return jsonify({"snippets": searcher.get_snippets(query_text, doc_ids)}), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
+    @app.route('/cases/export', methods=['GET'])
+    def export_cases():
+        """
+        Stream the full BM25 result set as NDJSON (one case per line)
+
+        Uses point-in-time + search_after, so memory stays constant and each
+        ES page is fetched only after the client has consumed the previous one.
+
+        Query params:
+            query: search text (required)
+            fields: comma-separated list of fields (default: listing fields)
+            court, start_date, end_date: same filters as /cases
+            limit: optional maximum number of cases
+
+        Example:
+            GET /cases/export?query=negligence&fields=id,name,decision_date
+        """
+        import json
+
+        try:
+            query_text = request.args.get("query", "")
+            court_name = request.args.get("court", "").strip() or None
+            start_date = request.args.get("start_date") or None
+            end_date = request.args.get("end_date") or None
+            limit = request.args.get("limit")
+            limit = int(limit) if limit else None
+
+            if not query_text:
+                return jsonify({"error": "query parameter is required"}), 400
+
+            fields = None
+            if request.args.get("fields"):
+                fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+                unknown = [f for f in fields if f not in EXPORT_FIELDS]
+                if unknown:
+                    return jsonify({
+                        "error": f"unknown fields: {', '.join(unknown)}",
+                        "allowed": EXPORT_FIELDS
+                    }), 400
+
+            searcher = get_bm25_searcher()
+
+            def generate():
+                for doc in searcher.iter_hits(
+                    query_text,
+                    fields=fields,
+                    court_name=court_name,
+                    start_date=start_date,
+                    end_date=end_date,
+                    limit=limit,
+                ):
+                    yield json.dumps(doc) + "\n"
+
+            return app.response_class(
+                generate(),
+                mimetype='application/x-ndjson',
+                headers={
+                    'Cache-Control': 'no-cache',
+                    'X-Accel-Buffering': 'no'
+                }
+            )
+
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
+    def parse_int_arg(name, default):
+        value = request.args.get(name)
+        if value is None or value == "":
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"'{name}' must be an integer")
+
     @app.route('/cases/<doc_id>', methods=['GET'])
     def get_case_detail(doc_id):
         """
@@ -147,8 +416,19 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
 
         Query params:
             index: which index to search - 'bm25' or 'dense' (default: 'bm25')
+            chunk: 'true' to return only the first chunk of full_text
+                   (DETAIL_CHUNK_CHARS characters, ending on a paragraph
+                   break); fetch the rest from /cases/<doc_id>/text
+            chunk_chars: first chunk size, implies chunk=true
 
         Example: GET /cases/12121253?index=bm25
+                 GET /cases/12121253?chunk=true
+
+        The response is compressed (br/gzip) and carries a strong ETag built
+        from the case id, the requested range and the index generation; a
+        matching If-None-Match gets a 304 without waiting on Elasticsearch
+        (only the first request after startup reads the generation from ES,
+        later refreshes run in the background).
 
         Response:
         {
@@ -160,30 +440,141 @@ def register_routes(app, es, get_bm25_searcher, get_dense_searcher, get_reranker
             "parties": "Pennsylvania, Susanna M'Kee",
             "judges": "Judge Smith",
             "word_count": 3462,
-            "full_text": "..."
+            "full_text": "...",  // first chunk only when chunked
+            "toc": [
+                {"type": "head_matter", "author": null, "start": 0, "end": 812},
+                {"type": "majority", "author": "Smith, J.", "start": 813, "end": 20950}
+            ],
+            "text_range": {"start": 0, "end": 20000, "total_chars": 20950, "next_start": 20000}
         }
         """
         try:
             index_type = request.args.get("index", "bm25").lower()
             index_name = ES_INDEX_BM25 if index_type == "bm25" else ES_INDEX_DENSE
 
-            response = es.search(
-                index=index_name,
-                body={
-                    "query": {"term": {"id": doc_id}},
-                    "size": 1
-                }
-            )
-
-            if response["hits"]["total"]["value"] == 0:
+            chunk_chars = parse_int_arg("chunk_chars", None)
+            if chunk_chars is None and request.args.get("chunk", "false").lower() == "true":
+                chunk_chars = DETAIL_CHUNK_CHARS
+            if chunk_chars is not None and not 0 < chunk_chars <= DETAIL_MAX_CHUNK_CHARS:
+                return jsonify({"error": f"chunk_chars must be between 1 and {DETAIL_MAX_CHUNK_CHARS}"}), 400
+
+            # Generation lookups are cached in process and refreshed in the
+            # background, so revalidation does not wait on ES
+            etag = make_etag(doc_id, index_type, chunk_chars or "full", index_generation.get(index_name))
+            if etag_matches(request, etag):
+                return not_modified_response(etag, DETAIL_CACHE_MAX_AGE)
+
+            # Text comes from the local store when available, so ES only
+            # returns the metadata
+            content = content_store.get(doc_id) if content_store is not None else None
+            source_excludes = ["dense_vector", "rerank_text"]
+            if content is not None:
+                source_excludes.extend(["full_text", "sections"])
+
+            # Indices are keyed by case id: realtime GET, no query phase
+            try:
+                response = es.get(index=index_name, id=doc_id, source_excludes=source_excludes)
+            except NotFoundError:
                 return jsonify({"error": "Case not found"}), 404
 
-            doc = response["hits"]["hits"][0]["_source"]
-            if "dense_vector" in doc:
-                del doc["dense_vector"]
+            doc = response["_source"]
+            if content is not None:
+                doc["full_text"] = content["full_text"]
+                doc["sections"] = content["sections"]
 
-            return jsonify(doc), 200
+            full_text = doc.get("full_text") or ""
+            doc["toc"] = build_toc(doc.pop("sections", None), len(full_text))
+            start, end = char_range(full_text, 0, chunk_chars) if chunk_chars else (0, len(full_text))
+            doc["full_text"] = full_text[start:end]
+            doc["text_range"] = range_info(start, end, len(full_text))
+
+            return cached_json_response(request, doc, etag, DETAIL_CACHE_MAX_AGE)
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
+    @app.route('/cases/<doc_id>/text', methods=['GET'])
+    def get_case_text(doc_id):
+        """
+        Get a range of a case's full_text
+
+        Query params (character range):
+            start: first character (default 0)
+            length: number of characters (default DETAIL_CHUNK_CHARS); the
+                    range is snapped to a paragraph break
+
+        Query params (paragraph range, used when 'paragraph' is given):
+            paragraph: first paragraph, 0-based (paragraphs are lines of full_text)
+            paragraphs: number of paragraphs (default 50)
+
+            index: 'bm25' or 'dense' (default: 'bm25')
+
+        Examples:
+            GET /cases/12121253/text?start=20000&length=20000
+            GET /cases/12121253/text?paragraph=100&paragraphs=50
+
+        Response:
+        {
+            "id": "12121253",
+            "text": "...",
+            "start": 20000,
+            "end": 40112,
+            "total_chars": 95310,
+            "next_start": 40112,  // null at the end of the text
+            "paragraph": 100,  // paragraph ranges only
+            "next_paragraph": 150,
+            "total_paragraphs": 612
+        }
+        """
+        try:
+            index_type = request.args.get("index", "bm25").lower()
+            index_name = ES_INDEX_BM25 if index_type == "bm25" else ES_INDEX_DENSE
 
+            paragraph = parse_int_arg("paragraph", None)
+            if paragraph is not None:
+                count = parse_int_arg("paragraphs", 50)
+                range_key = ("paragraph", paragraph, count)
+            else:
+                start = parse_int_arg("start", 0)
+                length = parse_int_arg("length", DETAIL_CHUNK_CHARS)
+                range_key = ("chars", start, length)
+            if range_key[1] < 0 or not 0 < range_key[2] <= DETAIL_MAX_CHUNK_CHARS:
+                return jsonify({"error": "invalid range"}), 400
+
+            etag = make_etag(doc_id, index_type, *range_key, index_generation.get(index_name))
+            if etag_matches(request, etag):
+                return not_modified_response(etag, DETAIL_CACHE_MAX_AGE)
+
+            full_text = content_store.get_text(doc_id) if content_store is not None else None
+            if full_text is None:
+                try:
+                    response = es.get(index=index_name, id=doc_id, source_includes=["full_text"])
+                except NotFoundError:
+                    return jsonify({"error": "Case not found"}), 404
+                full_text = response["_source"].get("full_text") or ""
+
+            payload = {"id": doc_id}
+            if paragraph is not None:
+                start, end, total_paragraphs = paragraph_range(full_text, paragraph, count)
+                next_paragraph = paragraph + count
+                payload.update({
+                    "paragraph": paragraph,
+                    "next_paragraph": next_paragraph if next_paragraph < total_paragraphs else None,
+                    "total_paragraphs": total_paragraphs,
+                })
+            else:
+                start, end = char_range(full_text, start, length)
+
+            payload["text"] = full_text[start:end]
+            payload.update(range_info(start, end, len(full_text)))
+
+            return cached_json_response(request, payload, etag, DETAIL_CACHE_MAX_AGE)
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
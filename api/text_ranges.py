@@ -0,0 +1,102 @@
+"""
+Ranged access to case full_text: table of contents, character and paragraph ranges
+"""
+import re
+
+# A character range is stretched (or shrunk) by up to this many characters
+# so it ends on a paragraph break instead of mid-sentence
+PARAGRAPH_SNAP_CHARS = 2000
+
+PARAGRAPH_BREAK_RE = re.compile(r"\n")
+
+
+def build_toc(sections, total_chars):
+    """
+    Table of contents for a case's full_text
+
+    Args:
+        sections: Section offsets stored at index time (may be empty)
+        total_chars: Length of full_text
+
+    Returns:
+        List of {"type", "author", "start", "end"}; a single 'full_text'
+        entry when the case was indexed without sections
+    """
+    toc = [
+        {
+            "type": section.get("type"),
+            "author": section.get("author"),
+            "start": min(int(section["start"]), total_chars),
+            "end": min(int(section["end"]), total_chars),
+        }
+        for section in sections or []
+    ]
+    if not toc:
+        toc = [{"type": "full_text", "author": None, "start": 0, "end": total_chars}]
+    return toc
+
+
+def char_range(text, start, length):
+    """
+    Bounds of a character range, snapped to the nearest paragraph break
+
+    Args:
+        text: full_text
+        start: First character (clamped to the text)
+        length: Requested number of characters
+
+    Returns:
+        (start, end) offsets
+    """
+    total = len(text)
+    start = max(0, min(start, total))
+    end = min(total, start + max(length, 0))
+    if end >= total:
+        return start, total
+
+    # Prefer finishing the paragraph, else cut back to the last break
+    forward = text.find("\n", end, end + PARAGRAPH_SNAP_CHARS)
+    if forward != -1:
+        return start, forward + 1
+    backward = text.rfind("\n", max(start, end - PARAGRAPH_SNAP_CHARS), end)
+    if backward != -1:
+        return start, backward + 1
+    return start, end
+
+
+def paragraph_range(text, first, count):
+    """
+    Bounds of `count` paragraphs starting at paragraph index `first`
+
+    Args:
+        text: full_text
+        first: Index of the first paragraph (0-based)
+        count: Number of paragraphs
+
+    Returns:
+        (start, end, total_paragraphs)
+    """
+    starts = [0] + [match.end() for match in PARAGRAPH_BREAK_RE.finditer(text)]
+    # A trailing newline does not open another paragraph
+    if len(starts) > 1 and starts[-1] == len(text):
+        starts.pop()
+
+    total_paragraphs = len(starts)
+    first = max(0, min(first, total_paragraphs))
+    last = min(total_paragraphs, first + max(count, 0))
+
+    start = starts[first] if first < total_paragraphs else len(text)
+    end = starts[last] if last < total_paragraphs else len(text)
+    return start, end, total_paragraphs
+
+
+def range_info(start, end, total_chars):
+    """
+    Range metadata returned alongside a chunk of text
+    """
+    return {
+        "start": start,
+        "end": end,
+        "total_chars": total_chars,
+        "next_start": end if end < total_chars else None,
+    }
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import threading
+
+from config import INDEX_GENERATION_TTL, VECTOR_STORE_DIR
+
+
+class IndexGeneration:
+    """
+    Identifies the current build of an index so caches can key on it.
+
+    The generation is the physical index name plus its UUID, which changes
+    whenever the index is rebuilt. Only the first lookup of an index waits
+    for Elasticsearch: after INDEX_GENERATION_TTL seconds the cached value
+    is still returned while a background thread re-reads it, so cache
+    validation (e.g. ETags) never blocks on ES, and keeps working with the
+    last known generation while ES is unreachable.
+    """
+
+    def __init__(self, es, ttl=INDEX_GENERATION_TTL):
+        self.es = es
+        self.ttl = ttl
+        self.cached = {}
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    def get(self, index_name):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.cached.get(index_name)
+            if entry and now - entry[1] >= self.ttl and index_name not in self.refreshing:
+                self.refreshing.add(index_name)
+                threading.Thread(target=self._refresh, args=(index_name,), daemon=True).start()
+        if entry:
+            return entry[0]
+        return self._fetch(index_name)
+
+    def _fetch(self, index_name):
+        now = time.monotonic()
+        settings = self.es.indices.get_settings(index=index_name, name="index.uuid")
+        # Keyed by the physical index name (also when index_name is an alias)
+        physical_name, body = sorted(settings.items())[0]
+        generation = f"{physical_name}:{body['settings']['index']['uuid']}"
+
+        with self.lock:
+            self.cached[index_name] = (generation, now)
+        return generation
+
+    def _refresh(self, index_name):
+        try:
+            self._fetch(index_name)
+        except Exception as e:
+            print(f"Warning: could not refresh the generation of {index_name}, keeping the last one: {e}")
+            with self.lock:
+                # Retry after another ttl instead of on every request
+                entry = self.cached.get(index_name)
+                if entry:
+                    self.cached[index_name] = (entry[0], time.monotonic())
+        finally:
+            with self.lock:
+                self.refreshing.discard(index_name)
+
+    def invalidate(self, index_name=None):
+        with self.lock:
+            if index_name is None:
+                self.cached.clear()
+            else:
+                self.cached.pop(index_name, None)
+
+
+class VectorStoreGeneration:
+    """
+    Identifies the current build of the local vector store (DENSE_BACKEND
+    hnsw / binary), read from its manifest without touching Elasticsearch.
+
+    The generation is the encoder model, the row count and the manifest's
+    mtime; a rebuild swaps in a new manifest, so the mtime changes with it.
+    The manifest is only re-read when its mtime moves.
+    """
+
+    def __init__(self, path=VECTOR_STORE_DIR):
+        self.path = os.path.join(path, "manifest.json")
+        self.cached = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return "no-vector-store"
+
+        with self.lock:
+            if self.cached and self.cached[1] == mtime:
+                return self.cached[0]
+
+        with open(self.path, "r") as f:
+            manifest = json.load(f)
+        generation = f"{manifest.get('model')}:{manifest.get('num_vectors')}:{mtime}"
+
+        with self.lock:
+            self.cached = (generation, mtime)
+        return generation
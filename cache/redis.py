@@ -1,19 +1,48 @@
 import hashlib
 import redis
-from config import REDIS_HOST, REDIS_PORT
+from config import REDIS_HOST, REDIS_PORT, ES_INDEX_BM25, ES_INDEX_DENSE, DENSE_BACKEND
 import json
 
+# Index each search method reads from
+METHOD_INDICES = {
+    "bm25": ES_INDEX_BM25,
+    "bm25_rerank": ES_INDEX_BM25,
+    "dense": ES_INDEX_DENSE,
+    "dense_rerank": ES_INDEX_DENSE,
+}
+
+# Methods searched in process when DENSE_BACKEND is hnsw / binary
+LOCAL_DENSE_METHODS = ("dense", "dense_rerank")
+
 class SearchCache:
-    def __init__(self):
+    def __init__(self, index_generation = None, store_generation = None):
+        """
+        Args:
+            index_generation: IndexGeneration; when given, keys include the
+                              generation of the method's index, so results
+                              cached before an alias swap are not served
+            store_generation: VectorStoreGeneration; with a local
+                              DENSE_BACKEND, dense methods are keyed on it
+                              instead (no Elasticsearch call, and a store
+                              rebuild invalidates them)
+        """
         self.redis = redis.Redis(host = REDIS_HOST, port = REDIS_PORT, decode_responses = True)
+        self.index_generation = index_generation
+        self.store_generation = store_generation
+    
+    def _key(self, query, method):
+        generation = ""
+        if self.store_generation is not None and DENSE_BACKEND != "es" and method in LOCAL_DENSE_METHODS:
+            generation = self.store_generation.get()
+        elif self.index_generation is not None and method in METHOD_INDICES:
+            generation = self.index_generation.get(METHOD_INDICES[method])
+        key = hashlib.md5(f"{query}:{method}:{generation}".encode()).hexdigest()
+        return f"search:{method}:{key}"
     
     def get(self, query, method):
-        key = hashlib.md5(f"{query}:{method}".encode()).hexdigest()
-        data = self.redis.get(f"search:{method}:{key}")
+        data = self.redis.get(self._key(query, method))
         
         return json.loads(data) if data else None
     
     def set(self, query, method, results, ttl = 900):
-        key = hashlib.md5(f"{query}:{method}".encode()).hexdigest()
-        self.redis.setex(f"search:{method}:{key}", ttl, json.dumps(results))
-        
\ No newline at end of file
+        self.redis.setex(self._key(query, method), ttl, json.dumps(results))
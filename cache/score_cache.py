@@ -0,0 +1,141 @@
+"""
+Cross-encoder score cache: an in-process LRU in front of an optional Redis
+tier (SCORE_CACHE_REDIS) shared by the API workers
+
+Keys cover everything a score depends on: the model, the query, the case id
+and a digest of the document text that was scored. A reindex or incremental
+upsert that changes a case's rerank_text therefore misses the cache instead
+of reusing the old score for up to SCORE_CACHE_TTL.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import redis
+from config import REDIS_HOST, REDIS_PORT, SCORE_CACHE_SIZE, SCORE_CACHE_REDIS, SCORE_CACHE_TTL
+
+
+class ScoreCache:
+    """
+    Cross-encoder score cache keyed by (model, query, case id, document text).
+
+    Scores are pure for a given model, query and document, so any rerank
+    (either method, any page, overlapping queries) can reuse them.
+    An in-process LRU sits in front of an optional Redis tier shared by
+    all API workers.
+    """
+
+    def __init__(self, max_entries=SCORE_CACHE_SIZE, use_redis=SCORE_CACHE_REDIS, ttl=SCORE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.redis = None
+        if use_redis:
+            self.redis = redis.Redis(
+                host=REDIS_HOST, port=REDIS_PORT, decode_responses=True,
+                socket_timeout=0.2, socket_connect_timeout=0.2
+            )
+
+    @staticmethod
+    def _key(model, query, case_id, document):
+        digest = hashlib.md5(f"{model}\x00{query}\x00{case_id}\x00{document}".encode()).hexdigest()
+        return f"score:{digest}"
+
+    def get_many(self, model, query, case_ids, documents):
+        """
+        Look up cached scores
+
+        Args:
+            model: Cross-encoder model name
+            query: Query string
+            case_ids: List of case ids (None entries are never cached)
+            documents: Document texts parallel to case_ids, as they are scored
+
+        Returns:
+            dict mapping list position -> score for every cached pair
+        """
+        keys = [
+            self._key(model, query, case_id, document) if case_id is not None else None
+            for case_id, document in zip(case_ids, documents)
+        ]
+        found = {}
+        remote = []
+
+        with self.lock:
+            for pos, key in enumerate(keys):
+                if key is None:
+                    continue
+                if key in self.local:
+                    self.local.move_to_end(key)
+                    found[pos] = self.local[key]
+                else:
+                    remote.append(pos)
+
+        if self.redis is not None and remote:
+            try:
+                values = self.redis.mget([keys[pos] for pos in remote])
+            except redis.RedisError as e:
+                print(f"Warning: score cache Redis lookup failed: {e}")
+                values = [None] * len(remote)
+
+            fetched = {}
+            for pos, value in zip(remote, values):
+                if value is not None:
+                    found[pos] = float(value)
+                    fetched[keys[pos]] = found[pos]
+            self._store_local(fetched)
+
+        return found
+
+    def set_many(self, model, query, case_ids, documents, scores):
+        """
+        Store scores for (query, case id) pairs
+
+        Args:
+            model: Cross-encoder model name
+            query: Query string
+            case_ids: List of case ids (None entries are skipped)
+            documents: Document texts parallel to case_ids
+            scores: Scores parallel to case_ids
+        """
+        entries = {
+            self._key(model, query, case_id, document): float(score)
+            for case_id, document, score in zip(case_ids, documents, scores)
+            if case_id is not None
+        }
+        if not entries:
+            return
+
+        self._store_local(entries)
+
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for key, score in entries.items():
+                    pipe.setex(key, self.ttl, repr(score))
+                pipe.execute()
+            except redis.RedisError as e:
+                print(f"Warning: score cache Redis write failed: {e}")
+
+    def _store_local(self, entries):
+        with self.lock:
+            for key, score in entries.items():
+                self.local[key] = score
+                self.local.move_to_end(key)
+            while len(self.local) > self.max_entries:
+                self.local.popitem(last=False)
+
+
+_default_score_cache = None
+
+
+def get_default_score_cache():
+    """
+    Process-wide ScoreCache shared by every CrossEncoder, so the dense and
+    BM25 rerankers reuse each other's scores
+    """
+    global _default_score_cache
+    if _default_score_cache is None:
+        _default_score_cache = ScoreCache()
+    return _default_score_cache
@@ -3,9 +3,20 @@ import os
 ES_PASSWORD = os.getenv("ES_PASSWORD", "0=ej+ZeERilvX9QENqYQ")
 ES_HOST = os.getenv("ES_HOST", "https://localhost:9200")
 
-# Multiple index names for different retrieval methods
+# Multiple index names for different retrieval methods. These are aliases:
+# each rebuild loads a new physical index (<alias>_v<n>) and swaps the alias
+# to it when done (see indexing/index_versions.py)
 ES_INDEX_BM25 = "pa_law_cases"      # BM25 baseline
 ES_INDEX_DENSE = "pa_law_cases_dense"    # Dense vector index
+ES_INDEX_COMBINED = "pa_law_cases_combined"  # Optional: BM25 fields + vector in one index
+# Replicas restored after bulk loading, and physical versions kept per alias
+# (current + previous, for rollback)
+ES_NUMBER_OF_REPLICAS = int(os.getenv("ES_NUMBER_OF_REPLICAS", 1))
+ES_KEEP_INDEX_VERSIONS = 2
+# After a swap the alias must return exactly the documents the writer created,
+# and no fewer than (1 - ES_SWAP_MAX_SHRINK) x the previous version's count;
+# otherwise the alias is moved back
+ES_SWAP_MAX_SHRINK = float(os.getenv("ES_SWAP_MAX_SHRINK", 0.1))
 
 # API Configuration
 API_HOST = "0.0.0.0"
@@ -16,14 +27,101 @@ API_DEBUG = True
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 
+# Cross-encoder score cache keyed by (model, query, case id, text): an in-process
+# LRU of SCORE_CACHE_SIZE pairs, optionally backed by Redis (shared by workers)
+SCORE_CACHE_SIZE = 200000
+SCORE_CACHE_REDIS = os.getenv("SCORE_CACHE_REDIS", "false").lower() == "true"
+SCORE_CACHE_TTL = 24 * 3600  # seconds, Redis tier only
+
+# Offline artifacts (token cache, embeddings, ...) live under this directory
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "artifacts")
+
+# Normalized corpus as Parquet (built by indexing.corpus_dataset, needs
+# pyarrow). When present, indexing reads it instead of the raw zips.
+CORPUS_DATASET_DIR = os.path.join(ARTIFACTS_DIR, "corpus")
+
+# Sharded corpus embeddings (python -m indexing.embed_corpus): one .npy matrix
+# per volume, EMBEDDING_DTYPE float32 or float16, split across EMBED_WORKERS
+# processes. index_dense_from_file loads them into the dense index.
+EMBEDDINGS_DIR = os.path.join(ARTIFACTS_DIR, "embeddings")
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 1))
+
+# Per-volume manifest (zip hash + case digests) for incremental reindexing
+# with indexing.incremental
+INDEX_MANIFEST_PATH = os.path.join(ARTIFACTS_DIR, "index_manifest.json")
+
+# Local compressed store of case text (built by indexing.bm25_indexer).
+# When present, case detail and RAG read full_text from it instead of ES.
+CONTENT_STORE_DIR = os.path.join(ARTIFACTS_DIR, "content_store")
+# Set to false once the content store is built to keep full_text out of the
+# dense index (it is never searched there)
+DENSE_INDEX_FULL_TEXT = os.getenv("DENSE_INDEX_FULL_TEXT", "true").lower() == "true"
+
+# Case detail HTTP caching: browsers may reuse a detail response for
+# DETAIL_CACHE_MAX_AGE seconds, then revalidate with its ETag. The ETag
+# includes the index generation (physical index + UUID), re-read from ES
+# in the background once it is INDEX_GENERATION_TTL seconds old.
+DETAIL_CACHE_MAX_AGE = 300
+INDEX_GENERATION_TTL = 30
+
+# Chunked case text: the detail view gets a table of contents plus the first
+# DETAIL_CHUNK_CHARS characters and pages through the rest on demand
+DETAIL_CHUNK_CHARS = 20000
+DETAIL_MAX_CHUNK_CHARS = 200000
+
 # Model Configuration
 # Legal-BERT models for encoding
 DUAL_ENCODER_MODEL = "nlpaueb/legal-bert-base-uncased"  # For dual-encoder (retrieval)
 CROSS_ENCODER_MODEL = "BAAI/bge-reranker-large" 
 
+# Dual-encoder token limits: documents use the model maximum, queries are
+# short so they are truncated (and padded) to far fewer tokens
+DENSE_DOC_MAX_LENGTH = 512
+DENSE_QUERY_MAX_LENGTH = 64
+# Bulk encoding forms length-sorted batches of at most this many tokens
+# (batch size x longest member), instead of a fixed number of texts
+DENSE_MAX_BATCH_TOKENS = int(os.getenv("DENSE_MAX_BATCH_TOKENS", 8192))
+
+# Pre-tokenized rerank_text for the cross-encoder (python -m indexing.pretokenize).
+# Used automatically when present and built with CROSS_ENCODER_MODEL's tokenizer.
+TOKEN_CACHE_DIR = os.path.join(ARTIFACTS_DIR, "token_cache")
+
 # Retrieval Configuration
 DENSE_VECTOR_DIM = 768     # BERT base dimension
 
+# Optional PCA projection of the embeddings (python -m indexing.reduce_embeddings
+# <dim>). When DENSE_PROJECTION_DIM is set (e.g. 256), the dense and combined
+# indices store projected vectors and DenseSearcher projects queries the same
+# way; 0 keeps the full DENSE_VECTOR_DIM. One artifact per dim
+# (DENSE_PROJECTION_PATH.format(dim=...)), so trying another size leaves the
+# live one alone.
+DENSE_PROJECTION_DIM = int(os.getenv("DENSE_PROJECTION_DIM", 0))
+DENSE_PROJECTION_PATH = os.path.join(ARTIFACTS_DIR, "projection_{dim}.npz")
+DENSE_INDEX_DIM = DENSE_PROJECTION_DIM or DENSE_VECTOR_DIM
+
+# HNSW variant of the dense_vector field: hnsw (float32), int8_hnsw, int4_hnsw
+# or bbq_hnsw (quantized, see indexing/vector_options.py). Set it the same for
+# indexing and the API: with a quantized index, kNN fetches
+# DENSE_RESCORE_OVERSAMPLE x k candidates and rescores them exactly with the
+# original float vectors.
+DENSE_VECTOR_INDEX_TYPE = os.getenv("DENSE_VECTOR_INDEX_TYPE", "hnsw")
+DENSE_RESCORE_OVERSAMPLE = float(os.getenv("DENSE_RESCORE_OVERSAMPLE", 3.0))
+
+# Where DenseSearcher runs kNN: "es" (the dense index), "hnsw" (in-process
+# hnswlib graph over the local vector store, python -m indexing.build_vector_store)
+# or "binary" (in-process Hamming scan of the store's 1-bit codes, the best
+# BINARY_RESCORE_CANDIDATES rescored with the float vectors). The local
+# backends work with Elasticsearch down. Filters leaving at most
+# LOCAL_EXACT_MAX_ROWS cases are searched exactly instead.
+DENSE_BACKEND = os.getenv("DENSE_BACKEND", "es")
+VECTOR_STORE_DIR = os.path.join(ARTIFACTS_DIR, "vector_store")
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", 128))
+LOCAL_EXACT_MAX_ROWS = 20000
+BINARY_RESCORE_CANDIDATES = int(os.getenv("BINARY_RESCORE_CANDIDATES", 2000))
+
 # For dense_rerank method only:
 # Stage 1: Dense retrieval gets top-K candidates
 # Stage 2: Cross-encoder reranks these K candidates
@@ -33,5 +131,56 @@ DENSE_VECTOR_DIM = 768     # BERT base dimension
 # - 500: Slow (~5-10s), best recall
 TOP_K_RERANK = 50      # Candidates to rerank (only affects dense_rerank method)
 
+# Hybrid retrieval (RAG) over the combined index (python -m indexing.combined_indexer):
+# one request fusing the BM25 query and filtered kNN with ES reciprocal rank
+# fusion. HYBRID_RRF_WINDOW candidates per retriever, RRF constant k.
+USE_COMBINED_INDEX = os.getenv("USE_COMBINED_INDEX", "false").lower() == "true"
+HYBRID_RRF_WINDOW = 50
+HYBRID_RRF_RANK_CONSTANT = 60
+
+# Indexers store a truncated prefix of each case as rerank_text (stored, not
+# searchable). Rerankers fetch only this field instead of full_text, and the
+# in-process snippet generator reads it for dense / rerank results.
+RERANK_TEXT_CHARS = 2000    # Characters of full_text stored as rerank_text
+SNIPPET_WINDOW_WORDS = 30   # Snippet length in words (~200 characters)
+
+# Maximum number of queries accepted by POST /cases/batch in one request
+BATCH_MAX_QUERIES = 100
+
+# BM25 hit counting: totals are exact up to this many hits, beyond it the
+# API reports a lower bound (total_relation = "gte", e.g. "10,000+")
+BM25_TRACK_TOTAL_HITS = 10000
+
+# Use the fast vector highlighter for BM25 snippets. Requires the index to be
+# built with term vectors (with_positions_offsets) on full_text/head_matter,
+# which bm25_indexer adds when this is True. Costs index size, saves query time.
+BM25_FAST_VECTOR_HIGHLIGHT = os.getenv("BM25_FAST_VECTOR_HIGHLIGHT", "false").lower() == "true"
+
+# Streaming export (GET /cases/export): documents per point-in-time page
+# and how long ES keeps the point-in-time alive between pages
+EXPORT_PAGE_SIZE = 1000
+PIT_KEEP_ALIVE = "2m"
+# Cursor paging of /cases (paginate=cursor) keeps a point-in-time open between
+# a client's page requests. It is closed on the last page; a cursor the
+# client abandons holds its PIT (an open search context on every shard) until
+# this keep-alive runs out, so keep it short. Later pages get 410.
+CURSOR_KEEP_ALIVE = "1m"
+
+# Indexing throughput: zips are parsed in INGEST_WORKERS processes, and the
+# BM25 and dense writers send BULK_CHUNK_SIZE-document bulk requests from
+# BULK_THREAD_COUNT threads. Documents rejected with 429 (ES overloaded) are
+# retried up to BULK_MAX_RETRIES times with exponential backoff.
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
+BULK_THREAD_COUNT = int(os.getenv("BULK_THREAD_COUNT", 4))
+BULK_MAX_RETRIES = 5
+BULK_INITIAL_BACKOFF = 2  # seconds, doubled per retry
+
+# Dense indexing pipeline: documents per pipeline batch (split into forward
+# passes under DENSE_MAX_BATCH_TOKENS) and batches buffered between the
+# tokenize / encode / index stages
+DENSE_BATCH_SIZE = int(os.getenv("DENSE_BATCH_SIZE", 256))
+PIPELINE_QUEUE_SIZE = 8
+
 # For direct dense search: no hard limit (ES will handle pagination)
 # User can browse as many pages as needed
\ No newline at end of file
@@ -1,5 +1,5 @@
 import { API_BASE_URL, PAGINATION } from '../constants';
-import { SearchResponse, CaseDetail, SearchMethod, SearchFilters } from '../types';
+import { SearchResponse, CaseDetail, CaseText, SearchMethod, SearchFilters } from '../types';
 
 export const getCases = async (
   query: string,
@@ -34,8 +34,24 @@ export const getCases = async (
   return response.json();
 };
 
+export const getSnippets = async (
+  query: string,
+  ids: string[]
+): Promise<Record<string, string | null>> => {
+  const params = new URLSearchParams({ query, ids: ids.join(',') });
+  const response = await fetch(`${API_BASE_URL}/cases/snippets?${params.toString()}`);
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch snippets');
+  }
+
+  const data = await response.json();
+  return data.snippets;
+};
+
 export const getCaseDetail = async (caseId: string): Promise<CaseDetail> => {
-  const response = await fetch(`${API_BASE_URL}/cases/${caseId}`);
+  // Only the first chunk of full_text; the rest is paged in with getCaseText
+  const response = await fetch(`${API_BASE_URL}/cases/${caseId}?chunk=true`);
 
   if (!response.ok) {
     throw new Error('Failed to fetch case details');
@@ -43,3 +59,21 @@ export const getCaseDetail = async (caseId: string): Promise<CaseDetail> => {
 
   return response.json();
 };
+
+export const getCaseText = async (
+  caseId: string,
+  start: number,
+  length?: number
+): Promise<CaseText> => {
+  const params = new URLSearchParams({ start: String(start) });
+  if (length) {
+    params.append('length', String(length));
+  }
+  const response = await fetch(`${API_BASE_URL}/cases/${caseId}/text?${params.toString()}`);
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch case text');
+  }
+
+  return response.json();
+};
@@ -7,7 +7,10 @@ interface CaseDetailProps {
 }
 
 const CaseDetail: React.FC<CaseDetailProps> = ({ caseId, onClose }) => {
-  const { caseData, isLoading, error } = useCaseDetail(caseId);
+  const { caseData, isLoading, isLoadingMore, error, loadMoreText } = useCaseDetail(caseId);
+
+  const loadedChars = caseData?.text_range?.end ?? caseData?.full_text?.length ?? 0;
+  const hasMoreText = caseData?.text_range?.next_start != null;
 
   if (!caseId) return null;
 
@@ -107,6 +110,38 @@ const CaseDetail: React.FC<CaseDetailProps> = ({ caseId, onClose }) => {
                 </div>
               )}
 
+              {/* Table of Contents (head matter and opinions) */}
+              {caseData.toc && caseData.toc.length > 1 && (
+                <div className="bg-white border border-gray-200 rounded-2xl p-6 shadow-sm hover:shadow-md transition-shadow">
+                  <div className="flex items-center gap-2 mb-4">
+                    <div className="w-1 h-6 bg-amber-500 rounded-full"></div>
+                    <h3 className="text-xl font-bold text-gray-900 m-0">Contents</h3>
+                  </div>
+                  <ul className="m-0 p-0 list-none space-y-2">
+                    {caseData.toc.map((section) => {
+                      const isLoaded = section.end <= loadedChars;
+                      return (
+                        <li key={section.start} className="flex items-center justify-between gap-4">
+                          <span className="text-gray-700 capitalize">
+                            {section.type.replace(/[-_]/g, ' ')}
+                            {section.author && <span className="text-gray-500 normal-case"> — {section.author}</span>}
+                          </span>
+                          {!isLoaded && (
+                            <button
+                              className="text-sm text-indigo-600 hover:text-indigo-800 bg-transparent border-none cursor-pointer disabled:opacity-50"
+                              onClick={() => loadMoreText(section.end)}
+                              disabled={isLoadingMore}
+                            >
+                              Load
+                            </button>
+                          )}
+                        </li>
+                      );
+                    })}
+                  </ul>
+                </div>
+              )}
+
               {/* Full Text Section */}
               {caseData.full_text && (
                 <div className="bg-white border border-gray-200 rounded-2xl p-6 shadow-sm hover:shadow-md transition-shadow">
@@ -117,6 +152,20 @@ const CaseDetail: React.FC<CaseDetailProps> = ({ caseId, onClose }) => {
                   <div className="bg-gray-50 p-6 rounded-xl whitespace-pre-wrap text-base leading-relaxed text-gray-800 max-h-[500px] overflow-y-auto">
                     {caseData.full_text}
                   </div>
+                  {hasMoreText && (
+                    <div className="mt-4 flex items-center justify-between">
+                      <span className="text-sm text-gray-500">
+                        Showing {loadedChars.toLocaleString()} of {caseData.text_range!.total_chars.toLocaleString()} characters
+                      </span>
+                      <button
+                        className="px-4 py-2 bg-indigo-600 hover:bg-indigo-700 text-white rounded-lg border-none cursor-pointer disabled:opacity-50"
+                        onClick={() => loadMoreText()}
+                        disabled={isLoadingMore}
+                      >
+                        {isLoadingMore ? 'Loading...' : 'Load more'}
+                      </button>
+                    </div>
+                  )}
                 </div>
               )}
 
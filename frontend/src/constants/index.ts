@@ -9,3 +9,8 @@ export const ROUTES = {
   HOME: '/',
   SEARCH: '/search',
 } as const;
+
+export const CASE_TEXT = {
+  // Upper bound the API accepts for one /cases/<id>/text request
+  MAX_CHUNK_CHARS: 200000,
+} as const;
@@ -1,10 +1,12 @@
-import { useState, useEffect } from 'react';
-import { getCaseDetail } from '@/api';
+import { useState, useEffect, useCallback } from 'react';
+import { getCaseDetail, getCaseText } from '@/api';
+import { CASE_TEXT } from '@/constants';
 import { CaseDetail } from '@/types';
 
 export const useCaseDetail = (caseId: string | null) => {
   const [caseData, setCaseData] = useState<CaseDetail | null>(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
@@ -30,5 +32,37 @@ export const useCaseDetail = (caseId: string | null) => {
     fetchCase();
   }, [caseId]);
 
-  return { caseData, isLoading, error };
+  // Append the next chunk of full_text; with `through`, load at least up to
+  // that character offset (e.g. the start of a table-of-contents section)
+  const loadMoreText = useCallback(async (through?: number) => {
+    const nextStart = caseData?.text_range?.next_start;
+    if (!caseId || nextStart === null || nextStart === undefined || isLoadingMore) {
+      return;
+    }
+
+    const length = through !== undefined && through > nextStart
+      ? Math.min(through - nextStart, CASE_TEXT.MAX_CHUNK_CHARS)
+      : undefined;
+
+    setIsLoadingMore(true);
+    try {
+      const chunk = await getCaseText(caseId, nextStart, length);
+      setCaseData((prev) => prev && {
+        ...prev,
+        full_text: (prev.full_text || '') + chunk.text,
+        text_range: {
+          start: prev.text_range?.start ?? 0,
+          end: chunk.end,
+          total_chars: chunk.total_chars,
+          next_start: chunk.next_start,
+        },
+      });
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Unknown error');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  }, [caseId, caseData, isLoadingMore]);
+
+  return { caseData, isLoading, isLoadingMore, error, loadMoreText };
 };
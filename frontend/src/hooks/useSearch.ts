@@ -1,10 +1,11 @@
 import { useState } from 'react';
-import { getCases } from '@/api';
+import { getCases, getSnippets } from '@/api';
 import { CaseResult, SearchMethod, SearchFilters } from '@/types';
 
 export const useSearch = () => {
   const [results, setResults] = useState<CaseResult[] | null>(null);
   const [total, setTotal] = useState(0);
+  const [totalIsLowerBound, setTotalIsLowerBound] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
@@ -21,6 +22,22 @@ export const useSearch = () => {
       const data = await getCases(query, page, 10, method, filters);
       setResults(data.results);
       setTotal(data.total);
+      setTotalIsLowerBound(data.total_relation === 'gte');
+
+      // BM25 listings come back without highlighting; fill snippets in afterwards
+      if (method === 'bm25' && data.results.length > 0) {
+        getSnippets(query, data.results.map((r) => r.id))
+          .then((snippets) => {
+            setResults((current) =>
+              current === data.results
+                ? current.map((r) => ({ ...r, snippet: snippets[r.id] ?? r.snippet }))
+                : current
+            );
+          })
+          .catch(() => {
+            // Snippets are optional; keep the plain listing
+          });
+      }
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Unknown error');
       setResults([]);
@@ -29,5 +46,5 @@ export const useSearch = () => {
     }
   };
 
-  return { results, total, isLoading, error, search };
+  return { results, total, totalIsLowerBound, isLoading, error, search };
 };
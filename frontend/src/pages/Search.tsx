@@ -14,7 +14,8 @@ const Search: React.FC = () => {
   const [jumpToPage, setJumpToPage] = useState('');
   const [filters, setFilters] = useState<SearchFilters>({});
 
-  const { results, total, isLoading, error, search } = useSearch();
+  const { results, total, totalIsLowerBound, isLoading, error, search } = useSearch();
+  const totalLabel = `${total.toLocaleString()}${totalIsLowerBound ? '+' : ''}`;
 
   useEffect(() => {
     const q = searchParams.get('q');
@@ -157,7 +158,7 @@ const Search: React.FC = () => {
                 </button>
 
                 <span className="text-sm text-gray-500 ml-2">
-                  ({total} total results)
+                  ({totalLabel} total results)
                 </span>
               </div>
             )}
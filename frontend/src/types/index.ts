@@ -21,6 +21,8 @@ export interface CaseResult {
 
 export interface SearchResponse {
   total: number;
+  // 'gte' when the backend stopped counting (total is a lower bound)
+  total_relation?: 'eq' | 'gte';
   page: number;
   size: number;
   method?: SearchMethod;
@@ -36,5 +38,29 @@ export interface CaseDetail {
   word_count?: number;
   parties?: string;
   judges?: string;
+  // first chunk only when requested with chunk=true (see text_range)
   full_text?: string;
+  toc?: TocEntry[];
+  text_range?: TextRange;
+}
+
+// Head matter / opinion boundaries as character offsets into full_text
+export interface TocEntry {
+  type: string;
+  author?: string | null;
+  start: number;
+  end: number;
+}
+
+export interface TextRange {
+  start: number;
+  end: number;
+  total_chars: number;
+  // null once the end of full_text has been returned
+  next_start: number | null;
+}
+
+export interface CaseText extends TextRange {
+  id: string;
+  text: string;
 }
@@ -1,64 +1,29 @@
 """
-BM25 Indexer - Baseline retrieval method (optimized with bulk indexing)
+BM25 Indexer - Baseline retrieval method (concurrent bulk indexing, see indexing.bulk)
 """
 
-import os
-import json
-import zipfile
+import time
 
-from tqdm import tqdm
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk, BulkIndexError
+from elasticsearch.helpers import BulkIndexError
 
-from config import ES_PASSWORD, ES_HOST, ES_INDEX_BM25
+from config import (
+    ES_PASSWORD, ES_HOST, ES_INDEX_BM25, BM25_FAST_VECTOR_HIGHLIGHT, CONTENT_STORE_DIR,
+    BULK_CHUNK_SIZE, BULK_THREAD_COUNT, BULK_MAX_RETRIES, BULK_INITIAL_BACKOFF,
+)
+from storage.content_store import ContentStoreWriter
+from indexing.ingest import ingest
+from indexing.index_versions import create_versioned_index, publish_index
+from indexing.bulk import BulkSender
 
-from datetime import datetime
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-def normalize_decision_date(raw):
+def bm25_mapping():
     """
-    Normalize decision_date string into ISO 'YYYY-MM-DD' or return None.
-
-    Handles:
-      - 'YYYY-MM-DD'
-      - 'YYYY-MM'        -> YYYY-MM-01
-      - 'YYYY'           -> YYYY-01-01
-    Any unparsable value -> None (field omitted).
-    """
-    if not raw:
-        return None
-
-    if isinstance(raw, str):
-        raw = raw.strip()
-        if not raw:
-            return None
-    else:
-        # non-string (e.g., None) -> ignore
-        return None
-
-    # Try a few likely formats
-    for fmt in ("%Y-%m-%d", "%Y-%m", "%Y"):
-        try:
-            dt = datetime.strptime(raw, fmt)
-            return dt.date().isoformat()  # 'YYYY-MM-DD'
-        except ValueError:
-            continue
-
-    # Unrecognized format: skip the field
-    return None
-
-def create_bm25_index():
+    Settings and mappings of the BM25 index (also the lexical half of the
+    combined index, see indexing.combined_indexer)
     """
-    Create BM25 index with custom analyzer and
-    indexing-friendly settings (no replicas, no auto-refresh).
-    """
-    es = Elasticsearch(
-        ES_HOST,
-        basic_auth=("elastic", ES_PASSWORD),
-        verify_certs=False,
-    )
-
     mapping = {
         "settings": {
             "analysis": {
@@ -126,145 +91,141 @@ def create_bm25_index():
                 "full_text": {
                     "type": "text",
                     "analyzer": "legal_text_analyzer"
-                }
+                },
+
+                # Stored prefix for reranking and snippets (not searchable)
+                "rerank_text": {"type": "text", "index": False},
+
+                # Opinion boundaries within full_text (stored, not indexed)
+                "sections": {"type": "object", "enabled": False}
             }
         }
     }
 
 
-    if es.indices.exists(index=ES_INDEX_BM25):
-        print(f"Index {ES_INDEX_BM25} already exists. Deleting...")
-        es.indices.delete(index=ES_INDEX_BM25)
+    # Store offsets so snippets can use the fast vector highlighter
+    if BM25_FAST_VECTOR_HIGHLIGHT:
+        for field in ("head_matter", "full_text"):
+            mapping["mappings"]["properties"][field]["term_vector"] = "with_positions_offsets"
 
-    es.indices.create(index=ES_INDEX_BM25, body=mapping)
-    print(f"Created index: {ES_INDEX_BM25}")
+    return mapping
 
-    return es
 
-
-def collect_json_files(data_dir="data"):
-    """
-    Collect all (zip_path, json_filename) pairs to index.
+def create_bm25_index():
     """
-    json_files_info = []
-
-    for folder_name in os.listdir(data_dir):
-        folder_path = os.path.join(data_dir, folder_name)
-        if not os.path.isdir(folder_path):
-            continue
-
-        for zip_name in os.listdir(folder_path):
-            if not zip_name.endswith(".zip"):
-                continue
-
-            zip_path = os.path.join(folder_path, zip_name)
-            with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                for file_info in zip_ref.namelist():
-                    if file_info.endswith(".json") and "json/" in file_info:
-                        json_files_info.append((zip_path, file_info))
-
-    return json_files_info
-
+    Create BM25 index with custom analyzer and
+    indexing-friendly settings (no replicas, no auto-refresh).
 
-def build_doc(case_data):
-    """
-    Build the ES document from a single case JSON dict.
+    Returns:
+        (es client, name of the new physical index)
     """
-    casebody = case_data.get("casebody", {})
-    opinions = casebody.get("opinions", [])
-    opinions_text = "\n".join(
-        [op.get("text", "") for op in opinions if "text" in op]
+    es = Elasticsearch(
+        ES_HOST,
+        basic_auth=("elastic", ES_PASSWORD),
+        verify_certs=False,
     )
-    head_matter = casebody.get("head_matter", "")
-
-    if head_matter:
-        full_text = head_matter + "\n" + opinions_text
-    else:
-        full_text = opinions_text
-
-    parties = casebody.get("parties", [])
-    judges = casebody.get("judges", [])
-    analysis = case_data.get("analysis", {})
-    word_count = analysis.get("word_count", 0)
-    court = case_data.get("court", {})
-    jurisdiction = case_data.get("jurisdiction", {})
-
-    decision_date = normalize_decision_date(case_data.get("decision_date"))
-
-    doc = {
-        "id": case_data.get("id"),
-        "name": case_data.get("name"),
-        "decision_date": decision_date,
-        "court_name": court.get("name"),
-        "jurisdiction_name": jurisdiction.get("name"),
-        "parties": ", ".join(parties) if parties else "",
-        "judges": ", ".join(judges) if judges else "",
-        "word_count": word_count,
-        "head_matter": head_matter or "",
-        "full_text": full_text,
-    }
 
-    return doc
+    mapping = bm25_mapping()
+
+    # New physical version; the ES_INDEX_BM25 alias keeps serving the old one
+    index_name = create_versioned_index(es, ES_INDEX_BM25, mapping)
+
+    return es, index_name
+
+
+class BM25Writer:
+    columns = None  # every normalized field is indexed
+
+    def __init__(self, es, index_name=ES_INDEX_BM25, alias=None, chunk_size=BULK_CHUNK_SIZE,
+                 thread_count=BULK_THREAD_COUNT, max_retries=BULK_MAX_RETRIES,
+                 initial_backoff=BULK_INITIAL_BACKOFF):
+        """
+        Stream normalized documents into the BM25 index
+
+        add() groups documents into chunk_size-document bulk requests, sent
+        from thread_count threads by a BulkSender; streaming_bulk retries
+        documents rejected with 429 with exponential backoff.
+
+        Args:
+            es: Elasticsearch client
+            index_name: Index to write to
+            alias: If given, index_name is a new physical version: on close it
+                   is finalized and the alias is swapped to it
+            chunk_size: Documents per bulk request
+            thread_count: Concurrent bulk requests
+            max_retries: Retries for 429-rejected documents
+            initial_backoff: Seconds before the first retry, doubled per retry
+        """
+        self.es = es
+        self.index_name = index_name
+        self.alias = alias
+        self.chunk_size = chunk_size
+        self.sender = BulkSender(es, chunk_size=chunk_size, thread_count=thread_count,
+                                 max_retries=max_retries, initial_backoff=initial_backoff)
+        self.actions = []
+        self.count = 0
+        self.start_time = time.monotonic()
+
+    def add(self, doc):
+        self.actions.append({
+            "_index": self.index_name,
+            "_id": doc["id"],  # keyed by case id: GET-able and idempotent on reindex
+            "_source": doc,
+        })
+        if len(self.actions) >= self.chunk_size:
+            # Blocks while too many chunks are in flight, so parsing cannot
+            # run arbitrarily far ahead of ES
+            self.sender.submit(self.actions)
+            self.actions = []
+
+    def close(self):
+        self.sender.submit(self.actions)
+        self.actions = []
+        self.count, errors = self.sender.close()
+
+        elapsed = time.monotonic() - self.start_time
+        print(f"Indexed {self.count} documents to {self.index_name} in {elapsed:.1f}s "
+              f"({self.count / max(elapsed, 1e-9):.0f} docs/sec)")
+        if errors:
+            print("Bulk indexing error; first error:", errors[0])
+            raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
+
+        if self.alias:
+            publish_index(self.es, self.index_name, self.alias, expected_count=self.sender.created)
+            return
+
+        # Optional: restore more normal index settings after bulk indexing
+        try:
+            # Give ES more time to apply settings on a big index
+            self.es.options(request_timeout=60).indices.put_settings(
+                index=self.index_name,
+                body={"index": {"refresh_interval": "1s"}}
+            )
+        except Exception as e:
+            print(f"Warning: failed to update index refresh_interval: {e}")
 
 
-def index_documents(es, data_dir="data", batch_size=500):
+def index_documents(es, index_name, data_dir="data", chunk_size=BULK_CHUNK_SIZE,
+                    thread_count=BULK_THREAD_COUNT, content_store_dir=None):
     """
-    Index all documents from data directory using Elasticsearch bulk API.
+    Index all documents from data directory using Elasticsearch bulk API
+    into the new physical index, then swap the ES_INDEX_BM25 alias to it.
+    If content_store_dir is given, also write the local content store.
+
+    To build the dense index (or token cache) in the same pass over the
+    corpus, use indexing.ingest instead.
     """
-    json_files_info = collect_json_files(data_dir=data_dir)
-    total_docs = len(json_files_info)
-    print(f"Found {total_docs} documents to index")
-
-    actions = []
-    for zip_path, json_filename in tqdm(
-        json_files_info, desc="Indexing BM25 cases"
-    ):
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            with zip_ref.open(json_filename) as f:
-                case_data = json.load(f)
-
-        doc = build_doc(case_data)
-
-        action = {
-            "_index": ES_INDEX_BM25,
-            "_source": doc,
-        }
-        actions.append(action)
-
-        # When we reach batch_size, send a bulk request
-        if len(actions) >= batch_size:
-            try:
-                bulk(es, actions, request_timeout=300)
-            except BulkIndexError as e:
-                print("Bulk indexing error; first error:", e.errors[0])
-                raise
-            actions = []  # reset batch
-
-    # Flush any remaining docs
-    if actions:
-        try:
-            bulk(es, actions, request_timeout=300)
-        except BulkIndexError as e:
-            print("Bulk indexing error in final batch; first error:", e.errors[0])
-            raise
-
-    print(f"Indexed {total_docs} documents to {ES_INDEX_BM25}")
-
-    # Optional: restore more normal index settings after bulk indexing
-    try:
-        # Give ES more time to apply settings on a big index
-        es.options(request_timeout=60).indices.put_settings(
-            index=ES_INDEX_BM25,
-            body={"index": {"refresh_interval": "1s"}}
-        )
-    except Exception as e:
-        print(f"Warning: failed to update index refresh_interval: {e}")
+    writers = [BM25Writer(es, index_name, alias=ES_INDEX_BM25, chunk_size=chunk_size, thread_count=thread_count)]
+    if content_store_dir:
+        writers.append(ContentStoreWriter(content_store_dir))
+
+    ingest(writers, data_dir=data_dir, desc="Indexing BM25 cases")
 
 if __name__ == "__main__":
     print("Creating BM25 index...")
-    es = create_bm25_index()
+    es, index_name = create_bm25_index()
 
     print("Indexing documents...")
-    index_documents(es, data_dir="data", batch_size=500)
+    index_documents(es, index_name, data_dir="data", content_store_dir=CONTENT_STORE_DIR)
 
     print("Done!")
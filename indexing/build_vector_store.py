@@ -0,0 +1,184 @@
+"""
+Build the local vector store for in-process dense search
+
+Reads the embedding shards of indexing.embed_corpus (or the reduced shards
+of indexing.reduce_embeddings when DENSE_PROJECTION_DIM is set) and writes
+VECTOR_STORE_DIR (layout in storage/vector_store.py): the unit vectors as
+one memory-mappable matrix, the filter columns, the result metadata, the
+sign-binarized codes and, when hnswlib is installed, an HNSW graph over
+the vectors.
+
+The store is built in a staging directory and swapped in when complete
+(storage.staging), so API processes that have the old one memory-mapped
+keep reading it undisturbed until they restart.
+
+Set DENSE_BACKEND=hnsw (or binary) to let DenseSearcher search it instead
+of Elasticsearch.
+
+Usage (from project root):
+    python -m indexing.build_vector_store
+"""
+import os
+import json
+
+import numpy as np
+from tqdm import tqdm
+
+from config import (
+    DUAL_ENCODER_MODEL, EMBEDDINGS_DIR, DENSE_INDEX_DIM, DENSE_PROJECTION_DIM, VECTOR_STORE_DIR,
+    HNSW_M, HNSW_EF_CONSTRUCTION,
+)
+from indexing.reduce_embeddings import reduced_embeddings_dir, load_manifest, iter_shard_vectors, BLOCK_ROWS
+from storage.staging import staging_dir, replace_dir
+from indexing.corpus import date_key
+from storage.vector_store import HYDRATE_FIELDS
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+def write_array(output_dir, name, array):
+    np.save(os.path.join(output_dir, name), array)
+
+
+def write_vectors(embeddings_dir, manifest, output_dir):
+    """
+    Copy every shard into vectors.npy as normalized float32 rows
+    """
+    path = os.path.join(output_dir, "vectors.npy")
+    vectors = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=(manifest["num_vectors"], manifest["dim"])
+    )
+    row = 0
+    for _, shard in tqdm(iter_shard_vectors(embeddings_dir, manifest), total=len(manifest["shards"]),
+                         desc="Copying vectors"):
+        for start in range(0, len(shard), BLOCK_ROWS):
+            block = np.asarray(shard[start:start + BLOCK_ROWS], dtype=np.float32)
+            vectors[row:row + len(block)] = block / np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+            row += len(block)
+    vectors.flush()
+    return vectors
+
+
+def write_metadata(embeddings_dir, manifest, output_dir):
+    """
+    Write the filter columns, meta.jsonl and rerank_text.bin from the shard sidecars
+    """
+    count = manifest["num_vectors"]
+    ids = np.zeros(count, dtype=np.int64)
+    word_count = np.zeros(count, dtype=np.int32)
+    dates = np.zeros(count, dtype=np.int32)
+    court_ids = np.full(count, -1, dtype=np.int32)
+    offsets = np.zeros(count, dtype=np.int64)
+    text_offsets = np.zeros(count + 1, dtype=np.int64)
+    courts = {}
+
+    row = 0
+    with open(os.path.join(output_dir, "meta.jsonl"), "wb") as out, \
+            open(os.path.join(output_dir, "rerank_text.bin"), "wb") as texts:
+        for shard in tqdm(manifest["shards"], desc="Writing metadata"):
+            with open(os.path.join(embeddings_dir, shard["name"] + ".meta.jsonl"), "r", encoding="utf-8") as f:
+                for line in f:
+                    meta = json.loads(line)
+                    ids[row] = int(meta["id"])
+                    word_count[row] = meta.get("word_count") or 0
+                    dates[row] = date_key(meta.get("decision_date")) or 0
+                    if meta.get("court_name"):
+                        court_ids[row] = courts.setdefault(meta["court_name"], len(courts))
+
+                    offsets[row] = out.tell()
+                    doc = {field: meta.get(field) for field in HYDRATE_FIELDS}
+                    out.write(json.dumps(doc, ensure_ascii=False).encode("utf-8") + b"\n")
+                    texts.write((meta.get("rerank_text") or "").encode("utf-8"))
+                    text_offsets[row + 1] = texts.tell()
+                    row += 1
+
+    if row != count:
+        raise ValueError(f"Shard sidecars have {row} rows, manifest says {count}")
+
+    write_array(output_dir, "ids.npy", ids)
+    write_array(output_dir, "word_count.npy", word_count)
+    write_array(output_dir, "dates.npy", dates)
+    write_array(output_dir, "courts.npy", court_ids)
+    write_array(output_dir, "meta_offsets.npy", offsets)
+    write_array(output_dir, "rerank_text_offsets.npy", text_offsets)
+    with open(os.path.join(output_dir, "courts.json"), "w", encoding="utf-8") as f:
+        json.dump(list(courts), f, ensure_ascii=False)
+
+
+def write_binary_codes(vectors, output_dir):
+    """
+    Write one bit per dimension: the sign of each vector minus the corpus mean
+
+    Centering first splits every dimension's bits roughly evenly, so the
+    Hamming distance tracks the cosine (embeddings share a large mean
+    component that would otherwise set most bits the same way).
+    """
+    total = np.zeros(vectors.shape[1], dtype=np.float64)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        total += np.asarray(vectors[start:start + BLOCK_ROWS]).sum(axis=0, dtype=np.float64)
+    mean = (total / max(len(vectors), 1)).astype(np.float32)
+
+    codes = np.empty((len(vectors), (vectors.shape[1] + 7) // 8), dtype=np.uint8)
+    for start in tqdm(range(0, len(vectors), BLOCK_ROWS), desc="Writing binary codes"):
+        block = np.asarray(vectors[start:start + BLOCK_ROWS])
+        codes[start:start + len(block)] = np.packbits(block > mean, axis=1)
+    write_array(output_dir, "binary_codes.npy", codes)
+    write_array(output_dir, "binary_mean.npy", mean)
+
+
+def build_hnsw(vectors, output_dir, m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION):
+    """
+    Build and save the hnswlib graph (inner product on unit vectors = cosine)
+    """
+    index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+    index.init_index(max_elements=len(vectors), M=m, ef_construction=ef_construction)
+    for start in tqdm(range(0, len(vectors), BLOCK_ROWS), desc="Building HNSW graph"):
+        block = np.asarray(vectors[start:start + BLOCK_ROWS])
+        index.add_items(block, np.arange(start, start + len(block)))
+    index.save_index(os.path.join(output_dir, "hnsw.bin"))
+
+
+def build_vector_store(embeddings_dir=None, output_dir=VECTOR_STORE_DIR):
+    """
+    Write the vector store from the embedding shards
+
+    Args:
+        embeddings_dir: Shard directory (default: the one matching DENSE_PROJECTION_DIM)
+        output_dir: Store directory, replaced as a whole once the new one is written
+    """
+    if embeddings_dir is None:
+        embeddings_dir = reduced_embeddings_dir(DENSE_PROJECTION_DIM) if DENSE_PROJECTION_DIM else EMBEDDINGS_DIR
+    manifest = load_manifest(embeddings_dir)
+    if manifest["dim"] != DENSE_INDEX_DIM:
+        raise ValueError(f"{embeddings_dir} holds {manifest['dim']}-d vectors, the index uses {DENSE_INDEX_DIM}")
+
+    staging = staging_dir(output_dir)
+    vectors = write_vectors(embeddings_dir, manifest, staging)
+    write_metadata(embeddings_dir, manifest, staging)
+    write_binary_codes(vectors, staging)
+
+    if hnswlib is not None:
+        build_hnsw(vectors, staging)
+    else:
+        print("Warning: hnswlib is not installed; skipping the HNSW graph (pip install hnswlib)")
+    del vectors  # close the memory map before the directory moves
+
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump({
+            "model": DUAL_ENCODER_MODEL,
+            "dim": manifest["dim"],
+            "projection_dim": DENSE_PROJECTION_DIM,
+            "num_vectors": manifest["num_vectors"],
+            "source": embeddings_dir,
+            "hnsw": {"M": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION} if hnswlib is not None else None,
+        }, f, indent=2)
+
+    replace_dir(staging, output_dir)
+    print(f"Wrote vector store for {manifest['num_vectors']} cases to {output_dir}")
+
+
+if __name__ == "__main__":
+    build_vector_store()
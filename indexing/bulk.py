@@ -0,0 +1,110 @@
+"""
+Concurrent bulk indexing shared by the BM25 and dense writers
+
+BulkSender sends chunks of actions from a thread pool, so thread_count bulk
+requests are in flight while the caller keeps producing. Each chunk goes
+through streaming_bulk, which retries documents rejected with 429 with its
+own exponential backoff (max_retries / initial_backoff); other failures are
+collected for the writer to report. `created` counts documents that were new
+to the index (not overwrites of a repeated id), which is what the index
+should hold afterwards.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from elasticsearch.helpers import streaming_bulk
+
+from config import BULK_CHUNK_SIZE, BULK_THREAD_COUNT, BULK_MAX_RETRIES, BULK_INITIAL_BACKOFF
+
+
+class BulkSender:
+    def __init__(self, es, chunk_size=BULK_CHUNK_SIZE, thread_count=BULK_THREAD_COUNT,
+                 max_retries=BULK_MAX_RETRIES, initial_backoff=BULK_INITIAL_BACKOFF):
+        """
+        Args:
+            es: Elasticsearch client
+            chunk_size: Documents per bulk request
+            thread_count: Concurrent bulk requests
+            max_retries: Retries for 429-rejected documents (streaming_bulk)
+            initial_backoff: Seconds before the first retry, doubled per retry
+        """
+        self.es = es
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.executor = ThreadPoolExecutor(max_workers=thread_count, thread_name_prefix="bulk")
+        # At most two chunks queued per thread: the producer blocks instead of
+        # buffering the corpus in memory when ES falls behind
+        self.slots = threading.Semaphore(thread_count * 2)
+        self.lock = threading.Lock()
+        self.futures = []
+        self.count = 0
+        self.created = 0
+        self.errors = []
+
+    def submit(self, actions):
+        """
+        Queue one chunk of actions (blocks while too many are in flight)
+
+        Raises:
+            Exception: the error of a chunk that failed outright, if any
+        """
+        if not actions:
+            return
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self._send, actions)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+        self._check_done()
+
+    def _send(self, actions):
+        count, created, errors = 0, 0, []
+        for ok, item in streaming_bulk(
+            self.es, actions,
+            chunk_size=self.chunk_size,
+            max_retries=self.max_retries,
+            initial_backoff=self.initial_backoff,
+            raise_on_error=False,
+            raise_on_exception=False,
+            request_timeout=300,
+        ):
+            if ok:
+                count += 1
+                created += next(iter(item.values())).get("result") == "created"
+            else:
+                errors.append(item)
+        with self.lock:
+            self.count += count
+            self.created += created
+            self.errors.extend(errors)
+
+    def _check_done(self):
+        """
+        Drop finished chunks, re-raising the first exception among them
+        """
+        pending = []
+        for future in self.futures:
+            if future.done():
+                future.result()
+            else:
+                pending.append(future)
+        self.futures = pending
+
+    def close(self):
+        """
+        Wait for every chunk
+
+        Returns:
+            (documents indexed, list of failed bulk items)
+        """
+        try:
+            for future in self.futures:
+                future.result()
+        finally:
+            self.executor.shutdown(wait=True)
+        self.futures = []
+        return self.count, self.errors
@@ -0,0 +1,89 @@
+"""
+Combined Indexer - BM25 fields and the dense vector in one index
+
+Optional alternative to running pa_law_cases and pa_law_cases_dense side by
+side. The mapping is the BM25 mapping (same analyzer and field types: id
+keyword, decision_date date, court_name keyword + text) plus dense_vector,
+and each case's text is stored once. Hybrid retrieval then runs as a single
+request with native rank fusion (search.hybrid_searcher).
+
+Usage (from project root):
+    python -m indexing.combined_indexer
+    python -m indexing.ingest combined content_store   # same, plus the content store
+"""
+from elasticsearch import Elasticsearch
+
+from config import ES_PASSWORD, ES_HOST, ES_INDEX_COMBINED, DENSE_BATCH_SIZE
+from models.dual_encoder import DualEncoder
+from indexing.bm25_indexer import bm25_mapping
+from indexing.dense_indexer import DenseWriter
+from indexing.ingest import ingest
+from indexing.index_versions import create_versioned_index
+from indexing.vector_options import dense_vector_mapping, check_index_type
+
+import urllib3
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+def combined_mapping():
+    mapping = bm25_mapping()
+    mapping["mappings"]["properties"]["dense_vector"] = dense_vector_mapping()
+    return mapping
+
+
+def create_combined_index():
+    """
+    Create a new physical version of the combined index
+
+    Returns:
+        (es client, name of the new physical index)
+    """
+    es = Elasticsearch(
+        ES_HOST,
+        basic_auth=("elastic", ES_PASSWORD),
+        verify_certs=False,
+    )
+
+    check_index_type(es)
+
+    # New physical version; the ES_INDEX_COMBINED alias keeps serving the old one
+    index_name = create_versioned_index(es, ES_INDEX_COMBINED, combined_mapping())
+
+    return es, index_name
+
+
+class CombinedWriter(DenseWriter):
+    """
+    DenseWriter that keeps every normalized field, so the same document
+    serves BM25 queries and kNN
+    """
+    columns = None  # every normalized field is indexed
+
+    def __init__(self, es, encoder, index_name=ES_INDEX_COMBINED, alias=None, **kwargs):
+        super().__init__(es, encoder, index_name=index_name, alias=alias, **kwargs)
+
+    def source(self, doc):
+        # full_text is searched here, so it is kept regardless of DENSE_INDEX_FULL_TEXT
+        return dict(doc)
+
+
+def index_documents(es, encoder, index_name, data_dir="data", batch_size=DENSE_BATCH_SIZE):
+    """
+    Index all documents with their vectors into the new physical index,
+    then swap the ES_INDEX_COMBINED alias to it
+    """
+    ingest([CombinedWriter(es, encoder, index_name, alias=ES_INDEX_COMBINED, batch_size=batch_size)],
+           data_dir=data_dir, desc="Indexing combined cases")
+
+
+if __name__ == "__main__":
+    print("Loading dual encoder model...")
+    encoder = DualEncoder()
+
+    print("Creating combined index...")
+    es, index_name = create_combined_index()
+
+    print("Indexing documents with BM25 fields and dense vectors...")
+    index_documents(es, encoder, index_name)
+
+    print("Done!")
@@ -0,0 +1,216 @@
+"""
+Reading and normalizing the case.law corpus
+
+Every indexer and local store builds its documents from normalize_case, so
+the BM25 index, the dense index and the stores cannot drift apart.
+iter_cases opens each zip once and walks its members in order.
+"""
+import os
+import json
+import zipfile
+import calendar
+from datetime import datetime
+
+from config import RERANK_TEXT_CHARS
+
+
+def normalize_decision_date(raw):
+    """
+    Normalize decision_date string into ISO 'YYYY-MM-DD' or return None.
+
+    Handles:
+      - 'YYYY-MM-DD'
+      - 'YYYY-MM'        -> YYYY-MM-01
+      - 'YYYY'           -> YYYY-01-01
+    Any unparsable value -> None (field omitted).
+    """
+    if not raw:
+        return None
+
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if not raw:
+            return None
+    else:
+        # non-string (e.g., None) -> ignore
+        return None
+
+    # Try a few likely formats
+    for fmt in ("%Y-%m-%d", "%Y-%m", "%Y"):
+        try:
+            dt = datetime.strptime(raw, fmt)
+            return dt.date().isoformat()  # 'YYYY-MM-DD'
+        except ValueError:
+            continue
+
+    # Unrecognized format: skip the field
+    return None
+
+
+def date_bound(value, end=False):
+    """
+    'YYYY-MM-DD' for a 'YYYY[-MM[-DD]]' date filter bound, as decision_date
+    is stored. A partial date starts its year / month; with end=True it is
+    extended to the last day of its year / month, like an inclusive bound.
+
+    Raises:
+        ValueError: if the date is malformed
+    """
+    if not value:
+        return None
+    normalized = normalize_decision_date(str(value).strip())
+    if normalized is None:
+        raise ValueError(f"invalid date '{value}'")
+    parts = str(value).strip().split("-")
+    if end and len(parts) == 1:
+        return f"{normalized[:4]}-12-31"
+    if end and len(parts) == 2:
+        year, month = int(normalized[:4]), int(normalized[5:7])
+        return f"{normalized[:7]}-{calendar.monthrange(year, month)[1]:02d}"
+    return normalized
+
+
+def date_key(value, end=False):
+    """
+    YYYYMMDD integer of date_bound(value, end)
+    """
+    bound = date_bound(value, end)
+    return int(bound.replace("-", "")) if bound else None
+
+
+def build_sections(head_matter, opinions):
+    """
+    Character offsets of head matter and each opinion within full_text.
+
+    Mirrors how normalize_case joins the parts (newline separated), so the
+    detail view can show a table of contents and fetch one section at a time.
+    """
+    sections = []
+    offset = 0
+    if head_matter:
+        sections.append({"type": "head_matter", "author": None, "start": 0, "end": len(head_matter)})
+        offset = len(head_matter) + 1
+
+    for op in opinions:
+        if "text" not in op:
+            continue
+        text = op.get("text", "")
+        sections.append({
+            "type": op.get("type") or "opinion",
+            "author": op.get("author"),
+            "start": offset,
+            "end": offset + len(text),
+        })
+        offset += len(text) + 1
+
+    return sections
+
+
+def normalize_case(case_data):
+    """
+    Build the normalized document from a single case JSON dict.
+    """
+    casebody = case_data.get("casebody", {})
+    opinions = casebody.get("opinions", [])
+    opinions_text = "\n".join(
+        [op.get("text", "") for op in opinions if "text" in op]
+    )
+    head_matter = casebody.get("head_matter", "")
+
+    if head_matter:
+        full_text = head_matter + "\n" + opinions_text
+    else:
+        full_text = opinions_text
+
+    parties = casebody.get("parties", [])
+    judges = casebody.get("judges", [])
+    analysis = case_data.get("analysis", {})
+    word_count = analysis.get("word_count", 0)
+    court = case_data.get("court", {})
+    jurisdiction = case_data.get("jurisdiction", {})
+
+    decision_date = normalize_decision_date(case_data.get("decision_date"))
+
+    doc = {
+        "id": case_data.get("id"),
+        "name": case_data.get("name"),
+        "decision_date": decision_date,
+        "court_name": court.get("name"),
+        "jurisdiction_name": jurisdiction.get("name"),
+        "parties": ", ".join(parties) if parties else "",
+        "judges": ", ".join(judges) if judges else "",
+        "word_count": word_count,
+        "head_matter": head_matter or "",
+        "full_text": full_text,
+        "rerank_text": full_text[:RERANK_TEXT_CHARS],
+        "sections": build_sections(head_matter, opinions),
+    }
+
+    return doc
+
+
+def is_case_member(name):
+    """
+    True for the per-case JSON files inside a case.law volume zip
+    """
+    return name.endswith(".json") and "json/" in name
+
+
+def iter_zip_paths(data_dir="data"):
+    """
+    Yield the volume zips under data_dir (data/<folder>/<volume>.zip), sorted
+    """
+    for folder_name in sorted(os.listdir(data_dir)):
+        folder_path = os.path.join(data_dir, folder_name)
+        if not os.path.isdir(folder_path):
+            continue
+
+        for zip_name in sorted(os.listdir(folder_path)):
+            if zip_name.endswith(".zip"):
+                yield os.path.join(folder_path, zip_name)
+
+
+def iter_zip_cases(zip_path):
+    """
+    Yield the raw case dicts of one volume zip, opening the archive once
+    """
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        for name in zip_ref.namelist():
+            if is_case_member(name):
+                with zip_ref.open(name) as f:
+                    yield json.load(f)
+
+
+def normalize_zip(zip_path):
+    """
+    Normalized documents of one volume zip (cases without an id are skipped).
+    Top-level so it can run in a multiprocessing pool.
+    """
+    docs = []
+    for case_data in iter_zip_cases(zip_path):
+        doc = normalize_case(case_data)
+        if doc["id"] is not None:
+            docs.append(doc)
+    return docs
+
+
+def iter_cases(data_dir="data"):
+    """
+    Yield every raw case dict under data_dir, one zip at a time
+    """
+    for zip_path in iter_zip_paths(data_dir):
+        yield from iter_zip_cases(zip_path)
+
+
+def collect_json_files(data_dir="data"):
+    """
+    Collect all (zip_path, json_filename) pairs in the corpus.
+    """
+    json_files_info = []
+    for zip_path in iter_zip_paths(data_dir):
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            for file_info in zip_ref.namelist():
+                if is_case_member(file_info):
+                    json_files_info.append((zip_path, file_info))
+
+    return json_files_info
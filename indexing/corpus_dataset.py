@@ -0,0 +1,211 @@
+"""
+Columnar cache of the normalized corpus (Parquet, via pyarrow)
+
+Converting the raw zips once means later indexing runs skip zip listing
+and JSON decoding and read only the columns they need.
+
+Layout of a dataset directory:
+    <folder>__<volume>.parquet - normalized cases of one volume zip (zstd)
+    manifest.json              - per zip: size, mtime, parquet file, case count
+
+The dataset is updated incrementally: only zips that are new or whose
+size/mtime changed are converted again, and files of removed zips are
+deleted. indexing.ingest reads from it automatically once it exists.
+
+Usage (from project root):
+    python -m indexing.corpus_dataset
+"""
+import os
+import json
+from multiprocessing import Pool
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from tqdm import tqdm
+
+from config import CORPUS_DATASET_DIR, INGEST_WORKERS
+from indexing.corpus import iter_zip_paths, normalize_zip
+
+MANIFEST_NAME = "manifest.json"
+
+# Cases per row group; projected reads stream one row group at a time
+ROW_GROUP_SIZE = 1024
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("name", pa.string()),
+    ("decision_date", pa.string()),
+    ("court_name", pa.string()),
+    ("jurisdiction_name", pa.string()),
+    ("parties", pa.string()),
+    ("judges", pa.string()),
+    ("word_count", pa.int64()),
+    ("head_matter", pa.string()),
+    ("full_text", pa.string()),
+    ("rerank_text", pa.string()),
+    ("sections", pa.list_(pa.struct([
+        ("type", pa.string()),
+        ("author", pa.string()),
+        ("start", pa.int64()),
+        ("end", pa.int64()),
+    ]))),
+]) if pa is not None else None
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The corpus dataset needs the pyarrow package (pip install pyarrow)")
+
+
+def load_manifest(dataset_dir=CORPUS_DATASET_DIR):
+    """
+    Read the dataset manifest, or None if the dataset has not been built
+    """
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def dataset_exists(dataset_dir=CORPUS_DATASET_DIR):
+    return pa is not None and load_manifest(dataset_dir) is not None
+
+
+def zip_signature(zip_path):
+    stat = os.stat(zip_path)
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+def write_volume(docs, output_path):
+    """
+    Write one volume's normalized documents to a Parquet file
+    """
+    table = pa.Table.from_pylist(docs, schema=SCHEMA)
+    # Write to a temp file first so an interrupted run leaves no partial file
+    tmp_path = output_path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, output_path)
+
+
+def sync_dataset(data_dir="data", dataset_dir=CORPUS_DATASET_DIR, workers=INGEST_WORKERS):
+    """
+    Bring the dataset up to date with the zips under data_dir
+
+    Args:
+        data_dir: Directory with the case.law zip folders
+        dataset_dir: Dataset directory (created if missing)
+        workers: Processes parsing zips in parallel
+
+    Returns:
+        The updated manifest
+    """
+    require_pyarrow()
+    os.makedirs(dataset_dir, exist_ok=True)
+    manifest = load_manifest(dataset_dir) or {"zips": {}}
+    entries = manifest["zips"]
+
+    zip_paths = list(iter_zip_paths(data_dir))
+    seen = set()
+    stale = []
+    for zip_path in zip_paths:
+        key = os.path.relpath(zip_path, data_dir).replace(os.sep, "/")
+        seen.add(key)
+        entry = entries.get(key)
+        signature = zip_signature(zip_path)
+        if entry is None or entry["size"] != signature["size"] or entry["mtime"] != signature["mtime"]:
+            stale.append((key, zip_path, signature))
+
+    if stale:
+        stale_paths = [zip_path for _, zip_path, _ in stale]
+        pool = Pool(workers) if workers > 1 and len(stale) > 1 else None
+        volumes = pool.imap(normalize_zip, stale_paths) if pool else map(normalize_zip, stale_paths)
+        try:
+            for (key, _, signature), docs in tqdm(
+                zip(stale, volumes), total=len(stale), desc="Converting zips to Parquet", unit="zip"
+            ):
+                file_name = key.replace("/", "__")[:-len(".zip")] + ".parquet"
+                write_volume(docs, os.path.join(dataset_dir, file_name))
+                entries[key] = {**signature, "file": file_name, "num_cases": len(docs)}
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+    removed = [key for key in entries if key not in seen]
+    for key in removed:
+        file_path = os.path.join(dataset_dir, entries.pop(key)["file"])
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    if stale or removed:
+        manifest["num_cases"] = sum(entry["num_cases"] for entry in entries.values())
+        with open(os.path.join(dataset_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"Corpus dataset: {len(stale)} zip(s) converted, {len(removed)} removed, "
+          f"{len(entries)} zip(s) in {dataset_dir}")
+    return manifest
+
+
+def iter_dataset_docs(dataset_dir=CORPUS_DATASET_DIR, columns=None, batch_size=ROW_GROUP_SIZE):
+    """
+    Yield normalized documents from the dataset, reading only `columns`
+
+    Args:
+        dataset_dir: Dataset directory
+        columns: Fields to read (None for all); 'id' is always included
+        batch_size: Rows decoded per batch
+
+    Yields:
+        dicts with the requested fields
+    """
+    require_pyarrow()
+    manifest = load_manifest(dataset_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No corpus dataset at {dataset_dir}; run python -m indexing.corpus_dataset")
+
+    if columns is not None and "id" not in columns:
+        columns = ["id"] + list(columns)
+
+    for key in sorted(manifest["zips"]):
+        parquet_file = pq.ParquetFile(os.path.join(dataset_dir, manifest["zips"][key]["file"]))
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield from batch.to_pylist()
+
+
+def read_volume(zip_path, data_dir="data", columns=None, dataset_dir=CORPUS_DATASET_DIR):
+    """
+    Normalized documents of one volume zip, from its Parquet file when the
+    dataset has an up-to-date copy, parsed from the zip otherwise
+
+    Args:
+        zip_path: Volume zip under data_dir
+        data_dir: Directory with the case.law zip folders
+        columns: Fields to read from Parquet (None for all)
+        dataset_dir: Dataset directory
+
+    Returns:
+        List of document dicts
+    """
+    manifest = load_manifest(dataset_dir) if pa is not None else None
+    if manifest is not None:
+        key = os.path.relpath(zip_path, data_dir).replace(os.sep, "/")
+        entry = manifest["zips"].get(key)
+        signature = zip_signature(zip_path)
+        if entry is not None and (entry["size"], entry["mtime"]) == (signature["size"], signature["mtime"]):
+            if columns is not None and "id" not in columns:
+                columns = ["id"] + list(columns)
+            table = pq.read_table(os.path.join(dataset_dir, entry["file"]), columns=columns)
+            return table.to_pylist()
+
+    return normalize_zip(zip_path)
+
+
+if __name__ == "__main__":
+    sync_dataset(data_dir="data")
@@ -3,20 +3,30 @@ Dense Vector Indexer using Legal-BERT
 Creates index with dense_vector field for semantic search
 """
 from elasticsearch import Elasticsearch
-import json
+from elasticsearch.helpers import BulkIndexError
 import os
-import zipfile
-from tqdm import tqdm
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import ES_PASSWORD, ES_HOST, ES_INDEX_DENSE, DENSE_VECTOR_DIM
+from config import (
+    ES_PASSWORD, ES_HOST, ES_INDEX_DENSE, DENSE_INDEX_FULL_TEXT,
+    DENSE_BATCH_SIZE, PIPELINE_QUEUE_SIZE, BULK_CHUNK_SIZE, BULK_THREAD_COUNT,
+)
 from models.dual_encoder import DualEncoder
+from models.projection import Projection
+from indexing.ingest import ingest
+from indexing.index_versions import create_versioned_index, publish_index
+from indexing.vector_options import dense_mapping, check_index_type
+from indexing.pipeline import Pipeline, Stage
+from indexing.bulk import BulkSender
 
 
 def create_dense_index():
     """
     Create dense vector index with dense_vector field
+
+    Returns:
+        (es client, name of the new physical index)
     """
     es = Elasticsearch(
         ES_HOST,
@@ -24,141 +34,140 @@ def create_dense_index():
         verify_certs=False
     )
 
-    mapping = {
-        "settings": {
-            "analysis": {
-                "analyzer": {
-                    "legal_text_analyzer": {
-                        "type": "custom",
-                        "tokenizer": "standard",
-                        "filter": [
-                            "lowercase",
-                            "english_stop",
-                            "english_stemmer"
-                        ]
-                    }
-                },
-                "filter": {
-                    "english_stop": {
-                        "type": "stop",
-                        "stopwords": "_english_"
-                    },
-                    "english_stemmer": {
-                        "type": "stemmer",
-                        "language": "english"
-                    }
-                }
-            }
-        },
-        "mappings": {
-            "properties": {
-                "id": {"type": "keyword"},
-                "name": {"type": "text"},
-                "decision_date": {"type": "keyword"},
-                "court_name": {"type": "text"},
-                "jurisdiction_name": {"type": "text"},
-                "parties": {"type": "text"},
-                "judges": {"type": "text"},
-                "word_count": {"type": "integer"},
-                "full_text": {
-                    "type": "text",
-                    "analyzer": "legal_text_analyzer"
-                },
-                "dense_vector": {
-                    "type": "dense_vector",
-                    "dims": DENSE_VECTOR_DIM,
-                    "index": True,
-                    "similarity": "cosine"
-                }
-            }
-        }
-    }
-
-    if es.indices.exists(index=ES_INDEX_DENSE):
-        print(f"Index {ES_INDEX_DENSE} already exists. Deleting...")
-        es.indices.delete(index=ES_INDEX_DENSE)
-
-    es.indices.create(index=ES_INDEX_DENSE, body=mapping)
-    print(f"Created index: {ES_INDEX_DENSE}")
-
-    return es
-
-
-def index_documents(es, encoder, data_dir="data", batch_size=8):
-    """
-    Index all documents with dense vectors
-    """
-    json_files_info = []
-    for folder_name in os.listdir(data_dir):
-        folder_path = os.path.join(data_dir, folder_name)
-        if os.path.isdir(folder_path):
-            for zip_name in os.listdir(folder_path):
-                if zip_name.endswith(".zip"):
-                    zip_path = os.path.join(folder_path, zip_name)
-                    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                        for file_info in zip_ref.namelist():
-                            if file_info.endswith(".json") and "json/" in file_info:
-                                json_files_info.append((zip_path, file_info))
-
-    print(f"Found {len(json_files_info)} documents to index")
-
-    batch_docs = []
-    batch_texts = []
-
-    for zip_path, json_filename in tqdm(json_files_info, desc="Indexing Dense Vector cases"):
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            with zip_ref.open(json_filename) as f:
-                case_data = json.load(f)
-
-        casebody = case_data.get("casebody", {})
-        opinions = casebody.get("opinions", [])
-        opinions_text = "\n".join([op.get("text", "") for op in opinions if "text" in op])
-        head_matter = casebody.get("head_matter", "")
-
-        if head_matter:
-            full_text = head_matter + "\n" + opinions_text
-        else:
-            full_text = opinions_text
-
-        parties = casebody.get("parties", [])
-        judges = casebody.get("judges", [])
-        analysis = case_data.get("analysis", {})
-        word_count = analysis.get("word_count", 0)
-        court = case_data.get("court", {})
-        jurisdiction = case_data.get("jurisdiction", {})
-
-        doc = {
-            "id": case_data.get("id"),
-            "name": case_data.get("name"),
-            "decision_date": case_data.get("decision_date"),
-            "court_name": court.get("name"),
-            "jurisdiction_name": jurisdiction.get("name"),
-            "parties": ", ".join(parties) if parties else "",
-            "judges": ", ".join(judges) if judges else "",
-            "word_count": word_count,
-            "full_text": full_text
-        }
-
-        batch_docs.append(doc)
-        batch_texts.append(full_text[:2000])  # Truncate for encoding
-
-        if len(batch_docs) >= batch_size:
-            embeddings = encoder.encode(batch_texts, batch_size=batch_size)
-
-            for doc, embedding in zip(batch_docs, embeddings):
-                doc["dense_vector"] = embedding.tolist()
-                es.index(index=ES_INDEX_DENSE, document=doc)
-
-            batch_docs = []
-            batch_texts = []
-
-    if batch_docs:
-        embeddings = encoder.encode(batch_texts, batch_size=batch_size)
-        for doc, embedding in zip(batch_docs, embeddings):
+    check_index_type(es)
+
+    # New physical version; the ES_INDEX_DENSE alias keeps serving the old one
+    index_name = create_versioned_index(es, ES_INDEX_DENSE, dense_mapping())
+
+    return es, index_name
+
+
+# Fields of the normalized case kept in the dense index
+DENSE_FIELDS = [
+    "id", "name", "decision_date", "court_name", "jurisdiction_name", "parties",
+    "judges", "word_count", "full_text", "rerank_text", "sections",
+]
+
+
+class DenseWriter:
+    columns = DENSE_FIELDS
+
+    def __init__(self, es, encoder, index_name=ES_INDEX_DENSE, alias=None, batch_size=DENSE_BATCH_SIZE,
+                 chunk_size=BULK_CHUNK_SIZE, thread_count=BULK_THREAD_COUNT, queue_size=PIPELINE_QUEUE_SIZE):
+        """
+        Embed normalized documents and bulk-index them with their vectors
+
+        Work is pipelined: add() groups documents into batches, then
+        tokenization, the model forward pass and bulk indexing each run in
+        their own thread with bounded queues in between, so the model is
+        never waiting on Elasticsearch (or the other way round). The index
+        stage hands chunks to a BulkSender, which keeps thread_count bulk
+        requests in flight.
+
+        Args:
+            es: Elasticsearch client
+            encoder: DualEncoder
+            index_name: Index to write to
+            alias: If given, index_name is a new physical version: on close it
+                   is finalized and the alias is swapped to it
+            batch_size: Documents per pipeline batch (split into forward
+                        passes under DENSE_MAX_BATCH_TOKENS)
+            chunk_size: Documents per bulk request
+            thread_count: Concurrent bulk requests
+            queue_size: Batches buffered between stages
+        """
+        self.es = es
+        self.encoder = encoder
+        self.projection = Projection.load_configured()
+        self.index_name = index_name
+        self.alias = alias
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.batch_docs = []
+        self.batch_texts = []
+        self.actions = []
+        self.count = 0
+        self.sender = BulkSender(es, chunk_size=chunk_size, thread_count=thread_count)
+        self.pipeline = Pipeline([
+            Stage("tokenize", self._tokenize),
+            Stage("encode", self._encode),
+            Stage("index", self._index, finish=self._flush_actions),
+        ], queue_size=queue_size)
+
+    def source(self, doc):
+        """
+        The indexed document for a normalized case (without its vector)
+        """
+        dense_doc = {field: doc.get(field) for field in DENSE_FIELDS}
+        if not DENSE_INDEX_FULL_TEXT:
+            del dense_doc["full_text"]  # Served from the local content store
+        return dense_doc
+
+    def add(self, doc):
+        self.batch_texts.append(doc["rerank_text"])  # Truncate for encoding
+        self.batch_docs.append(self.source(doc))
+
+        if len(self.batch_docs) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch_docs:
+            return
+        self.pipeline.put({"docs": self.batch_docs, "texts": self.batch_texts})
+        self.batch_docs = []
+        self.batch_texts = []
+
+    def _tokenize(self, batch):
+        # Length-sorted forward passes under the token budget
+        batch["encoded"] = self.encoder.tokenize_bulk(batch.pop("texts"))
+        return batch
+
+    def _encode(self, batch):
+        embeddings = self.encoder.embed_bulk(batch.pop("encoded"), len(batch["docs"]))
+        if self.projection is not None:
+            embeddings = self.projection.apply(embeddings)
+        for doc, embedding in zip(batch["docs"], embeddings):
             doc["dense_vector"] = embedding.tolist()
-            es.index(index=ES_INDEX_DENSE, document=doc)
+        return batch
+
+    def _index(self, batch):
+        self.actions.extend(
+            {"_index": self.index_name, "_id": doc["id"], "_source": doc}
+            for doc in batch["docs"]
+        )
+        if len(self.actions) >= self.chunk_size:
+            self._flush_actions()
+
+    def _flush_actions(self):
+        if not self.actions:
+            return
+        # Sent concurrently; retries of 429-rejected documents happen in the sender
+        self.sender.submit(self.actions)
+        self.actions = []
+
+    def close(self):
+        self.flush()
+        self.pipeline.close()
+        self.count, errors = self.sender.close()
+        print(f"Indexed {self.count} documents to {self.index_name}")
+        self.pipeline.report()
+        if errors:
+            print("Bulk indexing error; first error:", errors[0])
+            raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
+        if self.alias:
+            publish_index(self.es, self.index_name, self.alias, expected_count=self.sender.created)
+
+
+def index_documents(es, encoder, index_name, data_dir="data", batch_size=DENSE_BATCH_SIZE):
+    """
+    Index all documents with dense vectors into the new physical index,
+    then swap the ES_INDEX_DENSE alias to it
 
-    print(f"Indexed {len(json_files_info)} documents to {ES_INDEX_DENSE}")
+    To build the BM25 index in the same pass over the corpus, use
+    indexing.ingest instead.
+    """
+    ingest([DenseWriter(es, encoder, index_name, alias=ES_INDEX_DENSE, batch_size=batch_size)], data_dir=data_dir,
+           desc="Indexing Dense Vector cases")
 
 
 if __name__ == "__main__":
@@ -166,9 +175,9 @@ if __name__ == "__main__":
     encoder = DualEncoder()
 
     print("Creating dense vector index...")
-    es = create_dense_index()
+    es, index_name = create_dense_index()
 
     print("Indexing documents with dense vectors...")
-    index_documents(es, encoder)
+    index_documents(es, encoder, index_name)
 
     print("Done!")
@@ -0,0 +1,179 @@
+"""
+Embed the corpus into sharded, memory-mappable .npy files
+
+One shard per volume zip, spread across EMBED_WORKERS processes (each loads
+its own DualEncoder). A shard is written atomically and records the size and
+mtime of the zip it was embedded from, so a rerun embeds the volumes that are
+missing or whose zip changed since (e.g. after indexing.incremental) and
+keeps the rest.
+
+Layout of the output directory:
+    <folder>__<volume>.npy        - (n, 768) EMBEDDING_DTYPE vectors
+    <folder>__<volume>.meta.jsonl - one line per row: id and the dense-index
+                                    metadata fields (no full_text)
+    <folder>__<volume>.source.json - size / mtime of the source zip
+    manifest.json                 - model, dtype, dim and the shard list
+
+index_dense_from_file loads this directory into the dense index.
+
+Usage (from project root):
+    python -m indexing.embed_corpus
+"""
+import os
+import json
+from multiprocessing import Pool
+
+import numpy as np
+from tqdm import tqdm
+
+from config import (
+    DUAL_ENCODER_MODEL, DENSE_VECTOR_DIM, EMBEDDINGS_DIR, EMBEDDING_DTYPE, EMBED_WORKERS,
+)
+from indexing.corpus import iter_zip_paths
+from indexing.corpus_dataset import read_volume, zip_signature
+
+MANIFEST_NAME = "manifest.json"
+
+# Fields kept in the sidecar: what the dense index stores besides full_text
+META_FIELDS = [
+    "id", "name", "decision_date", "court_name", "jurisdiction_name", "parties",
+    "judges", "word_count", "rerank_text", "sections",
+]
+
+_encoder = None
+
+
+def shard_name(zip_path, data_dir):
+    key = os.path.relpath(zip_path, data_dir).replace(os.sep, "/")
+    return key.replace("/", "__")[:-len(".zip")]
+
+
+def shard_signature(output_dir, name):
+    """
+    Signature of the zip a finished shard was embedded from, None if the
+    shard is missing, unfinished or predates signatures
+    """
+    path = os.path.join(output_dir, name + ".source.json")
+    if not os.path.isfile(os.path.join(output_dir, name + ".npy")) or not os.path.isfile(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def shard_done(output_dir, name, signature):
+    # The source sidecar is written last, so it marks a finished shard
+    return shard_signature(output_dir, name) == signature
+
+
+def _init_worker(num_workers):
+    global _encoder
+    import torch
+    from models.dual_encoder import DualEncoder
+
+    # Split the cores between worker processes instead of oversubscribing
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // num_workers))
+    _encoder = DualEncoder()
+
+
+def embed_shard(task):
+    """
+    Embed one volume and write its shard (runs in a worker process)
+
+    Returns:
+        (shard name, number of vectors)
+    """
+    zip_path, data_dir, output_dir, dtype, signature = task
+    name = shard_name(zip_path, data_dir)
+    docs = read_volume(zip_path, data_dir, columns=META_FIELDS)
+
+    if docs:
+        vectors = _encoder.encode_bulk([doc["rerank_text"] or "" for doc in docs])
+    else:
+        vectors = np.empty((0, DENSE_VECTOR_DIM), dtype=np.float32)
+
+    meta_path = os.path.join(output_dir, name + ".meta.jsonl")
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        for doc in docs:
+            f.write(json.dumps({field: doc.get(field) for field in META_FIELDS}, ensure_ascii=False))
+            f.write("\n")
+    os.replace(meta_path + ".tmp", meta_path)
+
+    vectors_path = os.path.join(output_dir, name + ".npy")
+    with open(vectors_path + ".tmp", "wb") as f:
+        np.save(f, vectors.astype(dtype))
+    os.replace(vectors_path + ".tmp", vectors_path)
+
+    source_path = os.path.join(output_dir, name + ".source.json")
+    with open(source_path + ".tmp", "w") as f:
+        json.dump(signature, f)
+    os.replace(source_path + ".tmp", source_path)
+
+    return name, len(docs)
+
+
+def write_manifest(output_dir, shard_names, dtype):
+    shards = []
+    for name in shard_names:
+        vectors = np.load(os.path.join(output_dir, name + ".npy"), mmap_mode="r")
+        shards.append({
+            "name": name,
+            "num_vectors": int(vectors.shape[0]),
+            "source": shard_signature(output_dir, name),
+        })
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump({
+            "model": DUAL_ENCODER_MODEL,
+            "dim": DENSE_VECTOR_DIM,
+            "dtype": dtype,
+            "num_vectors": sum(shard["num_vectors"] for shard in shards),
+            "shards": shards,
+        }, f, indent=2)
+
+
+def embed_corpus(data_dir="data", output_dir=EMBEDDINGS_DIR, num_workers=EMBED_WORKERS, dtype=EMBEDDING_DTYPE):
+    """
+    Embed every volume without a finished shard for its current zip
+
+    Args:
+        data_dir: Directory with the case.law zip folders
+        output_dir: Shard directory (created if missing)
+        num_workers: Worker processes, each with its own model copy
+        dtype: 'float32' or 'float16'
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"dtype must be float32 or float16, got {dtype}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, "r") as f:
+            previous = json.load(f)
+        if previous["model"] != DUAL_ENCODER_MODEL or previous["dtype"] != dtype:
+            raise ValueError(
+                f"{output_dir} holds {previous['model']} / {previous['dtype']} embeddings; "
+                "use another output directory or remove it"
+            )
+
+    zip_paths = list(iter_zip_paths(data_dir))
+    names = [shard_name(zip_path, data_dir) for zip_path in zip_paths]
+    tasks = []
+    for zip_path, name in zip(zip_paths, names):
+        # Taken before embedding: a zip replaced mid-run is embedded again next time
+        signature = zip_signature(zip_path)
+        if not shard_done(output_dir, name, signature):
+            tasks.append((zip_path, data_dir, output_dir, dtype, signature))
+    print(f"{len(zip_paths) - len(tasks)} of {len(zip_paths)} shards already done; "
+          f"embedding {len(tasks)} with {num_workers} worker(s)")
+
+    if tasks:
+        with Pool(num_workers, initializer=_init_worker, initargs=(num_workers,)) as pool:
+            for _ in tqdm(pool.imap_unordered(embed_shard, tasks), total=len(tasks), desc="Embedding shards"):
+                pass
+
+    write_manifest(output_dir, names, dtype)
+    print(f"Wrote embeddings for {len(names)} shards to {output_dir}")
+
+
+if __name__ == "__main__":
+    embed_corpus()
@@ -0,0 +1,312 @@
+"""
+Incremental reindexing driven by a per-volume manifest
+
+The manifest records, for every volume zip, its SHA-256 and a digest of each
+case's embedded text (rerank_text). A run compares the zips under data/ with
+it and only touches volumes that are new, changed or removed: their cases
+are upserted (keyed by case id) and cases that disappeared are deleted, on
+the live indices. Deletes run after every volume has been upserted and skip
+cases still listed under some volume, so a case that moved between volumes
+is kept. Dense vectors of cases whose text did not change are
+copied from the dense (or combined) index instead of being re-embedded.
+
+The content store and token cache are rebuilt, not patched: after an
+update that changed volumes, rerun
+    python -m indexing.ingest content_store token_cache
+The same holds for the local vector store (DENSE_BACKEND=hnsw / binary),
+which is built from the embedding shards: the run marks it stale (see
+VectorStore), and it keeps serving deleted cases and missing new ones until
+    python -m indexing.embed_corpus && python -m indexing.build_vector_store
+
+Usage (from project root):
+    python -m indexing.incremental              # bm25 / dense / combined (indices that exist)
+    python -m indexing.incremental bm25
+    python -m indexing.incremental record       # only record the manifest, e.g.
+                                                # right after a full rebuild
+"""
+import os
+import sys
+import json
+import hashlib
+
+from tqdm import tqdm
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import streaming_bulk
+
+from config import (
+    ES_HOST, ES_PASSWORD, ES_INDEX_BM25, ES_INDEX_DENSE, ES_INDEX_COMBINED, DENSE_INDEX_FULL_TEXT,
+    INDEX_MANIFEST_PATH, VECTOR_STORE_DIR,
+    BULK_CHUNK_SIZE, BULK_MAX_RETRIES, BULK_INITIAL_BACKOFF,
+)
+from indexing.corpus import iter_zip_paths
+from indexing.corpus_dataset import read_volume, zip_signature
+from storage.vector_store import mark_stale
+
+import urllib3
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+TARGET_INDICES = {"bm25": ES_INDEX_BM25, "dense": ES_INDEX_DENSE, "combined": ES_INDEX_COMBINED}
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file, read in 1 MB blocks
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    return hashlib.md5((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+def load_manifest(path=INDEX_MANIFEST_PATH):
+    if not os.path.isfile(path):
+        return {"zips": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=INDEX_MANIFEST_PATH):
+    # Written after every volume, atomically, so an interrupted run resumes
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def plan_changes(data_dir, manifest):
+    """
+    Compare the zips under data_dir with the manifest
+
+    Zips whose size and mtime match the manifest are not re-hashed.
+
+    Returns:
+        (changed, removed): changed is a list of (key, zip_path, signature)
+        for new or modified volumes, removed a list of manifest keys
+    """
+    entries = manifest["zips"]
+    changed = []
+    seen = set()
+
+    for zip_path in iter_zip_paths(data_dir):
+        key = os.path.relpath(zip_path, data_dir).replace(os.sep, "/")
+        seen.add(key)
+        entry = entries.get(key)
+        signature = zip_signature(zip_path)
+        if entry and (entry["size"], entry["mtime"]) == (signature["size"], signature["mtime"]):
+            continue
+
+        signature["sha256"] = file_digest(zip_path)
+        if entry and entry["sha256"] == signature["sha256"]:
+            # Touched but identical: just remember the new mtime
+            entry.update(signature)
+            continue
+        changed.append((key, zip_path, signature))
+
+    removed = [key for key in entries if key not in seen]
+    return changed, removed
+
+
+class IncrementalIndexer:
+    def __init__(self, es, targets):
+        """
+        Apply volume-level changes to the live indices
+
+        Args:
+            es: Elasticsearch client
+            targets: Subset of ['bm25', 'dense', 'combined']
+        """
+        self.es = es
+        self.targets = targets
+        self.encoder = None
+        self.projection = None
+        self.stats = {"upserted": 0, "deleted": 0, "embedded": 0, "reused": 0}
+
+    def _bulk(self, actions):
+        for _ in streaming_bulk(
+            self.es, actions,
+            chunk_size=BULK_CHUNK_SIZE,
+            max_retries=BULK_MAX_RETRIES,
+            initial_backoff=BULK_INITIAL_BACKOFF,
+            ignore_status=404,  # deleting a case that is already gone is fine
+            request_timeout=300,
+        ):
+            pass
+
+    def _delete_actions(self, case_ids):
+        indices = [TARGET_INDICES[target] for target in self.targets]
+        return [
+            {"_op_type": "delete", "_index": index, "_id": case_id}
+            for index in indices for case_id in case_ids
+        ]
+
+    def _vectors(self, docs, old_cases, digests):
+        """
+        Vectors of a volume's cases {case id: vector}, reusing the stored
+        vectors of cases whose embedded text is unchanged
+        """
+        # The dense and combined indices hold the same vectors; read one of them
+        vector_index = ES_INDEX_DENSE if "dense" in self.targets else ES_INDEX_COMBINED
+
+        reuse_ids = [str(doc["id"]) for doc in docs if old_cases.get(str(doc["id"])) == digests[str(doc["id"])]]
+        vectors = {}
+        if reuse_ids:
+            response = self.es.mget(index=vector_index, ids=reuse_ids, source_includes=["dense_vector"])
+            vectors = {
+                entry["_id"]: entry["_source"]["dense_vector"]
+                for entry in response["docs"]
+                if entry.get("found") and entry["_source"].get("dense_vector")
+            }
+
+        missing = [doc for doc in docs if str(doc["id"]) not in vectors]
+        if missing:
+            if self.encoder is None:
+                from models.dual_encoder import DualEncoder
+                from models.projection import Projection
+                self.encoder = DualEncoder()
+                self.projection = Projection.load_configured()
+            embeddings = self.encoder.encode_bulk([doc["rerank_text"] or "" for doc in missing])
+            if self.projection is not None:
+                embeddings = self.projection.apply(embeddings)
+            for doc, embedding in zip(missing, embeddings):
+                vectors[str(doc["id"])] = embedding.tolist()
+
+        self.stats["reused"] += len(docs) - len(missing)
+        self.stats["embedded"] += len(missing)
+        return vectors
+
+    def _dense_docs(self, docs, vectors):
+        from indexing.dense_indexer import DENSE_FIELDS
+
+        dense_docs = []
+        for doc in docs:
+            dense_doc = {field: doc.get(field) for field in DENSE_FIELDS}
+            if not DENSE_INDEX_FULL_TEXT:
+                del dense_doc["full_text"]  # Served from the local content store
+            dense_doc["dense_vector"] = vectors[str(doc["id"])]
+            dense_docs.append(dense_doc)
+        return dense_docs
+
+    def apply_volume(self, zip_path, data_dir, old_entry):
+        """
+        Upsert a new or changed volume
+
+        Returns:
+            (the volume's new case digests {case id: digest},
+             ids of its cases that disappeared, to pass to delete_cases)
+        """
+        docs = read_volume(zip_path, data_dir)
+        digests = {str(doc["id"]): text_digest(doc["rerank_text"]) for doc in docs}
+        old_cases = old_entry["cases"] if old_entry else {}
+
+        actions = []
+        if "bm25" in self.targets:
+            actions.extend({"_index": ES_INDEX_BM25, "_id": doc["id"], "_source": doc} for doc in docs)
+        if "dense" in self.targets or "combined" in self.targets:
+            vectors = self._vectors(docs, old_cases, digests)
+        if "dense" in self.targets:
+            actions.extend(
+                {"_index": ES_INDEX_DENSE, "_id": doc["id"], "_source": doc}
+                for doc in self._dense_docs(docs, vectors)
+            )
+        if "combined" in self.targets:
+            actions.extend(
+                {"_index": ES_INDEX_COMBINED, "_id": doc["id"], "_source": dict(doc, dense_vector=vectors[str(doc["id"])])}
+                for doc in docs
+            )
+
+        self._bulk(actions)
+
+        self.stats["upserted"] += len(docs)
+        gone = [case_id for case_id in old_cases if case_id not in digests]
+        return digests, gone
+
+    def delete_cases(self, case_ids):
+        self._bulk(self._delete_actions(case_ids))
+        self.stats["deleted"] += len(case_ids)
+
+    def refresh(self):
+        for target in self.targets:
+            self.es.indices.refresh(index=TARGET_INDICES[target])
+
+
+def update_indices(es, targets, data_dir="data", manifest_path=INDEX_MANIFEST_PATH):
+    """
+    Bring the live indices (and the manifest) up to date with data_dir
+
+    Args:
+        es: Elasticsearch client
+        targets: Subset of ['bm25', 'dense', 'combined']; empty to only record the manifest
+        data_dir: Directory with the case.law zip folders
+        manifest_path: Manifest file
+    """
+    manifest = load_manifest(manifest_path)
+    changed, removed = plan_changes(data_dir, manifest)
+    print(f"{len(changed)} new or changed volume(s), {len(removed)} removed volume(s)")
+
+    # Cases that left their volume; kept in the manifest until deleted, so
+    # an interrupted run still deletes them when it resumes
+    pending = set(manifest.get("pending_deletes", []))
+
+    indexer = IncrementalIndexer(es, targets)
+    for key, zip_path, signature in tqdm(changed, desc="Updating volumes", unit="zip"):
+        old_entry = manifest["zips"].get(key)
+        if targets:
+            digests, gone = indexer.apply_volume(zip_path, data_dir, old_entry)
+            pending.update(gone)
+        else:
+            digests = {str(doc["id"]): text_digest(doc["rerank_text"]) for doc in read_volume(zip_path, data_dir)}
+        manifest["zips"][key] = {**signature, "cases": digests}
+        manifest["pending_deletes"] = sorted(pending)
+        save_manifest(manifest, manifest_path)
+
+    for key in removed:
+        if targets:
+            pending.update(manifest["zips"][key]["cases"])
+        del manifest["zips"][key]
+        manifest["pending_deletes"] = sorted(pending)
+        save_manifest(manifest, manifest_path)
+
+    # Only after every upsert: a case that moved to another volume is still listed there
+    if targets and pending:
+        listed = set()
+        for entry in manifest["zips"].values():
+            listed.update(entry["cases"])
+        indexer.delete_cases(sorted(pending - listed))
+    manifest["pending_deletes"] = []
+
+    # Also persists mtime-only updates from plan_changes
+    save_manifest(manifest, manifest_path)
+
+    if targets and (changed or removed):
+        indexer.refresh()
+        print("Updated indices: {upserted} upserted, {deleted} deleted, "
+              "{embedded} embedded, {reused} vectors reused".format(**indexer.stats))
+        print("Rebuild the content store / token cache if you use them: "
+              "python -m indexing.ingest content_store token_cache")
+        if mark_stale(VECTOR_STORE_DIR, f"{len(changed)} volume(s) changed, {len(removed)} removed "
+                                        f"by indexing.incremental"):
+            print(f"Marked the vector store at {VECTOR_STORE_DIR} stale; rebuild it: "
+                  "python -m indexing.embed_corpus && python -m indexing.build_vector_store")
+
+
+if __name__ == "__main__":
+    es = Elasticsearch(ES_HOST, basic_auth=("elastic", ES_PASSWORD), verify_certs=False, request_timeout=60)
+
+    args = sys.argv[1:]
+    if args == ["record"]:
+        targets = []
+    else:
+        targets = args or [name for name, index in TARGET_INDICES.items() if es.indices.exists(index=index)]
+        for name in targets:
+            if name not in TARGET_INDICES:
+                raise SystemExit(f"Unknown target '{name}', expected record or some of {list(TARGET_INDICES)}")
+            if not es.indices.exists(index=TARGET_INDICES[name]):
+                raise SystemExit(f"Index {TARGET_INDICES[name]} does not exist; build it first (python -m indexing.ingest)")
+
+    update_indices(es, targets, data_dir="data")
+    print("Done!")
@@ -5,7 +5,13 @@ Usage (from project root):
     .\venv\Scripts\Activate.ps1
     python -m indexing.index_dense_from_file
 
-Requires:
+Reads the sharded .npy embeddings from indexing.embed_corpus (EMBEDDINGS_DIR)
+when they exist. full_text then comes from the local content store (if
+DENSE_INDEX_FULL_TEXT is on), since the shards do not duplicate it. With
+DENSE_PROJECTION_DIM set, the reduced shards of indexing.reduce_embeddings
+are read instead.
+
+Otherwise (legacy format) requires:
     - embeddings.jsonl in the project root (from the GPU run)
       Each line should be a JSON object with at least:
         {
@@ -27,12 +33,23 @@ Requires:
 import json
 from pathlib import Path
 
+import numpy as np
 import urllib3
 from elasticsearch import Elasticsearch
 from elasticsearch.helpers import streaming_bulk
 from tqdm import tqdm
 
-from config import ES_HOST, ES_PASSWORD, ES_INDEX_DENSE, DENSE_VECTOR_DIM
+from config import (
+    ES_HOST, ES_PASSWORD, ES_INDEX_DENSE, DENSE_VECTOR_DIM, DENSE_INDEX_DIM, DENSE_PROJECTION_DIM,
+    RERANK_TEXT_CHARS, DENSE_INDEX_FULL_TEXT,
+    EMBEDDINGS_DIR, CONTENT_STORE_DIR,
+)
+from indexing.corpus import normalize_decision_date
+from indexing.index_versions import create_versioned_index, publish_index
+from indexing.vector_options import dense_mapping, check_index_type
+from indexing.reduce_embeddings import reduced_embeddings_dir
+from models.projection import Projection
+from storage.content_store import ContentStore
 
 # Silence insecure HTTPS warnings for local dev
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -41,12 +58,16 @@ EMBEDDINGS_PATH = Path("embeddings.jsonl")
 BATCH_SIZE = 500
 
 
-def create_dense_index() -> Elasticsearch:
+def create_dense_index():
     """
-    Create (or recreate) the dense-vector index used for semantic search.
+    Create a new physical version of the dense-vector index used for
+    semantic search. The ES_INDEX_DENSE alias keeps serving the current
+    version until publish_index swaps it.
+
+    Returns (es client, name of the new physical index).
 
-    This is intentionally duplicated here so we don't need to import
-    indexing.dense_indexer (which pulls in torch / DualEncoder).
+    The mapping is indexing.vector_options.dense_mapping, the same one
+    indexing.dense_indexer uses (without importing its torch / DualEncoder).
     """
     es = Elasticsearch(
         ES_HOST,
@@ -55,95 +76,22 @@ def create_dense_index() -> Elasticsearch:
         request_timeout=60,
     )
 
-    # Drop existing index if present (fresh rebuild)
-    if es.indices.exists(index=ES_INDEX_DENSE):
-        print(f"Deleting existing index: {ES_INDEX_DENSE}")
-        es.indices.delete(index=ES_INDEX_DENSE)
-
-    mapping = {
-        "settings": {
-            "analysis": {
-                "analyzer": {
-                    "legal_text_analyzer": {
-                        "type": "custom",
-                        "tokenizer": "standard",
-                        "filter": [
-                            "lowercase",
-                            "english_stop",
-                            "english_stemmer",
-                        ],
-                    }
-                },
-                "filter": {
-                    "english_stop": {
-                        "type": "stop",
-                        "stopwords": "_english_",
-                    },
-                    "english_stemmer": {
-                        "type": "stemmer",
-                        "language": "english",
-                    },
-                },
-            }
-        },
-        "mappings": {
-            "properties": {
-                "id": {"type": "integer"},
-                "name": {
-                    "type": "text",
-                    "analyzer": "legal_text_analyzer",
-                },
-                "decision_date": {"type": "date"},
-                "court_name": {
-                    "type": "text",
-                    "analyzer": "legal_text_analyzer",
-                },
-                "jurisdiction_name": {"type": "keyword"},
-                "parties": {
-                    "type": "text",
-                    "analyzer": "legal_text_analyzer",
-                },
-                "judges": {
-                    "type": "text",
-                    "analyzer": "legal_text_analyzer",
-                },
-                "word_count": {"type": "integer"},
-                "full_text": {
-                    "type": "text",
-                    "analyzer": "legal_text_analyzer",
-                },
-                "dense_vector": {
-                    "type": "dense_vector",
-                    "dims": DENSE_VECTOR_DIM,
-                    "index": True,
-                    "similarity": "cosine",
-                },
-            }
-        },
-    }
-
-    es.indices.create(index=ES_INDEX_DENSE, body=mapping)
-    # Optimize for bulk indexing: no replicas and infrequent refreshes
-    es.indices.put_settings(
-        index=ES_INDEX_DENSE,
-        body={
-            "index": {
-                "refresh_interval": "-1",
-                "number_of_replicas": 0,
-            }
-        },
-    )
-    print(f"Created dense index '{ES_INDEX_DENSE}'.")
-    return es
+    check_index_type(es)
 
+    # Created with bulk-load settings: no replicas and no refreshes
+    index_name = create_versioned_index(es, ES_INDEX_DENSE, dense_mapping())
+    return es, index_name
 
-def index_batch(es: Elasticsearch, actions, failed_docs) -> int:
+
+def index_batch(es: Elasticsearch, actions, failed_docs) -> tuple:
     """
     Index a single batch using streaming_bulk, but do NOT crash
     if some documents fail. Instead, record failures in failed_docs.
-    Returns number of successfully indexed docs in this batch.
+    Returns (successfully indexed docs, docs new to the index) for this
+    batch; the second leaves out overwrites of a repeated id.
     """
     success_count = 0
+    created_count = 0
 
     # streaming_bulk consumes the iterable, so we pass a list directly
     for ok, result in streaming_bulk(
@@ -155,6 +103,7 @@ def index_batch(es: Elasticsearch, actions, failed_docs) -> int:
     ):
         if ok:
             success_count += 1
+            created_count += next(iter(result.values())).get("result") == "created"
         else:
             # result looks like {"index": {"_index": ..., "_id": ..., "status": ..., "error": {...}}}
             action, info = next(iter(result.items()))
@@ -162,26 +111,100 @@ def index_batch(es: Elasticsearch, actions, failed_docs) -> int:
             error = info.get("error")
             failed_docs.append({"id": doc_id, "error": error})
 
-    return success_count
+    return success_count, created_count
+
+
+def iter_shard_records(embeddings_dir: Path):
+    """
+    Yield (metadata, vector) pairs from the sharded embeddings directory.
+    Vectors are memory-mapped, so each shard is read once, row by row.
+    """
+    with (embeddings_dir / "manifest.json").open("r") as f:
+        manifest = json.load(f)
+    if manifest["dim"] != DENSE_INDEX_DIM:
+        raise ValueError(f"Embeddings have dim {manifest['dim']}, index expects {DENSE_INDEX_DIM}")
+
+    for shard in manifest["shards"]:
+        vectors = np.load(embeddings_dir / f"{shard['name']}.npy", mmap_mode="r")
+        with (embeddings_dir / f"{shard['name']}.meta.jsonl").open("r", encoding="utf-8") as f:
+            for row, line in enumerate(f):
+                yield json.loads(line), vectors[row]
+
+
+def index_from_shards(es: Elasticsearch, index_name: str, embeddings_dir: Path) -> int:
+    """
+    Bulk index the sharded .npy embeddings written by indexing.embed_corpus
+
+    Returns the number of documents created in the index.
+    """
+    content_store = ContentStore.open_if_exists(CONTENT_STORE_DIR) if DENSE_INDEX_FULL_TEXT else None
+    if DENSE_INDEX_FULL_TEXT and content_store is None:
+        print("Warning: no content store found; indexing without full_text")
+
+    actions = []
+    total_indexed = 0
+    total_created = 0
+    failed_docs = []
+
+    for meta, vector in tqdm(iter_shard_records(embeddings_dir), desc="Indexing dense embeddings"):
+        source = dict(meta)
+        source["dense_vector"] = vector.astype(np.float32).tolist()
+        if content_store is not None:
+            full_text = content_store.get_text(meta["id"])
+            if full_text is not None:
+                source["full_text"] = full_text
+
+        actions.append({"_index": index_name, "_id": meta["id"], "_source": source})
+        if len(actions) >= BATCH_SIZE:
+            indexed, created = index_batch(es, actions, failed_docs)
+            total_indexed += indexed
+            total_created += created
+            actions = []
+
+    if actions:
+        indexed, created = index_batch(es, actions, failed_docs)
+        total_indexed += indexed
+        total_created += created
+
+    print(f"Successfully indexed {total_indexed} documents into '{index_name}'.")
+    if failed_docs:
+        print(f"{len(failed_docs)} document(s) failed to index.")
+        for entry in failed_docs[:5]:
+            print(f"- Failed id={entry['id']}, error={entry['error']}")
+    return total_created
 
 
 def main() -> None:
+    embeddings_dir = Path(EMBEDDINGS_DIR)
+    if DENSE_PROJECTION_DIM:
+        # Reduced shards written by indexing.reduce_embeddings
+        embeddings_dir = Path(reduced_embeddings_dir(DENSE_PROJECTION_DIM))
+    if (embeddings_dir / "manifest.json").is_file():
+        print("Creating dense vector index via create_dense_index()...")
+        es, index_name = create_dense_index()
+        print(f"Indexing sharded embeddings from {embeddings_dir}...")
+        created = index_from_shards(es, index_name, embeddings_dir)
+        publish_index(es, index_name, ES_INDEX_DENSE, expected_count=created)
+        return
+
     # 1. Sanity check: make sure embeddings file exists
     if not EMBEDDINGS_PATH.is_file():
         raise FileNotFoundError(
-            f"{EMBEDDINGS_PATH} not found. Make sure embeddings.jsonl "
-            f"is in the project root."
+            f"{EMBEDDINGS_PATH} not found. Run python -m indexing.embed_corpus "
+            f"or put embeddings.jsonl in the project root."
         )
 
     # 2. (Re)create the dense index using our local helper
     print("Creating dense vector index via create_dense_index()...")
-    es = create_dense_index()
-    print(f"Index '{ES_INDEX_DENSE}' is ready.")
+    es, index_name = create_dense_index()
+    print(f"Index '{index_name}' is ready.")
 
     # 3. Stream embeddings.jsonl and bulk index in batches
     print(f"Indexing documents from {EMBEDDINGS_PATH}...")
+    projection = Projection.load_configured()
     actions = []
     total_indexed = 0
+    total_created = 0
     failed_docs = []
 
     with EMBEDDINGS_PATH.open("r", encoding="utf-8") as f:
@@ -197,37 +220,50 @@ def main() -> None:
             if not isinstance(dv, list) or len(dv) != DENSE_VECTOR_DIM:
                 # Skip malformed entries
                 continue
+            if projection is not None:
+                dv = projection.apply(dv).tolist()
 
             doc_id = record["id"]
 
+            source = {
+                "id": doc_id,
+                "name": record.get("name"),
+                "decision_date": normalize_decision_date(record.get("decision_date")),
+                "court_name": record.get("court_name"),
+                "jurisdiction_name": record.get("jurisdiction_name"),
+                "parties": record.get("parties"),
+                "judges": record.get("judges"),
+                "word_count": record.get("word_count"),
+                "full_text": record.get("full_text"),
+                "rerank_text": (record.get("full_text") or "")[:RERANK_TEXT_CHARS],
+                "dense_vector": dv,
+            }
+            if record.get("sections"):
+                source["sections"] = record["sections"]
+            if not DENSE_INDEX_FULL_TEXT:
+                del source["full_text"]  # Served from the local content store
+
             actions.append(
                 {
-                    "_index": ES_INDEX_DENSE,
+                    "_index": index_name,
                     "_id": doc_id,  # stable id in ES
-                    "_source": {
-                        "id": doc_id,
-                        "name": record.get("name"),
-                        "decision_date": record.get("decision_date"),
-                        "court_name": record.get("court_name"),
-                        "jurisdiction_name": record.get("jurisdiction_name"),
-                        "parties": record.get("parties"),
-                        "judges": record.get("judges"),
-                        "word_count": record.get("word_count"),
-                        "full_text": record.get("full_text"),
-                        "dense_vector": dv,
-                    },
+                    "_source": source,
                 }
             )
 
             if len(actions) >= BATCH_SIZE:
-                total_indexed += index_batch(es, actions, failed_docs)
+                indexed, created = index_batch(es, actions, failed_docs)
+                total_indexed += indexed
+                total_created += created
                 actions = []
 
         # Flush any remaining docs
         if actions:
-            total_indexed += index_batch(es, actions, failed_docs)
+            indexed, created = index_batch(es, actions, failed_docs)
+            total_indexed += indexed
+            total_created += created
 
-    print(f"Successfully indexed {total_indexed} documents into '{ES_INDEX_DENSE}'.")
+    print(f"Successfully indexed {total_indexed} documents into '{index_name}'.")
 
     if failed_docs:
         print(f"{len(failed_docs)} document(s) failed to index.")
@@ -235,18 +271,8 @@ def main() -> None:
         for entry in failed_docs[:5]:
             print(f"- Failed id={entry['id']}, error={entry['error']}")
 
-    # 4. Restore normal index settings after heavy indexing
-    es.indices.put_settings(
-        index=ES_INDEX_DENSE,
-        body={
-            "index": {
-                "refresh_interval": "1s",
-                # If you want replicas for robustness later, add:
-                # "number_of_replicas": 1,
-            }
-        },
-    )
-    print("Dense index settings updated (refresh_interval=1s). Done.")
+    # 4. Force-merge, restore refresh/replicas and swap the alias to the new index
+    publish_index(es, index_name, ES_INDEX_DENSE, expected_count=total_created)
 
 
 if __name__ == "__main__":
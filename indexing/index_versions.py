@@ -0,0 +1,224 @@
+"""
+Versioned physical indices behind the aliases named in config.py
+
+A rebuild creates a new physical index (e.g. pa_law_cases_v7) with
+bulk-load settings while searches keep hitting the alias. When loading is
+done the index is refreshed, force-merged and given its replicas, and the
+alias is moved to it in one atomic update_aliases call. If the new index
+fails a post-swap check (the alias must reach it and return the number of
+documents the writer created, and not far fewer than the previous version)
+the alias is moved back.
+
+Swapping changes the physical index behind the alias, which changes the
+index generation (cache.index_generation), so ETags and cached search
+results keyed on it are invalidated.
+
+Usage (from project root):
+    python -m indexing.index_versions list
+    python -m indexing.index_versions rollback bm25|dense|combined
+"""
+import re
+import sys
+
+from elasticsearch import Elasticsearch, NotFoundError
+
+from config import (
+    ES_HOST, ES_PASSWORD, ES_INDEX_BM25, ES_INDEX_DENSE, ES_INDEX_COMBINED, ES_NUMBER_OF_REPLICAS,
+    ES_KEEP_INDEX_VERSIONS, ES_SWAP_MAX_SHRINK,
+)
+
+import urllib3
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+ALIASES = {"bm25": ES_INDEX_BM25, "dense": ES_INDEX_DENSE, "combined": ES_INDEX_COMBINED}
+
+# Applied while bulk loading, replaced by finalize_index
+BULK_LOAD_SETTINGS = {"number_of_replicas": 0, "refresh_interval": "-1"}
+
+
+def list_versions(es, alias):
+    """
+    Physical indices of an alias, as sorted [(version, index name)]
+    """
+    pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    try:
+        names = es.indices.get(index=f"{alias}_v*")
+    except NotFoundError:
+        return []
+    versions = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            versions.append((int(match.group(1)), name))
+    return sorted(versions)
+
+
+def current_indices(es, alias):
+    """
+    Physical indices the alias points to now (empty if it is not an alias)
+    """
+    try:
+        return sorted(es.indices.get_alias(name=alias))
+    except NotFoundError:
+        return []
+
+
+def create_versioned_index(es, alias, body):
+    """
+    Create the next physical index for alias with bulk-load settings
+
+    Args:
+        es: Elasticsearch client
+        alias: Alias name from config.py
+        body: Index settings + mappings
+
+    Returns:
+        Name of the new physical index
+    """
+    versions = list_versions(es, alias)
+    index_name = f"{alias}_v{versions[-1][0] + 1 if versions else 1}"
+
+    body = dict(body)
+    body["settings"] = {**body.get("settings", {}), **BULK_LOAD_SETTINGS}
+    es.indices.create(index=index_name, body=body)
+    print(f"Created index: {index_name} (alias {alias} still on {current_indices(es, alias) or 'nothing'})")
+    return index_name
+
+
+def finalize_index(es, index_name, replicas=ES_NUMBER_OF_REPLICAS):
+    """
+    Make a bulk-loaded index ready for search: refresh, force-merge to one
+    segment, restore refresh interval and replicas
+    """
+    client = es.options(request_timeout=3600)
+    client.indices.refresh(index=index_name)
+    client.indices.forcemerge(index=index_name, max_num_segments=1, wait_for_completion=True)
+    client.indices.put_settings(
+        index=index_name,
+        body={"index": {"refresh_interval": "1s", "number_of_replicas": replicas}}
+    )
+    # Yellow is the best a single-node cluster can reach with replicas
+    client.cluster.health(index=index_name, wait_for_status="yellow", timeout="10m")
+    print(f"Finalized index: {index_name} (force-merged, {replicas} replica(s))")
+
+
+def point_alias(es, alias, index_name):
+    """
+    Atomically move alias to index_name
+
+    A concrete index that still carries the alias name (from before indices
+    were versioned) is deleted in the same call.
+    """
+    current = current_indices(es, alias)
+    actions = [{"remove": {"index": name, "alias": alias}} for name in current]
+    actions.append({"add": {"index": index_name, "alias": alias}})
+    if not current and es.indices.exists(index=alias):
+        print(f"Warning: deleting unversioned index {alias} to replace it with an alias")
+        actions.append({"remove_index": {"index": alias}})
+    es.indices.update_aliases(actions=actions)
+
+
+def verify_alias(es, alias, index_name, expected_count=None, previous=None, max_shrink=ES_SWAP_MAX_SHRINK):
+    """
+    Check that searches through the alias reach the new index and that it
+    holds what was loaded
+
+    Args:
+        es: Elasticsearch client
+        alias: Alias name from config.py
+        index_name: Physical index the alias was just moved to
+        expected_count: Documents the writer created (None to skip)
+        previous: Physical index the alias pointed to before (None if none)
+        max_shrink: Largest allowed drop in count relative to previous
+
+    Raises:
+        RuntimeError: if any check fails
+    """
+    current = current_indices(es, alias)
+    if current != [index_name]:
+        raise RuntimeError(f"{alias} points to {current or 'nothing'}, not {index_name}")
+
+    actual = es.count(index=alias)["count"]
+    if expected_count is not None and actual != expected_count:
+        raise RuntimeError(f"{alias} returns {actual} documents, the writer created {expected_count}")
+    if previous:
+        before = es.count(index=previous)["count"]
+        if actual < before * (1 - max_shrink):
+            raise RuntimeError(
+                f"{alias} returns {actual} documents, down from {before} in {previous} "
+                f"(more than {max_shrink:.0%} fewer)"
+            )
+    es.search(index=alias, size=1, query={"match_all": {}})
+
+
+def swap_alias(es, alias, index_name, expected_count=None, keep=ES_KEEP_INDEX_VERSIONS):
+    """
+    Point alias at index_name, roll back if the check fails, then delete
+    versions beyond the newest `keep`
+
+    Args:
+        es: Elasticsearch client
+        alias: Alias name from config.py
+        index_name: Finalized physical index
+        expected_count: Documents the writer created, checked through the alias
+        keep: Physical versions to keep (current + previous for rollback)
+    """
+    previous = current_indices(es, alias)
+    point_alias(es, alias, index_name)
+    try:
+        verify_alias(es, alias, index_name, expected_count=expected_count,
+                     previous=previous[0] if previous else None)
+    except Exception:
+        if previous:
+            print(f"Check failed, moving {alias} back to {previous[0]}")
+            point_alias(es, alias, previous[0])
+        raise
+    print(f"Alias {alias} -> {index_name} (was {previous or 'none'})")
+
+    for _, old_name in list_versions(es, alias)[:-keep]:
+        if old_name != index_name:
+            es.indices.delete(index=old_name)
+            print(f"Deleted old index: {old_name}")
+
+
+def publish_index(es, index_name, alias, expected_count=None):
+    """
+    Finalize a freshly loaded index and swap the alias to it
+
+    Args:
+        expected_count: Documents the writer created (distinct ids), the
+                        count the alias must return after the swap
+    """
+    finalize_index(es, index_name)
+    swap_alias(es, alias, index_name, expected_count=expected_count)
+
+
+def rollback(es, alias):
+    """
+    Move alias back to the newest version older than the current one
+    """
+    current = current_indices(es, alias)
+    versions = list_versions(es, alias)
+    live = [version for version, name in versions if name in current]
+    older = [name for version, name in versions if live and version < min(live)]
+    if not older:
+        raise RuntimeError(f"No older version of {alias} to roll back to")
+
+    point_alias(es, alias, older[-1])
+    print(f"Alias {alias} rolled back: {current} -> {older[-1]}")
+
+
+if __name__ == "__main__":
+    es = Elasticsearch(ES_HOST, basic_auth=("elastic", ES_PASSWORD), verify_certs=False, request_timeout=60)
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "list":
+        for name, alias in ALIASES.items():
+            current = current_indices(es, alias)
+            print(f"{name}: alias {alias} -> {current or 'not an alias'}")
+            for version, index_name in list_versions(es, alias):
+                print(f"    v{version}: {index_name}{'  (live)' if index_name in current else ''}")
+    elif command == "rollback" and len(sys.argv) == 3 and sys.argv[2] in ALIASES:
+        rollback(es, ALIASES[sys.argv[2]])
+    else:
+        raise SystemExit("Usage: python -m indexing.index_versions list | rollback bm25|dense|combined")
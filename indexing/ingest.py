@@ -0,0 +1,147 @@
+"""
+Single-pass ingestion: read and normalize each case once, fan out to every writer
+
+A writer is any object with add(doc) and close(): BM25Writer, DenseWriter,
+CombinedWriter, ContentStoreWriter and TokenCacheBuilder. A full rebuild with several
+writers reads and JSON-decodes the corpus once instead of once per index.
+
+Once the Parquet corpus dataset exists (python -m indexing.corpus_dataset),
+documents are read from it instead of the zips, limited to the columns the
+writers declare in their `columns` attribute (None means every field).
+
+Usage (from project root):
+    python -m indexing.ingest                          # bm25 + content_store
+    python -m indexing.ingest bm25 dense content_store token_cache
+    python -m indexing.ingest combined content_store   # one index for BM25 + vectors
+"""
+import sys
+from multiprocessing import Pool
+
+from tqdm import tqdm
+
+from config import CORPUS_DATASET_DIR, INGEST_WORKERS
+from indexing.corpus import iter_zip_paths, normalize_zip
+from indexing.corpus_dataset import dataset_exists, sync_dataset, iter_dataset_docs
+
+WRITER_NAMES = ["bm25", "dense", "combined", "content_store", "token_cache"]
+DEFAULT_WRITERS = ["bm25", "content_store"]
+
+
+def required_columns(writers):
+    """
+    Union of the fields the writers read, or None if any needs every field
+    """
+    columns = ["id"]
+    for writer in writers:
+        writer_columns = getattr(writer, "columns", None)
+        if writer_columns is None:
+            return None
+        columns.extend(column for column in writer_columns if column not in columns)
+    return columns
+
+
+def iter_docs(data_dir="data", columns=None, dataset_dir=CORPUS_DATASET_DIR, workers=INGEST_WORKERS):
+    """
+    Yield normalized documents, from the Parquet dataset when it has been
+    built (after syncing it with data_dir), from the raw zips otherwise.
+    Zips are parsed one per task in a pool of `workers` processes, in order.
+    """
+    if dataset_exists(dataset_dir):
+        sync_dataset(data_dir, dataset_dir, workers=workers)
+        yield from iter_dataset_docs(dataset_dir, columns=columns)
+        return
+
+    zip_paths = list(iter_zip_paths(data_dir))
+    if workers <= 1 or len(zip_paths) <= 1:
+        for zip_path in zip_paths:
+            yield from normalize_zip(zip_path)
+        return
+
+    with Pool(workers) as pool:
+        for docs in pool.imap(normalize_zip, zip_paths):
+            yield from docs
+
+
+def ingest(writers, data_dir="data", desc="Ingesting cases", workers=INGEST_WORKERS):
+    """
+    Feed every case under data_dir to each writer, then close them
+
+    Args:
+        writers: Objects with add(doc) and close(); they receive the same
+                 normalized doc and must not modify it
+        data_dir: Directory with the case.law zip folders
+        desc: Progress bar label
+        workers: Processes parsing zips in parallel
+
+    Returns:
+        Number of cases ingested
+    """
+    count = 0
+    for doc in tqdm(iter_docs(data_dir, columns=required_columns(writers), workers=workers), desc=desc, unit="case"):
+        for writer in writers:
+            writer.add(doc)
+        count += 1
+
+    for writer in writers:
+        writer.close()
+
+    print(f"Ingested {count} cases into {len(writers)} writer(s)")
+    return count
+
+
+def load_encoder():
+    from models.dual_encoder import DualEncoder
+    print("Loading dual encoder model...")
+    return DualEncoder()
+
+
+def build_writers(names):
+    """
+    Create the writers for the given names, creating a new version of each
+    ES index; its alias is swapped to it when the writer is closed
+
+    Imports are local so e.g. a BM25-only run does not load the dense encoder.
+    """
+    writers = []
+    encoder = None  # shared by the dense and combined writers
+    for name in names:
+        if name == "bm25":
+            from config import ES_INDEX_BM25
+            from indexing.bm25_indexer import create_bm25_index, BM25Writer
+            print("Creating BM25 index...")
+            es, index_name = create_bm25_index()
+            writers.append(BM25Writer(es, index_name, alias=ES_INDEX_BM25))
+        elif name == "dense":
+            from config import ES_INDEX_DENSE
+            from indexing.dense_indexer import create_dense_index, DenseWriter
+            encoder = encoder or load_encoder()
+            print("Creating dense vector index...")
+            es, index_name = create_dense_index()
+            writers.append(DenseWriter(es, encoder, index_name, alias=ES_INDEX_DENSE))
+        elif name == "combined":
+            from config import ES_INDEX_COMBINED
+            from indexing.combined_indexer import create_combined_index, CombinedWriter
+            encoder = encoder or load_encoder()
+            print("Creating combined index...")
+            es, index_name = create_combined_index()
+            writers.append(CombinedWriter(es, encoder, index_name, alias=ES_INDEX_COMBINED))
+        elif name == "content_store":
+            from config import CONTENT_STORE_DIR
+            from storage.content_store import ContentStoreWriter
+            writers.append(ContentStoreWriter(CONTENT_STORE_DIR))
+        elif name == "token_cache":
+            from indexing.pretokenize import TokenCacheBuilder
+            writers.append(TokenCacheBuilder())
+        else:
+            raise ValueError(f"Unknown writer '{name}', expected one of {WRITER_NAMES}")
+    return writers
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or DEFAULT_WRITERS
+    writers = build_writers(names)
+
+    print(f"Ingesting corpus into: {', '.join(names)}")
+    ingest(writers, data_dir="data")
+
+    print("Done!")
@@ -0,0 +1,128 @@
+"""
+Threaded producer/consumer pipeline with bounded queues and per-stage timing
+
+Each stage runs in its own thread and passes batches (dicts with a 'docs'
+list) to the next stage through a bounded queue, so a slow stage applies
+backpressure instead of letting work pile up in memory. Tokenizers, torch
+and network I/O release the GIL, so the stages genuinely overlap.
+"""
+import time
+import queue
+import threading
+
+STOP = object()
+
+
+class Stage:
+    def __init__(self, name, func, finish=None):
+        """
+        One pipeline stage
+
+        Args:
+            name: Label used in the throughput report
+            func: Called with each batch; its return value goes to the next stage
+            finish: Called once after the last batch (e.g. to flush a buffer)
+        """
+        self.name = name
+        self.func = func
+        self.finish = finish
+        self.docs = 0
+        self.busy = 0.0
+        self.idle = 0.0
+
+
+class Pipeline:
+    def __init__(self, stages, queue_size=8):
+        """
+        Start a thread per stage
+
+        Args:
+            stages: List of Stage, in order
+            queue_size: Batches buffered in front of each stage
+        """
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.failure = None
+        self.blocked = 0.0  # time the producer waited on a full first queue
+        self.start_time = time.monotonic()
+        self.threads = [
+            threading.Thread(target=self._run, args=(i,), daemon=True)
+            for i in range(len(stages))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, batch):
+        """
+        Hand a batch to the first stage (blocks while it is backed up)
+        """
+        start = time.monotonic()
+        self._put(self.queues[0], batch)
+        self.blocked += time.monotonic() - start
+
+    def _put(self, target, item):
+        # Time out periodically so a failed stage surfaces instead of blocking forever
+        while True:
+            if self.failure is not None:
+                raise RuntimeError("Pipeline stage failed") from self.failure
+            try:
+                target.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self, index):
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        try:
+            while True:
+                start = time.monotonic()
+                batch = inbox.get()
+                stage.idle += time.monotonic() - start
+                if batch is STOP:
+                    break
+
+                start = time.monotonic()
+                result = stage.func(batch)
+                stage.busy += time.monotonic() - start
+                stage.docs += len(batch["docs"])
+                if outbox is not None and result is not None:
+                    self._put(outbox, result)
+
+            if stage.finish is not None:
+                start = time.monotonic()
+                stage.finish()
+                stage.busy += time.monotonic() - start
+        except Exception as e:
+            if self.failure is None:
+                self.failure = e
+            return
+
+        if outbox is not None:
+            self._put(outbox, STOP)
+
+    def close(self):
+        """
+        Drain every stage and wait for the threads; re-raises a stage failure
+        """
+        self._put(self.queues[0], STOP)
+        for thread in self.threads:
+            # A failed stage stops consuming, so do not wait on the others forever
+            while thread.is_alive() and self.failure is None:
+                thread.join(timeout=1)
+        if self.failure is not None:
+            raise RuntimeError("Pipeline stage failed") from self.failure
+
+    def report(self):
+        """
+        Print per-stage throughput; the stage with the least idle time is
+        the bottleneck
+        """
+        elapsed = time.monotonic() - self.start_time
+        print(f"Pipeline finished in {elapsed:.1f}s "
+              f"(producer blocked on a full queue for {self.blocked:.1f}s)")
+        for stage in self.stages:
+            rate = stage.docs / stage.busy if stage.busy > 0 else 0.0
+            print(f"  {stage.name:<10} {stage.docs} docs, busy {stage.busy:.1f}s "
+                  f"({rate:.0f} docs/sec while busy), idle {stage.idle:.1f}s")
@@ -0,0 +1,80 @@
+"""
+Pre-tokenize every case's rerank_text with the cross-encoder tokenizer
+
+Writes a memory-mapped token cache (see models/token_cache.py) that
+CrossEncoder reads at request time, so tokenization leaves the rerank
+hot path.
+
+Usage (from project root):
+    python -m indexing.pretokenize
+"""
+from transformers import AutoTokenizer
+
+from config import CROSS_ENCODER_MODEL, TOKEN_CACHE_DIR
+from indexing.ingest import ingest
+from models.token_cache import TokenCacheWriter
+
+
+class TokenCacheBuilder:
+    columns = ["id", "rerank_text"]
+
+    def __init__(self, output_dir=TOKEN_CACHE_DIR, batch_size=256, max_doc_tokens=512):
+        """
+        Tokenize normalized documents' rerank_text into a token cache
+
+        Args:
+            output_dir: Token cache directory
+            batch_size: Texts per tokenizer call (fast tokenizers batch in Rust)
+            max_doc_tokens: Tokens kept per document (cross-encoder max length)
+        """
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.max_doc_tokens = max_doc_tokens
+        self.tokenizer = AutoTokenizer.from_pretrained(CROSS_ENCODER_MODEL)
+        self.writer = TokenCacheWriter(output_dir, CROSS_ENCODER_MODEL, max_doc_tokens)
+        self.batch_ids = []
+        self.batch_texts = []
+
+    def add(self, doc):
+        self.batch_ids.append(doc["id"])
+        self.batch_texts.append(doc["rerank_text"])
+        if len(self.batch_texts) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch_texts:
+            return
+        encoded = self.tokenizer(
+            self.batch_texts,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=self.max_doc_tokens
+        )
+        for case_id, token_ids in zip(self.batch_ids, encoded["input_ids"]):
+            self.writer.add(case_id, token_ids)
+        self.batch_ids = []
+        self.batch_texts = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        print(f"Wrote token cache for {self.writer.meta['num_docs']} documents "
+              f"({self.writer.meta['num_tokens']} tokens) to {self.output_dir}")
+
+
+def build_token_cache(data_dir="data", output_dir=TOKEN_CACHE_DIR, batch_size=256, max_doc_tokens=512):
+    """
+    Tokenize rerank_text for all cases under data_dir into a token cache
+
+    Args:
+        data_dir: Directory with the case.law zip folders
+        output_dir: Token cache directory
+        batch_size: Texts per tokenizer call (fast tokenizers batch in Rust)
+        max_doc_tokens: Tokens kept per document (cross-encoder max length)
+    """
+    builder = TokenCacheBuilder(output_dir, batch_size=batch_size, max_doc_tokens=max_doc_tokens)
+    ingest([builder], data_dir=data_dir, desc="Tokenizing cases")
+
+
+if __name__ == "__main__":
+    build_token_cache()
@@ -0,0 +1,276 @@
+"""
+Fit a PCA projection on the corpus embeddings and write reduced shards
+
+Reads the full-dimension shards of indexing.embed_corpus (EMBEDDINGS_DIR),
+fits a PCA on a sample of them and saves it to projection_<dim>.npz
+(models.projection), then writes every shard projected to <dim> dimensions
+to EMBEDDINGS_DIR_<dim>d, same layout. A projection that reduced shards, the
+vector store or an index already depend on is not refitted without --force. Finally it reports recall@k of
+exact search in the reduced space against exact search at full dimension,
+for the same queries.
+
+To index the reduced vectors, set DENSE_PROJECTION_DIM=<dim> (for indexing
+and the API) and run python -m indexing.index_dense_from_file.
+
+Usage (from project root):
+    python -m indexing.reduce_embeddings 256 [--force]            # fit, write shards, report
+    python -m indexing.reduce_embeddings report 256 [queries.txt] # report for the saved projection
+"""
+import os
+import sys
+import json
+import shutil
+
+import numpy as np
+from tqdm import tqdm
+
+from config import (
+    ES_HOST, ES_PASSWORD, ES_INDEX_DENSE, ES_INDEX_COMBINED,
+    DUAL_ENCODER_MODEL, DENSE_VECTOR_DIM, EMBEDDINGS_DIR, VECTOR_STORE_DIR, TOP_K_RERANK,
+)
+from indexing.embed_corpus import MANIFEST_NAME
+
+# Vectors sampled across all shards to fit the PCA
+PCA_SAMPLE_SIZE = 100000
+BLOCK_ROWS = 65536
+
+
+def reduced_embeddings_dir(dim, embeddings_dir=EMBEDDINGS_DIR):
+    return f"{embeddings_dir}_{dim}d"
+
+
+def load_manifest(embeddings_dir):
+    path = os.path.join(embeddings_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"{path} not found; run python -m indexing.embed_corpus first")
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def iter_shard_vectors(embeddings_dir, manifest):
+    """
+    Yield the memory-mapped (n, d) matrix of every shard, in manifest order
+    """
+    for shard in manifest["shards"]:
+        yield shard["name"], np.load(os.path.join(embeddings_dir, shard["name"] + ".npy"), mmap_mode="r")
+
+
+def sample_vectors(embeddings_dir, manifest, size=PCA_SAMPLE_SIZE, seed=0):
+    """
+    Uniform random sample of rows across all shards, as float64
+    """
+    total = manifest["num_vectors"]
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(total, size=min(size, total), replace=False))
+
+    sample = []
+    offset = 0
+    for _, vectors in iter_shard_vectors(embeddings_dir, manifest):
+        local = rows[(rows >= offset) & (rows < offset + len(vectors))] - offset
+        if len(local):
+            sample.append(np.asarray(vectors[local], dtype=np.float64))
+        offset += len(vectors)
+    return np.concatenate(sample)
+
+
+def fit_projection(sample, dim):
+    """
+    PCA via the eigendecomposition of the sample covariance
+
+    Returns:
+        (mean, components (dim, d), explained_variance_ratio (dim,))
+    """
+    # Cosine similarity is what the index uses, so fit on unit vectors
+    sample = sample / np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+    mean = sample.mean(axis=0)
+    centered = sample - mean
+    covariance = centered.T @ centered / (len(sample) - 1)
+
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    order = np.argsort(eigenvalues)[::-1][:dim]
+    components = eigenvectors[:, order].T
+    ratio = eigenvalues[order] / eigenvalues.sum()
+    return mean, components, ratio
+
+
+def projection_dependents(dim):
+    """
+    What was built with the saved projection_<dim>.npz: reduced shards, the
+    vector store, or dense / combined indices with <dim>-d vectors
+
+    Returns:
+        list of descriptions (empty if nothing depends on it)
+    """
+    dependents = []
+    if os.path.isfile(os.path.join(reduced_embeddings_dir(dim), MANIFEST_NAME)):
+        dependents.append(f"reduced shards in {reduced_embeddings_dir(dim)}")
+
+    store_manifest = os.path.join(VECTOR_STORE_DIR, "manifest.json")
+    if os.path.isfile(store_manifest):
+        with open(store_manifest, "r") as f:
+            if json.load(f).get("projection_dim") == dim:
+                dependents.append(f"vector store in {VECTOR_STORE_DIR}")
+
+    try:
+        from elasticsearch import Elasticsearch
+        es = Elasticsearch(ES_HOST, basic_auth=("elastic", ES_PASSWORD), verify_certs=False, request_timeout=10)
+        for alias in (ES_INDEX_DENSE, ES_INDEX_COMBINED):
+            if not es.indices.exists(index=alias):
+                continue
+            for name, mapping in es.indices.get_mapping(index=alias).items():
+                if mapping["mappings"]["properties"].get("dense_vector", {}).get("dims") == dim:
+                    dependents.append(f"index {name} ({dim}-d vectors)")
+    except Exception as e:
+        print(f"Warning: could not check the Elasticsearch indices ({e})")
+    return dependents
+
+
+def save_projection(mean, components, ratio, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(
+            f,
+            mean=mean.astype(np.float32),
+            components=components.astype(np.float32),
+            explained_variance_ratio=ratio,
+            model=np.array(DUAL_ENCODER_MODEL),
+        )
+    os.replace(path + ".tmp", path)
+
+
+def write_reduced_shards(embeddings_dir, manifest, projection, output_dir, projection_file):
+    """
+    Project every shard and write it to output_dir (same layout, reduced dim)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    dtype = manifest["dtype"]
+
+    for name, vectors in tqdm(iter_shard_vectors(embeddings_dir, manifest), total=len(manifest["shards"]),
+                              desc="Writing reduced shards"):
+        reduced = np.empty((len(vectors), projection.dim), dtype=dtype)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            reduced[start:start + BLOCK_ROWS] = projection.apply(vectors[start:start + BLOCK_ROWS])
+
+        vectors_path = os.path.join(output_dir, name + ".npy")
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, reduced)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        shutil.copyfile(os.path.join(embeddings_dir, name + ".meta.jsonl"),
+                        os.path.join(output_dir, name + ".meta.jsonl"))
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump(dict(manifest, dim=projection.dim, source_dim=manifest["dim"],
+                       projection=projection_file), f, indent=2)
+
+
+def exact_top_k(embeddings_dir, manifest, queries, k, projection=None):
+    """
+    Exact cosine top-k rows for each query, scanning every shard in blocks
+
+    Args:
+        queries: (q, d) unit query vectors, already projected if projection is given
+        projection: Applied to the corpus vectors on the fly
+
+    Returns:
+        (q, k) int64 array of global row numbers, best first
+    """
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+    offset = 0
+
+    for _, vectors in iter_shard_vectors(embeddings_dir, manifest):
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            if projection is not None:
+                block = projection.apply(block)  # also normalizes
+            else:
+                block = block / np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+
+            scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(
+                np.arange(offset + start, offset + start + len(block)), (len(queries), len(block))
+            )], axis=1)
+            keep = np.argpartition(-scores, min(k, scores.shape[1] - 1), axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_rows = np.take_along_axis(rows, keep, axis=1)
+        offset += len(vectors)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_rows, order, axis=1)
+
+
+def recall_report(embeddings_dir, manifest, projection, queries, ks=(10, TOP_K_RERANK)):
+    """
+    Print recall@k of reduced-dimension search against full-dimension search
+    """
+    from models.dual_encoder import DualEncoder
+
+    print(f"Encoding {len(queries)} queries...")
+    full_queries = DualEncoder().encode_queries(queries).astype(np.float32)
+    full_queries /= np.maximum(np.linalg.norm(full_queries, axis=1, keepdims=True), 1e-12)
+
+    k = max(ks)
+    print("Exact search at full dimension...")
+    truth = exact_top_k(embeddings_dir, manifest, full_queries, k)
+    print(f"Exact search at {projection.dim} dimensions...")
+    reduced = exact_top_k(embeddings_dir, manifest, projection.apply(full_queries), k, projection=projection)
+
+    print(f"\n{projection.dim} of {DENSE_VECTOR_DIM} dims, "
+          f"{projection.explained_variance_ratio.sum():.1%} of variance kept, "
+          f"vectors {manifest['num_vectors'] * projection.dim * 4 / 1e6:.0f} MB "
+          f"instead of {manifest['num_vectors'] * DENSE_VECTOR_DIM * 4 / 1e6:.0f} MB (float32)")
+    for at in ks:
+        hits = [len(set(r[:at]) & set(t[:at])) / at for r, t in zip(reduced, truth)]
+        print(f"  recall@{at}: {np.mean(hits):.3f} (min {np.min(hits):.2f}) over {len(queries)} queries")
+
+
+def read_queries(path=None):
+    if path is None:
+        from indexing.vector_variants import DEFAULT_QUERIES
+        return DEFAULT_QUERIES
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    from models.projection import Projection, projection_path
+
+    usage = "Usage: python -m indexing.reduce_embeddings <dim> [--force] | report <dim> [queries.txt]"
+    args = [arg for arg in sys.argv[1:] if arg != "--force"]
+    force = "--force" in sys.argv[1:]
+    if not args or (args[0] == "report" and len(args) < 2):
+        raise SystemExit(usage)
+
+    manifest = load_manifest(EMBEDDINGS_DIR)
+    if manifest["dim"] != DENSE_VECTOR_DIM:
+        raise SystemExit(f"{EMBEDDINGS_DIR} holds {manifest['dim']}-d vectors, expected full {DENSE_VECTOR_DIM}-d")
+
+    if args[0] == "report":
+        projection = Projection(projection_path(int(args[1])))
+        recall_report(EMBEDDINGS_DIR, manifest, projection, read_queries(args[2] if len(args) > 2 else None))
+    else:
+        dim = int(args[0])
+        if not 0 < dim < DENSE_VECTOR_DIM:
+            raise SystemExit(f"dim must be between 1 and {DENSE_VECTOR_DIM - 1}")
+
+        path = projection_path(dim)
+        if os.path.isfile(path) and not force:
+            dependents = projection_dependents(dim)
+            if dependents:
+                raise SystemExit(
+                    f"{path} is in use by: {', '.join(dependents)}. Refitting would no longer match "
+                    f"their vectors; rerun with --force and rebuild them."
+                )
+
+        print(f"Fitting PCA ({DENSE_VECTOR_DIM} -> {dim}) on up to {PCA_SAMPLE_SIZE} vectors...")
+        mean, components, ratio = fit_projection(sample_vectors(EMBEDDINGS_DIR, manifest), dim)
+        save_projection(mean, components, ratio, path)
+        print(f"Saved projection to {path} ({ratio.sum():.1%} of variance kept)")
+
+        projection = Projection(path)
+        output_dir = reduced_embeddings_dir(dim)
+        write_reduced_shards(EMBEDDINGS_DIR, manifest, projection, output_dir, path)
+        print(f"Wrote {dim}-d shards to {output_dir}")
+
+        recall_report(EMBEDDINGS_DIR, manifest, projection, read_queries())
+        print(f"\nTo index them: DENSE_PROJECTION_DIM={dim} python -m indexing.index_dense_from_file")
@@ -0,0 +1,105 @@
+"""
+Dense index mapping (dense_mapping, shared by every dense index builder),
+its dense_vector field and the HNSW variants it can be indexed with
+
+    hnsw       float32 vectors (~3 KB per 768-d vector)
+    int8_hnsw  scalar-quantized to 1 byte per dimension, ~4x smaller (ES 8.12+)
+    int4_hnsw  half a byte per dimension, ~8x smaller (ES 8.15+)
+    bbq_hnsw   better binary quantization, 1 bit per dimension (ES 8.16+)
+
+Quantized indices keep the original float vectors on disk, so the searcher
+can rescore an oversampled candidate set exactly (see DENSE_RESCORE_OVERSAMPLE).
+"""
+from config import DENSE_INDEX_DIM, DENSE_VECTOR_INDEX_TYPE
+
+# Index type -> first Elasticsearch version that supports it
+INDEX_TYPES = {
+    "hnsw": (8, 0),
+    "int8_hnsw": (8, 12),
+    "int4_hnsw": (8, 15),
+    "bbq_hnsw": (8, 16),
+}
+
+
+def dense_vector_mapping(index_type=DENSE_VECTOR_INDEX_TYPE):
+    """
+    Mapping of the dense_vector field for the given HNSW variant
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown dense vector index type '{index_type}', expected one of {list(INDEX_TYPES)}")
+
+    return {
+        "type": "dense_vector",
+        "dims": DENSE_INDEX_DIM,  # reduced when DENSE_PROJECTION_DIM is set
+        "index": True,
+        "similarity": "cosine",
+        # Explicit, since newer ES versions default to int8_hnsw
+        "index_options": {"type": index_type},
+    }
+
+
+def dense_mapping(index_type=DENSE_VECTOR_INDEX_TYPE):
+    """
+    Settings and mappings of the dense index, shared by indexing.dense_indexer
+    and indexing.index_dense_from_file so both build the same field types
+    (id and decision_date are keywords, which the searchers rely on)
+    """
+    return {
+        "settings": {
+            "analysis": {
+                "analyzer": {
+                    "legal_text_analyzer": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": [
+                            "lowercase",
+                            "english_stop",
+                            "english_stemmer"
+                        ]
+                    }
+                },
+                "filter": {
+                    "english_stop": {
+                        "type": "stop",
+                        "stopwords": "_english_"
+                    },
+                    "english_stemmer": {
+                        "type": "stemmer",
+                        "language": "english"
+                    }
+                }
+            }
+        },
+        "mappings": {
+            "properties": {
+                "id": {"type": "keyword"},
+                "name": {"type": "text"},
+                "decision_date": {"type": "keyword"},
+                "court_name": {"type": "text"},
+                "jurisdiction_name": {"type": "text"},
+                "parties": {"type": "text"},
+                "judges": {"type": "text"},
+                "word_count": {"type": "integer"},
+                "full_text": {
+                    "type": "text",
+                    "analyzer": "legal_text_analyzer"
+                },
+                "rerank_text": {"type": "text", "index": False},
+                "sections": {"type": "object", "enabled": False},
+                "dense_vector": dense_vector_mapping(index_type)
+            }
+        }
+    }
+
+
+def check_index_type(es, index_type=DENSE_VECTOR_INDEX_TYPE):
+    """
+    Fail early if the cluster is too old for the requested index type
+    """
+    number = es.info()["version"]["number"]
+    version = tuple(int(part) for part in number.split("-")[0].split(".")[:2])
+    required = INDEX_TYPES[index_type]
+    if version < required:
+        raise ValueError(
+            f"{index_type} needs Elasticsearch {required[0]}.{required[1]}+, cluster is {number}"
+        )
@@ -0,0 +1,215 @@
+"""
+Compare quantized HNSW variants of the dense index against float32
+
+build copies the live dense index (ES_INDEX_DENSE) into one side index per
+quantized type with the reindex API, so nothing is re-embedded. compare
+runs the same queries against the live index and every side index, with
+and without rescoring, and reports recall against exact (brute-force)
+cosine search, latency and the estimated vector memory.
+
+To switch the live index to a variant, set DENSE_VECTOR_INDEX_TYPE and
+rebuild it (python -m indexing.ingest dense, or indexing.index_dense_from_file).
+
+Usage (from project root):
+    python -m indexing.vector_variants build [int8_hnsw int4_hnsw bbq_hnsw]
+    python -m indexing.vector_variants compare [queries.txt]
+    python -m indexing.vector_variants drop
+"""
+import sys
+import time
+
+import numpy as np
+from elasticsearch import Elasticsearch
+
+from config import (
+    ES_HOST, ES_PASSWORD, ES_INDEX_DENSE, DENSE_INDEX_DIM, DENSE_RESCORE_OVERSAMPLE, TOP_K_RERANK,
+)
+from indexing.index_versions import BULK_LOAD_SETTINGS, finalize_index
+from indexing.vector_options import INDEX_TYPES, dense_vector_mapping, check_index_type
+
+import urllib3
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+QUANTIZED_TYPES = ["int8_hnsw", "int4_hnsw", "bbq_hnsw"]
+
+# Bytes per vector held in memory for the HNSW search (graph links excluded)
+VECTOR_BYTES = {
+    "hnsw": 4 * DENSE_INDEX_DIM,
+    "int8_hnsw": DENSE_INDEX_DIM + 4,
+    "int4_hnsw": DENSE_INDEX_DIM // 2 + 4,
+    "bbq_hnsw": DENSE_INDEX_DIM // 8 + 14,
+}
+
+# Used when no queries file is given
+DEFAULT_QUERIES = [
+    "contract formation requirements",
+    "breach of contract damages",
+    "murder first degree premeditation",
+    "search and seizure without a warrant",
+    "negligence duty of care",
+    "strict liability for defective products",
+    "custody of minor children",
+    "adverse possession of land",
+    "workers compensation benefits",
+    "ineffective assistance of counsel",
+    "zoning variance hardship",
+    "statute of limitations tolling",
+    "medical malpractice expert testimony",
+    "wrongful death action",
+    "insurance policy exclusion interpretation",
+    "sufficiency of the evidence for conviction",
+    "termination of parental rights",
+    "unemployment compensation willful misconduct",
+    "libel and defamation",
+    "eminent domain just compensation",
+]
+
+
+def variant_name(index_type):
+    return f"{ES_INDEX_DENSE}_{index_type}"
+
+
+def build_variant(es, index_type):
+    """
+    Copy the live dense index into a side index using index_type
+    """
+    check_index_type(es, index_type)
+    name = variant_name(index_type)
+    if es.indices.exists(index=name):
+        es.indices.delete(index=name)
+
+    # Same settings and mapping as the live index, except the vector field
+    source_name, mapping = next(iter(es.indices.get_mapping(index=ES_INDEX_DENSE).items()))
+    settings = es.indices.get_settings(index=ES_INDEX_DENSE)[source_name]["settings"]["index"]
+    properties = dict(mapping["mappings"]["properties"])
+    properties["dense_vector"] = dense_vector_mapping(index_type)
+
+    body = {"mappings": {"properties": properties}, "settings": dict(BULK_LOAD_SETTINGS)}
+    if "analysis" in settings:
+        body["settings"]["analysis"] = settings["analysis"]
+    es.indices.create(index=name, body=body)
+
+    task = es.reindex(source={"index": ES_INDEX_DENSE}, dest={"index": name}, wait_for_completion=False)
+    while True:
+        status = es.tasks.get(task_id=task["task"])
+        done = status["task"]["status"]
+        print(f"\r{name}: {done['created']}/{done['total']} documents copied", end="", flush=True)
+        if status["completed"]:
+            break
+        time.sleep(5)
+    print()
+    if status.get("error") or status.get("response", {}).get("failures"):
+        raise RuntimeError(f"Reindex into {name} failed: {status.get('error') or status['response']['failures'][:3]}")
+
+    # Force-merged like the live index, so latencies are comparable
+    finalize_index(es, name, replicas=0)
+
+
+def exact_top_k(es, searcher, query_vector, k):
+    """
+    Exact cosine top-k over the float vectors of the live index (brute force)
+    """
+    knn_filter = searcher.build_knn_query(query_vector, k=k)["knn"]["filter"]
+    response = es.search(index=ES_INDEX_DENSE, body={
+        "size": k,
+        "_source": False,
+        "query": {
+            "script_score": {
+                "query": {"bool": {"filter": knn_filter}},
+                "script": {
+                    "source": "cosineSimilarity(params.query_vector, 'dense_vector') + 1.0",
+                    "params": {"query_vector": query_vector}
+                }
+            }
+        }
+    }, request_timeout=300)
+    return [hit["_id"] for hit in response["hits"]["hits"]]
+
+
+def run_variant(es, searcher, index_name, oversample, query_vectors, k):
+    """
+    Returns (list of result id lists, list of latencies in ms)
+    """
+    searcher.index_name = index_name
+    searcher.oversample = oversample
+
+    def search(vector):
+        body = searcher.build_knn_query(vector, k=k, num_candidates=k * 2)
+        body["_source"] = False
+        return es.search(index=index_name, body=body, request_cache=False)
+
+    search(query_vectors[0])  # warm up
+    results, latencies = [], []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        response = search(vector)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([hit["_id"] for hit in response["hits"]["hits"]])
+    return results, latencies
+
+
+def recall(results, truth, k):
+    return float(np.mean([len(set(r[:k]) & set(t[:k])) / max(1, len(t[:k])) for r, t in zip(results, truth)]))
+
+
+def compare(es, queries, k=TOP_K_RERANK):
+    """
+    Print recall@10 / recall@k against exact search, latency and the
+    estimated vector memory of the live index and every built variant
+    """
+    from search.dense_searcher import DenseSearcher
+
+    searcher = DenseSearcher(es_client=es)
+    print(f"Encoding {len(queries)} queries...")
+    query_vectors = [vector.tolist() for vector in searcher.encode_queries(queries)]
+
+    print("Computing exact top-k (brute force)...")
+    truth = [exact_top_k(es, searcher, vector, k) for vector in query_vectors]
+    num_docs = es.count(index=ES_INDEX_DENSE)["count"]
+
+    _, live_mapping = next(iter(es.indices.get_mapping(index=ES_INDEX_DENSE).items()))
+    live_vector = live_mapping["mappings"]["properties"]["dense_vector"]
+    live_type = live_vector.get("index_options", {}).get("type", "hnsw")
+
+    runs = [(f"{live_type} (live)", ES_INDEX_DENSE, live_type, 1.0)]
+    for index_type in QUANTIZED_TYPES:
+        if es.indices.exists(index=variant_name(index_type)):
+            runs.append((index_type, variant_name(index_type), index_type, 1.0))
+            runs.append((f"{index_type} + rescore x{DENSE_RESCORE_OVERSAMPLE:g}", variant_name(index_type),
+                         index_type, DENSE_RESCORE_OVERSAMPLE))
+
+    print(f"\n{len(queries)} queries, k={k}, {num_docs} documents")
+    print(f"{'variant':<32} {'recall@10':>9} {f'recall@{k}':>9} {'mean ms':>8} {'p95 ms':>8} {'vectors MB':>11}")
+    for label, index_name, index_type, oversample in runs:
+        results, latencies = run_variant(es, searcher, index_name, oversample, query_vectors, k)
+        memory = num_docs * VECTOR_BYTES.get(index_type, VECTOR_BYTES["hnsw"]) / 1e6
+        print(f"{label:<32} {recall(results, truth, 10):>9.3f} {recall(results, truth, k):>9.3f} "
+              f"{np.mean(latencies):>8.1f} {np.percentile(latencies, 95):>8.1f} {memory:>11.0f}")
+
+
+if __name__ == "__main__":
+    es = Elasticsearch(ES_HOST, basic_auth=("elastic", ES_PASSWORD), verify_certs=False, request_timeout=60)
+    command = sys.argv[1] if len(sys.argv) > 1 else "compare"
+
+    if command == "build":
+        for index_type in sys.argv[2:] or QUANTIZED_TYPES:
+            if index_type not in INDEX_TYPES or index_type == "hnsw":
+                raise SystemExit(f"Unknown quantized type '{index_type}', expected some of {QUANTIZED_TYPES}")
+            try:
+                build_variant(es, index_type)
+            except ValueError as e:
+                print(f"Skipping {index_type}: {e}")
+    elif command == "compare":
+        if len(sys.argv) > 2:
+            with open(sys.argv[2], "r", encoding="utf-8") as f:
+                queries = [line.strip() for line in f if line.strip()]
+        else:
+            queries = DEFAULT_QUERIES
+        compare(es, queries)
+    elif command == "drop":
+        for index_type in QUANTIZED_TYPES:
+            if es.indices.exists(index=variant_name(index_type)):
+                es.indices.delete(index=variant_name(index_type))
+                print(f"Deleted {variant_name(index_type)}")
+    else:
+        raise SystemExit("Usage: python -m indexing.vector_variants build [types] | compare [queries.txt] | drop")
@@ -9,18 +9,24 @@ except OSError as e:
     torch = None
     TORCH_IMPORT_ERROR = e
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from config import CROSS_ENCODER_MODEL
+from config import CROSS_ENCODER_MODEL, TOKEN_CACHE_DIR
+from models.token_cache import TokenCache
+from cache.score_cache import get_default_score_cache
 import numpy as np
 
 
 class CrossEncoder:
-    def __init__(self, model_name=CROSS_ENCODER_MODEL, device=None):
+    def __init__(self, model_name=CROSS_ENCODER_MODEL, device=None, token_cache=None, score_cache=None):
         """
         Initialize cross-encoder model for reranking
 
         Args:
             model_name: HuggingFace model name
             device: 'cuda' or 'cpu', auto-detect if None
+            token_cache: TokenCache of pre-tokenized case texts; opened from
+                         TOKEN_CACHE_DIR if None and one exists for this model
+            score_cache: ScoreCache for (query, case id) scores; the
+                         process-wide cache if None
         """
         if TORCH_IMPORT_ERROR is not None:
             raise RuntimeError(
@@ -32,10 +38,17 @@ class CrossEncoder:
         print(f"Loading cross-encoder model: {model_name}")
         print(f"Using device: {self.device}")
 
+        self.model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModelForSequenceClassification.from_pretrained(model_name).to(self.device)
         self.model.eval()
 
+        self.token_cache = token_cache or TokenCache.open_if_exists(TOKEN_CACHE_DIR, model_name)
+        if self.token_cache is not None:
+            print(f"Using token cache with {len(self.token_cache)} documents")
+
+        self.score_cache = score_cache or get_default_score_cache()
+
     def predict(self, query_doc_pairs, batch_size=16, max_length=512):
         """
         Compute relevance scores for query-document pairs
@@ -65,16 +78,165 @@ class CrossEncoder:
                 return_tensors='pt'
             ).to(self.device)
 
-            with torch.no_grad():
-                outputs = self.model(**encoded)
-                scores = outputs.logits.squeeze(-1)
+            all_scores.append(self._forward(encoded))
+
+        all_scores = np.concatenate(all_scores)
+        return all_scores
+
+    def predict_token_ids(self, token_id_pairs, batch_size=16, max_length=512):
+        """
+        Compute relevance scores for already tokenized query-document pairs.
+        Only special tokens, truncation and padding are applied here.
+
+        Args:
+            token_id_pairs: List of (query_token_ids, document_token_ids) tuples,
+                            both without special tokens
+            batch_size: Batch size for prediction
+            max_length: Max token length
+
+        Returns:
+            numpy array of relevance scores
+        """
+        all_scores = []
 
-            all_scores.append(scores.cpu().numpy())
+        for i in range(0, len(token_id_pairs), batch_size):
+            features = [
+                self.tokenizer.prepare_for_model(
+                    query_ids,
+                    doc_ids,
+                    truncation='longest_first',
+                    max_length=max_length
+                )
+                for query_ids, doc_ids in token_id_pairs[i:i + batch_size]
+            ]
+
+            encoded = self.tokenizer.pad(features, return_tensors='pt').to(self.device)
+
+            all_scores.append(self._forward(encoded))
 
         all_scores = np.concatenate(all_scores)
         return all_scores
 
-    def rerank(self, query, documents, batch_size=16):
+    def _forward(self, encoded):
+        """
+        Run the model on an encoded batch and return scores as numpy
+        """
+        with torch.no_grad():
+            outputs = self.model(**encoded)
+            scores = outputs.logits.squeeze(-1)
+
+        return scores.cpu().numpy()
+
+    def _document_token_ids(self, documents, doc_ids, max_length=512):
+        """
+        Token ids for each document: read from the token cache where possible,
+        the rest tokenized in one batched tokenizer call
+
+        Returns:
+            List of token id lists (without special tokens)
+        """
+        token_ids = [None] * len(documents)
+        missing = []
+
+        for i, doc_id in enumerate(doc_ids):
+            cached = self.token_cache.get(doc_id) if doc_id is not None else None
+            if cached is not None:
+                token_ids[i] = cached.tolist()
+            else:
+                missing.append(i)
+
+        if missing:
+            encoded = self.tokenizer(
+                [documents[i] for i in missing],
+                add_special_tokens=False,
+                truncation=True,
+                max_length=max_length
+            )
+            for i, ids in zip(missing, encoded["input_ids"]):
+                token_ids[i] = ids
+
+        return token_ids
+
+    def score_many(self, queries, documents_lists, doc_ids_lists=None, batch_size=16):
+        """
+        Score several (query, documents) groups in one batched pass.
+        All pairs are flattened into shared batches so small groups
+        do not each pay for a partially filled forward pass. With case ids,
+        previously scored pairs come from the score cache and only the
+        missing pairs reach the model.
+
+        Args:
+            queries: List of query strings
+            documents_lists: List of document-string lists, one per query
+            doc_ids_lists: Optional list of case-id lists (parallel to
+                           documents_lists) for the score and token caches
+            batch_size: Batch size for prediction
+
+        Returns:
+            List of numpy score arrays, one per query
+        """
+        if doc_ids_lists is None:
+            return self._score_uncached(queries, documents_lists, None, batch_size)
+
+        groups = []
+        pending_positions = []
+        pending_documents = []
+        pending_doc_ids = []
+
+        for query, documents, doc_ids in zip(queries, documents_lists, doc_ids_lists):
+            cached = self.score_cache.get_many(self.model_name, query, doc_ids, documents)
+            missing = [i for i in range(len(documents)) if i not in cached]
+
+            scores = np.zeros(len(documents), dtype=np.float32)
+            for i, score in cached.items():
+                scores[i] = score
+            groups.append(scores)
+
+            pending_positions.append(missing)
+            pending_documents.append([documents[i] for i in missing])
+            pending_doc_ids.append([doc_ids[i] for i in missing])
+
+        fresh_groups = self._score_uncached(queries, pending_documents, pending_doc_ids, batch_size)
+
+        for query, scores, missing, documents, doc_ids, fresh in zip(
+            queries, groups, pending_positions, pending_documents, pending_doc_ids, fresh_groups
+        ):
+            scores[missing] = fresh
+            self.score_cache.set_many(self.model_name, query, doc_ids, documents, fresh)
+
+        return groups
+
+    def _score_uncached(self, queries, documents_lists, doc_ids_lists, batch_size):
+        """
+        Run the model over every (query, document) pair, using the token
+        cache when case ids are known
+        """
+        num_pairs = sum(len(documents) for documents in documents_lists)
+        if num_pairs == 0:
+            return [np.zeros(0, dtype=np.float32) for _ in queries]
+
+        if self.token_cache is not None and doc_ids_lists is not None:
+            token_id_pairs = []
+            for query, documents, doc_ids in zip(queries, documents_lists, doc_ids_lists):
+                query_ids = self.tokenizer(query, add_special_tokens=False)["input_ids"]
+                for doc_token_ids in self._document_token_ids(documents, doc_ids):
+                    token_id_pairs.append((query_ids, doc_token_ids))
+            scores = self.predict_token_ids(token_id_pairs, batch_size=batch_size)
+        else:
+            query_doc_pairs = []
+            for query, documents in zip(queries, documents_lists):
+                query_doc_pairs.extend((query, doc) for doc in documents)
+            scores = self.predict(query_doc_pairs, batch_size=batch_size)
+
+        groups = []
+        offset = 0
+        for documents in documents_lists:
+            groups.append(scores[offset:offset + len(documents)])
+            offset += len(documents)
+
+        return groups
+
+    def rerank(self, query, documents, batch_size=16, doc_ids=None):
         """
         Rerank documents for a given query
 
@@ -82,15 +244,37 @@ class CrossEncoder:
             query: Query string
             documents: List of document strings
             batch_size: Batch size for prediction
+            doc_ids: Optional case ids of the documents (enables the token cache)
 
         Returns:
             List of (index, score) tuples sorted by score (descending)
         """
-        query_doc_pairs = [(query, doc) for doc in documents]
-        scores = self.predict(query_doc_pairs, batch_size=batch_size)
+        return self.rerank_many(
+            [query], [documents],
+            doc_ids_lists=[doc_ids] if doc_ids is not None else None,
+            batch_size=batch_size
+        )[0]
+
+    def rerank_many(self, queries, documents_lists, doc_ids_lists=None, batch_size=16):
+        """
+        Rerank several (query, documents) groups in one batched pass
+
+        Args:
+            queries: List of query strings
+            documents_lists: List of document-string lists, one per query
+            doc_ids_lists: Optional list of case-id lists (enables the token cache)
+            batch_size: Batch size for prediction
+
+        Returns:
+            List of rankings, one per query, each a list of
+            (index, score) tuples sorted by score (descending)
+        """
+        groups = self.score_many(queries, documents_lists, doc_ids_lists, batch_size=batch_size)
 
-        ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)
-        return ranked
+        return [
+            sorted(enumerate(scores), key=lambda x: x[1], reverse=True)
+            for scores in groups
+        ]
 
 
 if __name__ == "__main__":
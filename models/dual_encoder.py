@@ -10,7 +10,7 @@ except OSError as e:
     torch = None
     TORCH_IMPORT_ERROR = e
 from transformers import AutoTokenizer, AutoModel
-from config import DUAL_ENCODER_MODEL
+from config import DUAL_ENCODER_MODEL, DENSE_DOC_MAX_LENGTH, DENSE_QUERY_MAX_LENGTH, DENSE_MAX_BATCH_TOKENS
 import numpy as np
 
 
@@ -37,7 +37,7 @@ class DualEncoder:
         self.model = AutoModel.from_pretrained(model_name).to(self.device)
         self.model.eval()
 
-    def encode(self, texts, batch_size=16, max_length=512, show_progress=False):
+    def encode(self, texts, batch_size=16, max_length=DENSE_DOC_MAX_LENGTH, show_progress=False):
         """
         Encode texts into dense vectors using mean pooling
 
@@ -57,23 +57,115 @@ class DualEncoder:
 
         for i in range(0, len(texts), batch_size):
             batch_texts = texts[i:i + batch_size]
+            encoded = self.tokenize(batch_texts, max_length=max_length)
+            all_embeddings.append(self.embed(encoded))
 
-            encoded = self.tokenizer(
-                batch_texts,
-                padding=True,
-                truncation=True,
-                max_length=max_length,
-                return_tensors='pt'
-            ).to(self.device)
+        all_embeddings = np.vstack(all_embeddings)
+        return all_embeddings
 
-            with torch.no_grad():
-                outputs = self.model(**encoded)
-                embeddings = self._mean_pooling(outputs, encoded['attention_mask'])
+    def tokenize(self, texts, max_length=DENSE_DOC_MAX_LENGTH):
+        """
+        Tokenize one batch, padded to its longest member (CPU tensors)
 
-            all_embeddings.append(embeddings.cpu().numpy())
+        Separate from embed() so tokenization can run in its own pipeline
+        stage while the model works on the previous batch.
+        """
+        return self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=max_length,
+            return_tensors='pt'
+        )
+
+    def embed(self, encoded):
+        """
+        Forward pass + mean pooling for a tokenized batch
 
-        all_embeddings = np.vstack(all_embeddings)
-        return all_embeddings
+        Args:
+            encoded: Output of tokenize()
+
+        Returns:
+            numpy array of shape (batch, 768)
+        """
+        encoded = encoded.to(self.device)
+        with torch.no_grad():
+            outputs = self.model(**encoded)
+            embeddings = self._mean_pooling(outputs, encoded['attention_mask'])
+        return embeddings.cpu().numpy()
+
+    def tokenize_bulk(self, texts, max_length=DENSE_DOC_MAX_LENGTH, max_batch_tokens=DENSE_MAX_BATCH_TOKENS):
+        """
+        Tokenize all texts up front and group them into length-sorted batches
+
+        Sorting by length means each batch pads to nearly the same length, and
+        a token budget (batch size x longest member) instead of a fixed batch
+        size keeps batches of short texts large and batches of long texts small.
+
+        Args:
+            texts: List of text strings
+            max_length: Max token length per text
+            max_batch_tokens: Padded tokens allowed per batch
+
+        Returns:
+            List of (positions, encoded): positions index into texts
+        """
+        token_ids = self.tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]
+        lengths = np.array([len(ids) for ids in token_ids])
+        # Longest first, so an out-of-memory batch shows up immediately
+        order = np.argsort(-lengths, kind="stable")
+
+        batches = []
+        positions = []
+        for pos in order:
+            # The first member is the longest, so it sets the padded length
+            padded_length = lengths[positions[0]] if positions else lengths[pos]
+            if positions and (len(positions) + 1) * padded_length > max_batch_tokens:
+                batches.append(positions)
+                positions = []
+            positions.append(int(pos))
+        if positions:
+            batches.append(positions)
+
+        return [
+            (batch, self.tokenizer.pad({"input_ids": [token_ids[pos] for pos in batch]}, return_tensors='pt'))
+            for batch in batches
+        ]
+
+    def embed_bulk(self, batches, num_texts):
+        """
+        Embed the output of tokenize_bulk, returned in the original text order
+
+        Args:
+            batches: List of (positions, encoded) from tokenize_bulk
+            num_texts: Number of texts passed to tokenize_bulk
+
+        Returns:
+            numpy array of shape (num_texts, 768)
+        """
+        embeddings = np.empty((num_texts, self.model.config.hidden_size), dtype=np.float32)
+        for positions, encoded in batches:
+            embeddings[positions] = self.embed(encoded)
+        return embeddings
+
+    def encode_bulk(self, texts, max_length=DENSE_DOC_MAX_LENGTH, max_batch_tokens=DENSE_MAX_BATCH_TOKENS):
+        """
+        Encode many texts (e.g. the corpus) with length-sorted, token-budgeted
+        batches; same result as encode(), faster for mixed-length texts
+
+        Args:
+            texts: List of text strings
+            max_length: Max token length per text
+            max_batch_tokens: Padded tokens allowed per batch
+
+        Returns:
+            numpy array of shape (n, 768), in input order
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return np.empty((0, self.model.config.hidden_size), dtype=np.float32)
+        return self.embed_bulk(self.tokenize_bulk(texts, max_length, max_batch_tokens), len(texts))
 
     def _mean_pooling(self, model_output, attention_mask):
         """
@@ -87,7 +179,7 @@ class DualEncoder:
 
     def encode_query(self, query):
         """
-        Encode a single query
+        Encode a single query (truncated to DENSE_QUERY_MAX_LENGTH tokens)
 
         Args:
             query: Query string
@@ -95,7 +187,19 @@ class DualEncoder:
         Returns:
             numpy array of shape (768,)
         """
-        return self.encode(query)[0]
+        return self.encode(query, max_length=DENSE_QUERY_MAX_LENGTH)[0]
+
+    def encode_queries(self, queries):
+        """
+        Encode several queries in one pass (truncated to DENSE_QUERY_MAX_LENGTH tokens)
+
+        Args:
+            queries: List of query strings
+
+        Returns:
+            numpy array of shape (n, 768)
+        """
+        return self.encode(queries, batch_size=len(queries) or 1, max_length=DENSE_QUERY_MAX_LENGTH)
 
     def encode_document(self, document):
         """
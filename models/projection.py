@@ -0,0 +1,76 @@
+"""
+Linear (PCA) projection of dual-encoder embeddings to fewer dimensions
+
+The artifact is written by indexing.reduce_embeddings, one per dim:
+    projection_<dim>.npz - mean (768,), components (dim, 768), explained_variance_ratio (dim,)
+                           and the encoder model it was fitted on
+
+Documents and queries must go through the same projection, so the dense
+indexers and DenseSearcher load it whenever DENSE_PROJECTION_DIM is set.
+"""
+import os
+
+import numpy as np
+
+from config import DUAL_ENCODER_MODEL, DENSE_PROJECTION_DIM, DENSE_PROJECTION_PATH
+
+
+def projection_path(dim):
+    return DENSE_PROJECTION_PATH.format(dim=dim)
+
+
+class Projection:
+    def __init__(self, path):
+        """
+        Load a saved projection
+
+        Args:
+            path: .npz file written by indexing.reduce_embeddings
+        """
+        with np.load(path) as data:
+            self.mean = data["mean"].astype(np.float32)
+            self.components = data["components"].astype(np.float32)
+            self.explained_variance_ratio = data["explained_variance_ratio"]
+            self.model = str(data["model"])
+        self.dim = self.components.shape[0]
+
+    @classmethod
+    def load_configured(cls):
+        """
+        The projection the dense index uses (DENSE_PROJECTION_DIM), or None
+        when vectors are indexed at full dimension
+
+        Raises:
+            ValueError: if the artifact is missing or does not match the config
+        """
+        if not DENSE_PROJECTION_DIM:
+            return None
+        path = projection_path(DENSE_PROJECTION_DIM)
+        if not os.path.isfile(path):
+            raise ValueError(
+                f"DENSE_PROJECTION_DIM={DENSE_PROJECTION_DIM} but {path} does not exist; "
+                f"run python -m indexing.reduce_embeddings {DENSE_PROJECTION_DIM}"
+            )
+
+        projection = cls(path)
+        if projection.dim != DENSE_PROJECTION_DIM or projection.model != DUAL_ENCODER_MODEL:
+            raise ValueError(
+                f"{path} projects {projection.model} to {projection.dim} dims, "
+                f"config expects {DUAL_ENCODER_MODEL} to {DENSE_PROJECTION_DIM}"
+            )
+        return projection
+
+    def apply(self, vectors):
+        """
+        Project and L2-normalize one vector (d,) or a matrix (n, d)
+
+        Inputs are normalized first, like the sample the PCA was fitted on.
+
+        Returns:
+            float32 numpy array of shape (dim,) or (n, dim)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+        reduced = (vectors - self.mean) @ self.components.T
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
@@ -0,0 +1,135 @@
+"""
+Memory-mapped cache of pre-tokenized case texts for the cross-encoder
+
+Layout of a cache directory:
+    tokens.bin   - int32 token ids of every document, back to back
+    ids.npy      - int64 case ids, sorted (binary-searched at lookup time)
+    starts.npy   - int64 offset of each case's tokens in tokens.bin
+    lengths.npy  - int32 number of tokens of each case
+    meta.json    - tokenizer name and max_doc_tokens used to build it
+
+tokens.bin is opened read-only with np.memmap, so every worker process
+shares a single copy through the OS page cache. A rebuild writes a new
+directory and swaps it in (storage.staging), never touching mapped files.
+"""
+import os
+import json
+
+import numpy as np
+
+from storage.staging import staging_dir, replace_dir
+
+
+class TokenCache:
+    def __init__(self, path):
+        """
+        Open an existing token cache
+
+        Args:
+            path: Cache directory written by TokenCacheWriter
+        """
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+
+        self.ids = np.load(os.path.join(path, "ids.npy"))
+        self.starts = np.load(os.path.join(path, "starts.npy"))
+        self.lengths = np.load(os.path.join(path, "lengths.npy"))
+
+        tokens_path = os.path.join(path, "tokens.bin")
+        if os.path.getsize(tokens_path) > 0:
+            self.tokens = np.memmap(tokens_path, dtype=np.int32, mode="r")
+        else:
+            self.tokens = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def open_if_exists(cls, path, model_name):
+        """
+        Open the cache at path if it exists and was built with model_name's
+        tokenizer, else return None
+        """
+        if not path or not os.path.isfile(os.path.join(path, "meta.json")):
+            return None
+
+        cache = cls(path)
+        if cache.meta.get("tokenizer") != model_name:
+            print(f"Ignoring token cache at {path}: built for {cache.meta.get('tokenizer')}")
+            return None
+        return cache
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, case_id):
+        """
+        Get the cached token ids of a case
+
+        Args:
+            case_id: Case id (int or numeric string)
+
+        Returns:
+            numpy int32 array of token ids (without special tokens), or None
+        """
+        try:
+            key = int(case_id)
+        except (TypeError, ValueError):
+            return None
+
+        pos = np.searchsorted(self.ids, key)
+        if pos >= len(self.ids) or self.ids[pos] != key:
+            return None
+
+        start = self.starts[pos]
+        return self.tokens[start:start + self.lengths[pos]]
+
+
+class TokenCacheWriter:
+    def __init__(self, path, tokenizer_name, max_doc_tokens):
+        """
+        Stream token ids into a new cache directory
+
+        Args:
+            path: Output directory, replaced as a whole by close()
+            tokenizer_name: Name of the tokenizer, recorded in meta.json
+            max_doc_tokens: Truncation length used, recorded in meta.json
+        """
+        self.target = path
+        self.path = staging_dir(path)
+        self.meta = {"tokenizer": tokenizer_name, "max_doc_tokens": max_doc_tokens}
+        self.tokens_file = open(os.path.join(self.path, "tokens.bin"), "wb")
+        self.ids = []
+        self.starts = []
+        self.lengths = []
+        self.offset = 0
+
+    def add(self, case_id, token_ids):
+        """
+        Append one case's token ids (without special tokens)
+        """
+        token_ids = np.asarray(token_ids, dtype=np.int32)
+        self.tokens_file.write(token_ids.tobytes())
+
+        self.ids.append(int(case_id))
+        self.starts.append(self.offset)
+        self.lengths.append(len(token_ids))
+        self.offset += len(token_ids)
+
+    def close(self):
+        """
+        Write the sorted id -> offset index and metadata, then swap the
+        new cache in for the one at the target path
+        """
+        self.tokens_file.close()
+
+        ids = np.asarray(self.ids, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+
+        np.save(os.path.join(self.path, "ids.npy"), ids[order])
+        np.save(os.path.join(self.path, "starts.npy"), np.asarray(self.starts, dtype=np.int64)[order])
+        np.save(os.path.join(self.path, "lengths.npy"), np.asarray(self.lengths, dtype=np.int32)[order])
+
+        self.meta["num_docs"] = len(ids)
+        self.meta["num_tokens"] = self.offset
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+        replace_dir(self.path, self.target)
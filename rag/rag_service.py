@@ -7,24 +7,32 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import requests
+from config import USE_COMBINED_INDEX
 from search.bm25_dense_for_rag import HybridFusion
+from search.hybrid_searcher import HybridSearcher
 
 
 class RAGService:
-    def __init__(self, es_client=None, hybrid_fusion=None, ollama_url="http://localhost:11434"):
+    def __init__(self, es_client=None, hybrid_fusion=None, ollama_url="http://localhost:11434", content_store=None):
         """
         Initialize RAG service
 
         Args:
             es_client: Elasticsearch client instance (optional)
-            hybrid_fusion: HybridFusion instance (optional)
+            hybrid_fusion: HybridFusion or HybridSearcher instance (optional;
+                           HybridSearcher when USE_COMBINED_INDEX is set)
             ollama_url: Ollama API URL (default: http://localhost:11434)
+            content_store: ContentStore for case text (optional, ES otherwise)
         """
-        if hybrid_fusion is None:
+        if hybrid_fusion is None and USE_COMBINED_INDEX:
+            # One fused request against the combined index
+            self.retriever = HybridSearcher(es_client=es_client)
+        elif hybrid_fusion is None:
             self.retriever = HybridFusion(es_client=es_client)
         else:
             self.retriever = hybrid_fusion
 
+        self.content_store = content_store
         self.ollama_url = ollama_url
         self.model = "qwen3:8b"  # Ollama model name
 
@@ -44,12 +52,24 @@ class RAGService:
         # For now, we'll use the regular search method and fetch full_text separately
         results = self.retriever.search(query, size=k)
 
+        # Read the text from the local content store (metadata is already in
+        # the fused result); anything missing is fetched with one mget from
+        # the BM25 (or combined) index, which always keeps full_text
+        full_docs = {}
+        if self.content_store is not None:
+            for doc in results['results']:
+                full_text = self.content_store.get_text(doc['id'])
+                if full_text is not None:
+                    full_docs[str(doc['id'])] = dict(doc, full_text=full_text)
+
+        missing_ids = [doc['id'] for doc in results['results'] if str(doc['id']) not in full_docs]
+        full_docs.update(self.retriever.bm25_searcher.get_documents_by_ids(
+            missing_ids, source_excludes=["rerank_text", "sections"]
+        ))
+
         contexts = []
         for i, doc in enumerate(results['results'], 1):
-            # Fetch full document by ID
-            from search.dense_searcher import DenseSearcher
-            searcher = DenseSearcher(es_client=self.retriever.dense_searcher.es)
-            full_doc = searcher.get_document_by_id(doc['id'])
+            full_doc = full_docs.get(str(doc['id']))
 
             if full_doc and 'full_text' in full_doc:
                 # Truncate to max_chars_per_doc
@@ -0,0 +1,232 @@
+"""
+Batch Searcher
+Runs many queries (any mix of methods) with one ES msearch round-trip,
+one batched query-encoding pass and shared cross-encoder batches
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TOP_K_RERANK
+
+
+class BatchSearcher:
+    def __init__(self, es_client, bm25_searcher=None, dense_searcher=None,
+                 reranker=None, bm25_reranker=None):
+        """
+        Initialize batch searcher. Only the searchers needed by the
+        methods in a batch have to be provided.
+
+        Args:
+            es_client: Elasticsearch client instance (shared connection)
+            bm25_searcher: BM25Searcher instance (for 'bm25')
+            dense_searcher: DenseSearcher instance (for 'dense')
+            reranker: Reranker instance (for 'dense_rerank')
+            bm25_reranker: BM25Reranker instance (for 'bm25_rerank')
+        """
+        self.es = es_client
+        self.bm25_searcher = bm25_searcher
+        self.dense_searcher = dense_searcher
+        self.reranker = reranker
+        self.bm25_reranker = bm25_reranker
+
+    def _encode_queries(self, items):
+        """
+        Encode every query that needs a vector in a single encoder call
+
+        Returns:
+            dict mapping query text -> query vector (list of floats)
+        """
+        dense_queries = []
+        for item in items:
+            if item["method"] in ("dense", "dense_rerank") and item["query"] not in dense_queries:
+                dense_queries.append(item["query"])
+
+        if not dense_queries:
+            return {}
+
+        dense_searcher = self.dense_searcher or self.reranker.dense_searcher
+        embeddings = dense_searcher.encode_queries(dense_queries)
+
+        return {query: embedding.tolist() for query, embedding in zip(dense_queries, embeddings)}
+
+    def _build_search(self, item, query_vectors, top_k):
+        """
+        Build the (index, body) pair for one batch item
+        """
+        method = item["method"]
+
+        if method == "bm25":
+            body = self.bm25_searcher.build_query(
+                item["query"],
+                size=item["size"],
+                from_=item["from_"],
+                court_name=item.get("court_name"),
+                start_date=item.get("start_date"),
+                end_date=item.get("end_date"),
+            )
+            return self.bm25_searcher.index_name, body
+
+        if method == "dense":
+            body = self.dense_searcher.build_knn_query(
+                query_vectors[item["query"]], k=1000, num_candidates=2000,
+                court_name=item.get("court_name"),
+                start_date=item.get("start_date"),
+                end_date=item.get("end_date"),
+            )
+            return self.dense_searcher.index_name, body
+
+        if method == "dense_rerank":
+            dense_searcher = self.reranker.dense_searcher
+            body = dense_searcher.build_knn_query(
+                query_vectors[item["query"]], k=top_k, num_candidates=top_k * 2, with_rerank_text=True
+            )
+            return dense_searcher.index_name, body
+
+        # bm25_rerank
+        body = self.bm25_reranker.build_candidate_query(item["query"], size=top_k)
+        return self.bm25_reranker.index_name, body
+
+    def _local_searcher(self, item):
+        """
+        DenseSearcher that runs this item in-process (DENSE_BACKEND=hnsw / binary), or None
+        """
+        if item["method"] == "dense":
+            return self.dense_searcher if self.dense_searcher.local is not None else None
+        if item["method"] == "dense_rerank":
+            dense_searcher = self.reranker.dense_searcher
+            return dense_searcher if dense_searcher.local is not None else None
+        return None
+
+    def _search_local(self, item, query_vectors, top_k):
+        """
+        Run one dense / dense_rerank item on the local vector index
+
+        Returns:
+            ES-shaped response, or {'error': ...}
+        """
+        searcher = self._local_searcher(item)
+        try:
+            if item["method"] == "dense":
+                return searcher.search_vector(
+                    query_vectors[item["query"]], k=1000, num_candidates=2000,
+                    court_name=item.get("court_name"),
+                    start_date=item.get("start_date"),
+                    end_date=item.get("end_date"),
+                )
+            return searcher.search_vector(
+                query_vectors[item["query"]], k=top_k, num_candidates=top_k * 2, with_rerank_text=True
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+
+    def _rerank(self, items, candidates_by_pos):
+        """
+        Rerank all pending candidate lists, sharing forward passes between
+        queries that use the same cross-encoder
+
+        Returns:
+            dict mapping item position -> reranked result dict
+        """
+        # Group positions by the cross-encoder instance that scores them
+        groups = {}
+        for pos, candidates in candidates_by_pos.items():
+            ranker = self.reranker if items[pos]["method"] == "dense_rerank" else self.bm25_reranker
+            groups.setdefault(id(ranker.cross_encoder), []).append((pos, ranker))
+
+        reranked = {}
+        for members in groups.values():
+            cross_encoder = members[0][1].cross_encoder
+            queries = [items[pos]["query"] for pos, _ in members]
+            documents_lists = [
+                [doc.get("rerank_text") or "" for doc in candidates_by_pos[pos]]
+                for pos, _ in members
+            ]
+
+            doc_ids_lists = [
+                [doc.get("id") for doc in candidates_by_pos[pos]]
+                for pos, _ in members
+            ]
+
+            rankings = cross_encoder.rerank_many(queries, documents_lists, doc_ids_lists=doc_ids_lists)
+
+            for (pos, ranker), ranked_indices_scores in zip(members, rankings):
+                reranked[pos] = ranker.format_results(
+                    candidates_by_pos[pos], ranked_indices_scores, query=items[pos]["query"]
+                )
+
+        return reranked
+
+    def search(self, items, top_k=TOP_K_RERANK):
+        """
+        Run a batch of searches
+
+        Args:
+            items: List of dicts with keys 'query', 'method', 'size', 'from_'
+                   and optional 'court_name', 'start_date', 'end_date'
+                   (filters apply to 'bm25' and 'dense', as on /cases)
+            top_k: Rerank depth for 'dense_rerank' / 'bm25_rerank'
+
+        Returns:
+            List of result dicts in the same order as items. bm25/dense items get
+            the requested page; rerank items get the full reranked list
+            (callers paginate and cache it). Failed items get {'error': ...}.
+        """
+        if not items:
+            return []
+
+        query_vectors = self._encode_queries(items)
+
+        # Dense items on the local vector index skip the msearch
+        responses = [None] * len(items)
+        remote = []
+        searches = []
+        for pos, item in enumerate(items):
+            if self._local_searcher(item) is not None:
+                responses[pos] = self._search_local(item, query_vectors, top_k)
+                continue
+            index_name, body = self._build_search(item, query_vectors, top_k)
+            searches.append({"index": index_name})
+            searches.append(body)
+            remote.append(pos)
+
+        if searches:
+            response = self.es.msearch(searches=searches, request_timeout=120)
+            for pos, item_response in zip(remote, response["responses"]):
+                responses[pos] = item_response
+
+        outputs = [None] * len(items)
+        candidates_by_pos = {}
+
+        for pos, (item, item_response) in enumerate(zip(items, responses)):
+            if "error" in item_response:
+                error = item_response["error"]
+                reason = error.get("reason") if isinstance(error, dict) else error
+                outputs[pos] = {"error": str(reason)}
+                continue
+
+            method = item["method"]
+            if method == "bm25":
+                outputs[pos] = self.bm25_searcher.format_response(item_response)
+            elif method == "dense":
+                outputs[pos] = self.dense_searcher.format_response(
+                    item_response, size=item["size"], from_=item["from_"], query=item["query"]
+                )
+            elif method == "dense_rerank":
+                candidates = self.reranker.dense_searcher.format_candidates(item_response)
+                if candidates:
+                    candidates_by_pos[pos] = candidates
+                else:
+                    outputs[pos] = {"total": 0, "results": []}
+            else:
+                candidates = self.bm25_reranker.format_candidates(item_response)
+                if candidates:
+                    candidates_by_pos[pos] = candidates
+                else:
+                    outputs[pos] = {"total": 0, "results": []}
+
+        if candidates_by_pos:
+            for pos, reranked in self._rerank(items, candidates_by_pos).items():
+                outputs[pos] = reranked
+
+        return outputs
@@ -10,6 +10,65 @@ from search.bm25_searcher import BM25Searcher
 from search.dense_searcher import DenseSearcher
 
 
+def reciprocal_rank_fusion(bm25_results, dense_results, k=60):
+    """
+    Reciprocal Rank Fusion (RRF) algorithm
+
+    RRF score = sum(1 / (k + rank))
+
+    Args:
+        bm25_results: List of results from BM25
+        dense_results: List of results from dense search
+        k: Constant for RRF (default: 60, from original paper)
+
+    Returns:
+        List of fused results sorted by RRF score
+    """
+    # Build rank maps
+    bm25_ranks = {doc['id']: rank + 1 for rank, doc in enumerate(bm25_results)}
+    dense_ranks = {doc['id']: rank + 1 for rank, doc in enumerate(dense_results)}
+
+    # Combine all unique document IDs
+    all_doc_ids = set(bm25_ranks.keys()) | set(dense_ranks.keys())
+
+    # Build document map for metadata
+    doc_map = {}
+    for doc in bm25_results:
+        doc_map[doc['id']] = doc
+    for doc in dense_results:
+        if doc['id'] not in doc_map:
+            doc_map[doc['id']] = doc
+
+    # Calculate RRF scores
+    rrf_scores = {}
+    for doc_id in all_doc_ids:
+        score = 0.0
+
+        # Add BM25 contribution
+        if doc_id in bm25_ranks:
+            score += 1.0 / (k + bm25_ranks[doc_id])
+
+        # Add Dense contribution
+        if doc_id in dense_ranks:
+            score += 1.0 / (k + dense_ranks[doc_id])
+
+        rrf_scores[doc_id] = score
+
+    # Sort by RRF score (descending)
+    sorted_doc_ids = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
+
+    # Build final results
+    fused_results = []
+    for doc_id, rrf_score in sorted_doc_ids:
+        doc = doc_map[doc_id].copy()
+        doc['rrf_score'] = rrf_score
+        doc['bm25_rank'] = bm25_ranks.get(doc_id, None)
+        doc['dense_rank'] = dense_ranks.get(doc_id, None)
+        fused_results.append(doc)
+
+    return fused_results
+
+
 class HybridFusion:
     def __init__(self, es_client=None, bm25_searcher=None, dense_searcher=None):
         """
@@ -32,61 +91,9 @@ class HybridFusion:
 
     def reciprocal_rank_fusion(self, bm25_results, dense_results, k=60):
         """
-        Reciprocal Rank Fusion (RRF) algorithm
-
-        RRF score = sum(1 / (k + rank))
-
-        Args:
-            bm25_results: List of results from BM25
-            dense_results: List of results from dense search
-            k: Constant for RRF (default: 60, from original paper)
-
-        Returns:
-            List of fused results sorted by RRF score
+        Reciprocal Rank Fusion (RRF), see the module-level function
         """
-        # Build rank maps
-        bm25_ranks = {doc['id']: rank + 1 for rank, doc in enumerate(bm25_results)}
-        dense_ranks = {doc['id']: rank + 1 for rank, doc in enumerate(dense_results)}
-
-        # Combine all unique document IDs
-        all_doc_ids = set(bm25_ranks.keys()) | set(dense_ranks.keys())
-
-        # Build document map for metadata
-        doc_map = {}
-        for doc in bm25_results:
-            doc_map[doc['id']] = doc
-        for doc in dense_results:
-            if doc['id'] not in doc_map:
-                doc_map[doc['id']] = doc
-
-        # Calculate RRF scores
-        rrf_scores = {}
-        for doc_id in all_doc_ids:
-            score = 0.0
-
-            # Add BM25 contribution
-            if doc_id in bm25_ranks:
-                score += 1.0 / (k + bm25_ranks[doc_id])
-
-            # Add Dense contribution
-            if doc_id in dense_ranks:
-                score += 1.0 / (k + dense_ranks[doc_id])
-
-            rrf_scores[doc_id] = score
-
-        # Sort by RRF score (descending)
-        sorted_doc_ids = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
-
-        # Build final results
-        fused_results = []
-        for doc_id, rrf_score in sorted_doc_ids:
-            doc = doc_map[doc_id].copy()
-            doc['rrf_score'] = rrf_score
-            doc['bm25_rank'] = bm25_ranks.get(doc_id, None)
-            doc['dense_rank'] = dense_ranks.get(doc_id, None)
-            fused_results.append(doc)
-
-        return fused_results
+        return reciprocal_rank_fusion(bm25_results, dense_results, k=k)
 
     def search(self, query, size=10, bm25_k=50, dense_k=50, rrf_k=60):
         """
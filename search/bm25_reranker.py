@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.cross_encoder import CrossEncoder
+from search.snippets import SnippetGenerator
 from search.bm25_searcher import BM25Searcher
 from config import TOP_K_RERANK, ES_INDEX_BM25
 
@@ -26,21 +27,22 @@ class BM25Reranker:
         else:
             self.bm25_searcher = bm25_searcher
         self.cross_encoder = cross_encoder or CrossEncoder()
+        self.snippet_generator = SnippetGenerator()
         self.es = es_client or self.bm25_searcher.es
         self.index_name = ES_INDEX_BM25
 
-    def search_with_full_text(self, query, size=100):
+    def build_candidate_query(self, query, size=100):
         """
-        Get BM25 candidates with full_text for reranking
+        Build the ES request body for BM25 candidate retrieval
 
         Args:
             query: Query string
             size: Number of candidates to retrieve
 
         Returns:
-            list of documents with full_text
+            dict with the ES query body
         """
-        es_query = {
+        return {
             "query": {
                 "multi_match": {
                     "query": query,
@@ -56,12 +58,20 @@ class BM25Reranker:
             "size": size,
             "_source": [
                 "id", "name", "decision_date", "court_name",
-                "jurisdiction_name", "word_count", "full_text"
+                "jurisdiction_name", "word_count", "rerank_text"
             ]
         }
 
-        response = self.es.search(index=self.index_name, body=es_query, request_timeout=60)
+    def format_candidates(self, response):
+        """
+        Convert a raw ES response into a list of candidate documents
+
+        Args:
+            response: ES search response (or one entry of an msearch response)
 
+        Returns:
+            list of documents with rerank_text
+        """
         candidates = []
         for hit in response["hits"]["hits"]:
             doc = hit["_source"]
@@ -70,27 +80,38 @@ class BM25Reranker:
 
         return candidates
 
-    def search_and_rerank(self, query, top_k=TOP_K_RERANK):
+    def search_for_rerank(self, query, size=100):
         """
-        Two-stage retrieval: BM25 coarse retrieval + Cross-encoder reranking
+        Get BM25 candidates with rerank_text for reranking
 
         Args:
             query: Query string
-            top_k: Number of candidates to retrieve and rerank (default: TOP_K_RERANK)
+            size: Number of candidates to retrieve
 
         Returns:
-            dict with 'total', 'results' keys
+            list of documents with rerank_text
         """
-        # Stage 1: Retrieve top_k candidates using BM25
-        candidates = self.search_with_full_text(query, size=top_k)
+        es_query = self.build_candidate_query(query, size=size)
 
-        if not candidates:
-            return {"total": 0, "results": []}
+        response = self.es.search(index=self.index_name, body=es_query, request_timeout=60)
 
-        # Stage 2: Rerank all candidates with Cross-encoder
-        documents = [doc.get("full_text", "")[:2000] for doc in candidates]
-        ranked_indices_scores = self.cross_encoder.rerank(query, documents)
+        return self.format_candidates(response)
 
+    def format_results(self, candidates, ranked_indices_scores, query=None):
+        """
+        Build the API result format from reranked candidates
+
+        The whole list is cached and paged, so it carries no snippets:
+        add_snippets builds them for the returned page only.
+
+        Args:
+            candidates: Candidate documents from search_for_rerank
+            ranked_indices_scores: (index, score) tuples from CrossEncoder.rerank
+            query: Query string (unused, kept for BatchSearcher)
+
+        Returns:
+            dict with 'total', 'results' keys
+        """
         results = {
             "total": len(candidates),
             "results": []
@@ -107,11 +128,60 @@ class BM25Reranker:
                 "decision_date": doc.get("decision_date"),
                 "court_name": doc.get("court_name"),
                 "jurisdiction_name": doc.get("jurisdiction_name"),
-                "word_count": doc.get("word_count")
+                "word_count": doc.get("word_count"),
             })
 
         return results
 
+    def add_snippets(self, query, results):
+        """
+        Set 'snippet' on one page of reranked results, in place, from their
+        rerank_text (one mget for the page)
+
+        Args:
+            query: Query string
+            results: Page of result dicts from format_results
+
+        Returns:
+            results
+        """
+        if not results:
+            return results
+        response = self.es.mget(
+            index=self.index_name,
+            ids=[str(result.get("id")) for result in results],
+            source_includes=["rerank_text"]
+        )
+        fetched = {entry["_id"]: entry["_source"] for entry in response["docs"] if entry.get("found")}
+        texts = [fetched.get(str(result.get("id")), {}).get("rerank_text") or "" for result in results]
+        for result, snippet in zip(results, self.snippet_generator.generate(query, texts)):
+            result["snippet"] = snippet
+        return results
+
+    def search_and_rerank(self, query, top_k=TOP_K_RERANK):
+        """
+        Two-stage retrieval: BM25 coarse retrieval + Cross-encoder reranking
+
+        Args:
+            query: Query string
+            top_k: Number of candidates to retrieve and rerank (default: TOP_K_RERANK)
+
+        Returns:
+            dict with 'total', 'results' keys
+        """
+        # Stage 1: Retrieve top_k candidates using BM25
+        candidates = self.search_for_rerank(query, size=top_k)
+
+        if not candidates:
+            return {"total": 0, "results": []}
+
+        # Stage 2: Rerank all candidates with Cross-encoder
+        documents = [doc.get("rerank_text") or "" for doc in candidates]
+        doc_ids = [doc.get("id") for doc in candidates]
+        ranked_indices_scores = self.cross_encoder.rerank(query, documents, doc_ids=doc_ids)
+
+        return self.format_results(candidates, ranked_indices_scores, query=query)
+
 
 if __name__ == "__main__":
     print("Loading BM25 + Cross-encoder reranker...")
@@ -2,7 +2,75 @@
 BM25 Searcher - Baseline retrieval method
 """
 import re
-from config import ES_INDEX_BM25
+import json
+import base64
+import hashlib
+from elasticsearch import NotFoundError
+from config import (
+    ES_INDEX_BM25, EXPORT_PAGE_SIZE, PIT_KEEP_ALIVE, CURSOR_KEEP_ALIVE, BM25_TRACK_TOTAL_HITS,
+    BM25_FAST_VECTOR_HIGHLIGHT,
+)
+
+# Fields that may be requested from the export endpoint
+EXPORT_FIELDS = [
+    "id",
+    "name",
+    "decision_date",
+    "court_name",
+    "jurisdiction_name",
+    "word_count",
+    "parties",
+    "judges",
+    "head_matter",
+    "full_text",
+]
+
+# Sort used for point-in-time paging; _shard_doc is the cheapest unique
+# tiebreaker within a PIT
+PIT_SORT = [{"_score": "desc"}, {"_shard_doc": "asc"}]
+
+
+class CursorExpiredError(ValueError):
+    """
+    The point-in-time behind a cursor has expired (or is unknown)
+    """
+
+
+def query_fingerprint(query, court_name=None, start_date=None, end_date=None):
+    """
+    Short hash of a query and its filters, stored in its cursors
+    """
+    key = json.dumps([query, court_name, start_date, end_date])
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def encode_cursor(pit_id, sort_values, fingerprint):
+    """
+    Pack a PIT id, the last hit's sort values and the query fingerprint
+    into an opaque cursor
+    """
+    payload = json.dumps({"pit": pit_id, "sort": sort_values, "q": fingerprint}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, fingerprint):
+    """
+    Unpack a cursor produced by encode_cursor for the same query
+
+    Returns:
+        (PIT id, sort values)
+
+    Raises:
+        ValueError: if the cursor is malformed or belongs to another query / filters
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        pit_id, sort_values, cursor_fingerprint = state["pit"], state["sort"], state["q"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("invalid cursor")
+    if cursor_fingerprint != fingerprint:
+        raise ValueError("cursor does not belong to this query and filters")
+    return pit_id, sort_values
 
 
 class BM25Searcher:
@@ -23,7 +91,7 @@ class BM25Searcher:
             self.es = es_client
         self.index_name = ES_INDEX_BM25
 
-    def search(
+    def build_query(
         self,
         query,
         size=10,
@@ -31,9 +99,11 @@ class BM25Searcher:
         court_name=None,
         start_date=None,
         end_date=None,
+        highlight=False,
     ):
         """
-        Search using BM25 (multi-field with boosts + phrase handling + filters + highlight)
+        Build the ES request body for a BM25 search
+        (multi-field with boosts + phrase handling + filters + optional highlight)
 
         Args:
             query: Query string
@@ -42,9 +112,12 @@ class BM25Searcher:
             court_name: Optional exact court name filter (keyword)
             start_date: Optional lower bound for decision_date (YYYY-MM-DD or YYYY-MM)
             end_date: Optional upper bound for decision_date
+            highlight: Ask ES for snippets. Off by default: highlighting
+                       re-analyzes long opinions, so listings skip it and
+                       snippets are fetched separately via get_snippets
 
         Returns:
-            dict with 'total', 'results' keys
+            dict with the ES query body
         """
         # Extract quoted phrases: "strict liability", etc.
         phrase_terms = re.findall(r'"([^"]+)"', query)
@@ -118,6 +191,8 @@ class BM25Searcher:
             "query": bool_query,
             "size": size,
             "from": from_,
+            # Count exactly only up to the cap; beyond it total is a lower bound
+            "track_total_hits": BM25_TRACK_TOTAL_HITS,
             "_source": [
                 "id",
                 "name",
@@ -125,39 +200,71 @@ class BM25Searcher:
                 "court_name",
                 "jurisdiction_name",
                 "word_count"
-            ],
-            "highlight": {
-                "fields": {
-                    "full_text": {
-                        "fragment_size": 200,
-                        "number_of_fragments": 1
-                    },
-                    "head_matter": {
-                        "fragment_size": 200,
-                        "number_of_fragments": 1
-                    }
-                },
-                "pre_tags": ["<mark>"],
-                "post_tags": ["</mark>"]
-            }
+            ]
         }
 
-        response = self.es.search(index=self.index_name, body=es_query, request_timeout=60)
+        if highlight:
+            es_query["highlight"] = self.build_highlight()
+
+        return es_query
+
+    def build_highlight(self):
+        """
+        Build the highlight section for full_text / head_matter snippets.
+        Uses the fast vector highlighter when the index stores term vectors
+        with offsets (BM25_FAST_VECTOR_HIGHLIGHT), so ES does not have to
+        re-analyze whole opinions.
+        """
+        field_options = {
+            "fragment_size": 200,
+            "number_of_fragments": 1
+        }
+        if BM25_FAST_VECTOR_HIGHLIGHT:
+            field_options["type"] = "fvh"
+
+        return {
+            "fields": {
+                "full_text": dict(field_options),
+                "head_matter": dict(field_options)
+            },
+            "pre_tags": ["<mark>"],
+            "post_tags": ["</mark>"]
+        }
+
+    @staticmethod
+    def extract_snippet(hit):
+        """
+        Pick the snippet from a hit's highlight section (full_text first)
+        """
+        highlight = hit.get("highlight", {})
+
+        if "full_text" in highlight:
+            return highlight["full_text"][0]
+        if "head_matter" in highlight:
+            return highlight["head_matter"][0]
+        return None
+
+    def format_response(self, response):
+        """
+        Convert a raw ES search response into the API result format
+
+        Args:
+            response: ES search response (or one entry of an msearch response)
 
+        Returns:
+            dict with 'total', 'results' keys
+        """
+        total = response["hits"].get("total") or {}
         results = {
-            "total": response["hits"]["total"]["value"] if "hits" in response else 0,
+            "total": total.get("value", 0),
+            # 'gte' when the count stopped at BM25_TRACK_TOTAL_HITS (shown as "10,000+")
+            "total_relation": total.get("relation", "eq"),
             "results": []
         }
 
         for hit in response["hits"]["hits"]:
             doc = hit["_source"]
-            highlight = hit.get("highlight", {})
-            snippet = None
-
-            if "full_text" in highlight:
-                snippet = highlight["full_text"][0]
-            elif "head_matter" in highlight:
-                snippet = highlight["head_matter"][0]
+            snippet = self.extract_snippet(hit)
 
             results["results"].append({
                 "id": doc.get("id"),
@@ -172,28 +279,254 @@ class BM25Searcher:
 
         return results
 
+    def search(
+        self,
+        query,
+        size=10,
+        from_=0,
+        court_name=None,
+        start_date=None,
+        end_date=None,
+        use_cursor=False,
+        cursor=None,
+        highlight=False,
+    ):
+        """
+        Search using BM25 (multi-field with boosts + phrase handling + filters)
+
+        Args:
+            query: Query string
+            size: Number of results to return
+            from_: Offset for pagination (ignored in cursor mode)
+            court_name: Optional exact court name filter (keyword)
+            start_date: Optional lower bound for decision_date (YYYY-MM-DD or YYYY-MM)
+            end_date: Optional upper bound for decision_date
+            use_cursor: Page with point-in-time + search_after instead of from/size;
+                        the response carries a 'next_cursor'
+            cursor: Cursor from a previous cursor-mode response (implies use_cursor)
+            highlight: Include snippets inline (slower; see get_snippets)
+
+        Returns:
+            dict with 'total', 'total_relation', 'results' keys
+            (plus 'next_cursor' in cursor mode, None on the last page)
+
+        Raises:
+            ValueError: if the cursor is malformed or from another query / filters
+            CursorExpiredError: if the cursor's point-in-time has expired
+        """
+        es_query = self.build_query(
+            query,
+            size=size,
+            from_=from_,
+            court_name=court_name,
+            start_date=start_date,
+            end_date=end_date,
+            highlight=highlight,
+        )
+
+        if not (use_cursor or cursor):
+            response = self.es.search(index=self.index_name, body=es_query, request_timeout=60)
+            return self.format_response(response)
+
+        # Cursor mode: every page costs the same as the first one. The PIT
+        # lives CURSOR_KEEP_ALIVE past each page unless the last page closes it
+        fingerprint = query_fingerprint(query, court_name, start_date, end_date)
+        if cursor:
+            pit_id, search_after = decode_cursor(cursor, fingerprint)
+            es_query["search_after"] = search_after
+        else:
+            pit_id = self.open_point_in_time(keep_alive=CURSOR_KEEP_ALIVE)
+
+        es_query.pop("from", None)
+        es_query["sort"] = PIT_SORT
+        es_query["pit"] = {"id": pit_id, "keep_alive": CURSOR_KEEP_ALIVE}
+
+        try:
+            response = self.es.search(body=es_query, request_timeout=60)
+        except NotFoundError:
+            if not cursor:
+                raise
+            raise CursorExpiredError("cursor expired; run the search again")
+        pit_id = response.get("pit_id", pit_id)
+
+        results = self.format_response(response)
+        hits = response["hits"]["hits"]
+
+        if len(hits) == size:
+            results["next_cursor"] = encode_cursor(pit_id, hits[-1]["sort"], fingerprint)
+        else:
+            results["next_cursor"] = None
+            self.close_point_in_time(pit_id)
+
+        return results
+
+    def get_snippets(self, query, doc_ids):
+        """
+        Compute highlight snippets for just the given (visible) documents
+
+        Args:
+            query: Query string the documents were retrieved with
+            doc_ids: List of case ids
+
+        Returns:
+            dict mapping case id -> snippet (None when nothing matched)
+        """
+        if not doc_ids:
+            return {}
+
+        es_query = self.build_query(query, size=len(doc_ids), highlight=True)
+        es_query["query"]["bool"].setdefault("filter", []).append(
+            {"terms": {"id": [str(doc_id) for doc_id in doc_ids]}}
+        )
+        es_query["_source"] = ["id"]
+        es_query["track_total_hits"] = False
+
+        response = self.es.search(index=self.index_name, body=es_query, request_timeout=60)
+
+        snippets = {str(doc_id): None for doc_id in doc_ids}
+        for hit in response["hits"]["hits"]:
+            snippets[str(hit["_source"].get("id"))] = self.extract_snippet(hit)
+
+        return snippets
+
+    def open_point_in_time(self, keep_alive=PIT_KEEP_ALIVE):
+        """
+        Open a point-in-time on the BM25 index so consecutive pages
+        see a consistent snapshot
+
+        Returns:
+            PIT id string
+        """
+        response = self.es.open_point_in_time(index=self.index_name, keep_alive=keep_alive)
+        return response["id"]
+
+    def close_point_in_time(self, pit_id):
+        """
+        Release a point-in-time (errors are ignored, the PIT expires anyway)
+        """
+        try:
+            self.es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            print(f"Warning: failed to close point-in-time: {e}")
+
+    def iter_hits(
+        self,
+        query,
+        fields=None,
+        court_name=None,
+        start_date=None,
+        end_date=None,
+        page_size=EXPORT_PAGE_SIZE,
+        limit=None,
+    ):
+        """
+        Stream every matching document using point-in-time + search_after.
+        Only one page is held in memory at a time, and the next page is
+        fetched only when the consumer asks for more.
+
+        Args:
+            query: Query string
+            fields: List of _source fields to return (default: listing fields)
+            court_name: Optional exact court name filter (keyword)
+            start_date: Optional lower bound for decision_date
+            end_date: Optional upper bound for decision_date
+            page_size: Documents fetched per ES round-trip
+            limit: Optional maximum number of documents to yield
+
+        Yields:
+            dict per document with the requested fields plus 'score'
+        """
+        es_query = self.build_query(
+            query,
+            size=page_size,
+            court_name=court_name,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        es_query.pop("from", None)
+        es_query["_source"] = fields or ["id", "name", "decision_date", "court_name",
+                                         "jurisdiction_name", "word_count"]
+        es_query["track_total_hits"] = False
+        es_query["sort"] = PIT_SORT
+
+        pit_id = self.open_point_in_time()
+        yielded = 0
+        try:
+            while True:
+                if limit is not None:
+                    es_query["size"] = min(page_size, limit - yielded)
+                    if es_query["size"] <= 0:
+                        return
+
+                es_query["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+                response = self.es.search(body=es_query, request_timeout=60)
+                # The PIT id may change between requests
+                pit_id = response.get("pit_id", pit_id)
+
+                hits = response["hits"]["hits"]
+                if not hits:
+                    return
+
+                for hit in hits:
+                    doc = hit["_source"]
+                    doc["score"] = hit["_score"]
+                    yield doc
+
+                yielded += len(hits)
+                if len(hits) < es_query["size"]:
+                    return
+
+                es_query["search_after"] = hits[-1]["sort"]
+        finally:
+            self.close_point_in_time(pit_id)
+
     def get_document_by_id(self, doc_id):
         """
-        Get full document by ID
+        Get full document by ID (realtime GET on the case-id keyed _id)
 
         Args:
             doc_id: Document ID
 
         Returns:
-            dict with document data or None if not found
+            dict with document data (without dense_vector) or None if not found
+        """
+        try:
+            response = self.es.get(
+                index=self.index_name,
+                id=str(doc_id),
+                source_excludes=["dense_vector"]
+            )
+        except NotFoundError:
+            return None
+
+        return response["_source"]
+
+    def get_documents_by_ids(self, doc_ids, source_excludes=None):
+        """
+        Get several documents in one mget round-trip
+
+        Args:
+            doc_ids: List of document IDs
+            source_excludes: Extra _source fields to leave out
+                             (dense_vector is always excluded)
+
+        Returns:
+            dict mapping str(doc_id) -> document data, missing ids omitted
         """
-        response = self.es.search(
+        if not doc_ids:
+            return {}
+
+        response = self.es.mget(
             index=self.index_name,
-            body={
-                "query": {"term": {"id": doc_id}},
-                "size": 1
-            }
+            ids=[str(doc_id) for doc_id in doc_ids],
+            source_excludes=["dense_vector"] + list(source_excludes or [])
         )
 
-        if response["hits"]["total"]["value"] == 0:
-            return None
-
-        return response["hits"]["hits"][0]["_source"]
+        return {
+            entry["_id"]: entry["_source"]
+            for entry in response["docs"]
+            if entry.get("found")
+        }
 
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.cross_encoder import CrossEncoder
+from search.snippets import SnippetGenerator
 from search.dense_searcher import DenseSearcher
 from config import TOP_K_RERANK
 
@@ -26,30 +27,23 @@ class Reranker:
         else:
             self.dense_searcher = dense_searcher
         self.cross_encoder = cross_encoder or CrossEncoder()
+        self.snippet_generator = SnippetGenerator()
 
-    def search_and_rerank(self, query, top_k=TOP_K_RERANK):
+    def format_results(self, candidates, ranked_indices_scores, query=None):
         """
-        Two-stage retrieval: coarse retrieval + fine-grained reranking
+        Build the API result format from reranked candidates
+
+        The whole list is cached and paged, so it carries no snippets:
+        add_snippets builds them for the returned page only.
 
         Args:
-            query: Query string
-            top_k: Number of candidates to retrieve and rerank (default: TOP_K_RERANK)
+            candidates: Candidate documents from DenseSearcher.search_for_rerank
+            ranked_indices_scores: (index, score) tuples from CrossEncoder.rerank
+            query: Query string (unused, kept for BatchSearcher)
 
         Returns:
             dict with 'total', 'results' keys
         """
-        # Retrieve top_k candidates from dense searcher
-        candidates = self.dense_searcher.search_with_full_text(
-            query, size=top_k
-        )
-
-        if not candidates:
-            return {"total": 0, "results": []}
-
-        # Rerank all candidates
-        documents = [doc.get("full_text", "")[:2000] for doc in candidates]
-        ranked_indices_scores = self.cross_encoder.rerank(query, documents)
-
         results = {
             "total": len(candidates),
             "results": []
@@ -66,11 +60,59 @@ class Reranker:
                 "decision_date": doc.get("decision_date"),
                 "court_name": doc.get("court_name"),
                 "jurisdiction_name": doc.get("jurisdiction_name"),
-                "word_count": doc.get("word_count")
+                "word_count": doc.get("word_count"),
             })
 
         return results
 
+    def add_snippets(self, query, results):
+        """
+        Set 'snippet' on one page of reranked results, in place
+
+        rerank_text is fetched for just these cases (the vector store or one
+        mget, see DenseSearcher.get_rerank_texts).
+
+        Args:
+            query: Query string
+            results: Page of result dicts from format_results
+
+        Returns:
+            results
+        """
+        if not results:
+            return results
+        hits = [{"_source": {"id": result.get("id")}} for result in results]
+        texts = self.dense_searcher.get_rerank_texts(hits)
+        for result, snippet in zip(results, self.snippet_generator.generate(query, texts)):
+            result["snippet"] = snippet
+        return results
+
+    def search_and_rerank(self, query, top_k=TOP_K_RERANK):
+        """
+        Two-stage retrieval: coarse retrieval + fine-grained reranking
+
+        Args:
+            query: Query string
+            top_k: Number of candidates to retrieve and rerank (default: TOP_K_RERANK)
+
+        Returns:
+            dict with 'total', 'results' keys
+        """
+        # Retrieve top_k candidates from dense searcher
+        candidates = self.dense_searcher.search_for_rerank(
+            query, size=top_k
+        )
+
+        if not candidates:
+            return {"total": 0, "results": []}
+
+        # Rerank all candidates
+        documents = [doc.get("rerank_text") or "" for doc in candidates]
+        doc_ids = [doc.get("id") for doc in candidates]
+        ranked_indices_scores = self.cross_encoder.rerank(query, documents, doc_ids=doc_ids)
+
+        return self.format_results(candidates, ranked_indices_scores, query=query)
+
 
 if __name__ == "__main__":
     print("Loading reranker...")
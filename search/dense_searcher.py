@@ -6,18 +6,29 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import ES_INDEX_DENSE, TOP_K_RERANK
+from elasticsearch import NotFoundError
+
+from config import ES_INDEX_DENSE, TOP_K_RERANK, DENSE_VECTOR_INDEX_TYPE, DENSE_RESCORE_OVERSAMPLE, DENSE_BACKEND
 from models.dual_encoder import DualEncoder
+from models.projection import Projection
+from indexing.corpus import date_bound
+from search.snippets import SnippetGenerator
+
+# Short documents (ORDERs, docket entries) are left out of dense results
+MIN_WORD_COUNT = 1000
 
 
 class DenseSearcher:
-    def __init__(self, es_client=None, encoder=None):
+    def __init__(self, es_client=None, encoder=None, use_local=True):
         """
         Initialize dense searcher
 
         Args:
             es_client: Elasticsearch client instance (optional, for connection sharing)
             encoder: DualEncoder instance, creates new one if None
+            use_local: Search the local vector store when DENSE_BACKEND is
+                       hnsw / binary; False always uses ES kNN and never
+                       loads the store (HybridSearcher)
         """
         if es_client is None:
             from elasticsearch import Elasticsearch
@@ -30,45 +41,206 @@ class DenseSearcher:
         else:
             self.es = es_client
         self.index_name = ES_INDEX_DENSE
+        # Quantized HNSW: fetch oversample x k candidates, rescore with float vectors
+        self.oversample = DENSE_RESCORE_OVERSAMPLE if DENSE_VECTOR_INDEX_TYPE != "hnsw" else 1.0
         self.encoder = encoder or DualEncoder()
+        # Same projection the index was built with (None at full dimension)
+        self.projection = Projection.load_configured()
+        self.snippet_generator = SnippetGenerator()
+        # In-process search over the local vector store (hnsw / binary) instead of ES kNN
+        self.local = None
+        if DENSE_BACKEND not in ("es", "hnsw", "binary"):
+            raise ValueError(f"Unknown DENSE_BACKEND '{DENSE_BACKEND}', expected 'es', 'hnsw' or 'binary'")
+        if use_local and DENSE_BACKEND != "es":
+            from search.local_dense import shared_index
+            self.local = shared_index(DENSE_BACKEND)
 
-    def search(self, query, size=10, from_=0):
+    def encode_queries(self, queries):
         """
-        Search using dense vectors (KNN with application-layer pagination)
-        Limited to top 1000 results for performance
+        Encode queries into the index's vector space
 
         Args:
-            query: Query string
-            size: Number of results to return per page
-            from_: Offset for pagination
+            queries: List of query strings
 
         Returns:
-            dict with 'total', 'results' keys
+            numpy array of shape (n, DENSE_INDEX_DIM)
         """
-        query_vector = self.encoder.encode_query(query).tolist()
+        vectors = self.encoder.encode_queries(queries)
+        if self.projection is not None:
+            vectors = self.projection.apply(vectors)
+        return vectors
+
+    def encode_query(self, query):
+        """
+        Encode one query into the index's vector space, as a list of floats
+        """
+        vector = self.encoder.encode_query(query)
+        if self.projection is not None:
+            vector = self.projection.apply(vector)
+        return vector.tolist()
+
+    def build_knn_query(self, query_vector, k=1000, num_candidates=2000,
+                        court_name=None, start_date=None, end_date=None, with_rerank_text=False, rescore=True):
+        """
+        Build the ES request body for a KNN search
+
+        With oversampling (quantized index), the approximate search returns
+        oversample x k candidates, which are rescored with the exact cosine
+        on the original float vectors; the top k are returned.
+
+        Args:
+            query_vector: Query embedding as a list of floats
+            k: Number of nearest neighbors to return
+            num_candidates: Number of candidates explored per shard
+            court_name: Optional court filter, a phrase the court name must
+                        contain (court_name is text in the dense index; the
+                        local backends match the same way)
+            start_date: Optional lower bound for decision_date (YYYY, YYYY-MM or YYYY-MM-DD)
+            end_date: Optional upper bound for decision_date, inclusive of
+                      the whole year / month when partial
+            with_rerank_text: Also return rerank_text (rerank candidates only;
+                              result pages fetch it for their own hits)
+            rescore: Oversample and rescore on a quantized index. False
+                     fetches exactly k (e.g. under rank: rrf, which cannot
+                     be combined with a rescore section)
+
+        Returns:
+            dict with the ES query body
+
+        Raises:
+            ValueError: if a date is malformed
+        """
+        source = ["id", "name", "decision_date", "court_name",
+                  "jurisdiction_name", "word_count"]
+        if with_rerank_text:
+            # The short stored prefix: enough for the cross-encoder,
+            # without pulling whole opinions over the wire
+            source.append("rerank_text")
+
+        candidates = int(k * self.oversample) if rescore else k
+
+        # Pre-filter applied during the HNSW search
+        knn_filter = {"range": {"word_count": {"gte": MIN_WORD_COUNT}}}
+        filters = []
+        if court_name:
+            filters.append({"match_phrase": {"court_name": court_name}})
+        if start_date or end_date:
+            # decision_date is stored as YYYY-MM-DD (a keyword in the dense
+            # index), so the bounds are full dates: "1990-05" as an upper
+            # bound is 1990-05-31, not a string prefix of the month
+            date_range = {}
+            if start_date:
+                date_range["gte"] = date_bound(start_date)
+            if end_date:
+                date_range["lte"] = date_bound(end_date, end=True)
+            filters.append({"range": {"decision_date": date_range}})
+        if filters:
+            knn_filter = {"bool": {"filter": [knn_filter] + filters}}
 
-        # Use KNN to retrieve top 1000 results, then paginate in application layer
         es_query = {
-            "size": 1000,  # Must set size to actually return k results
+            "size": k,  # Must set size to actually return k results
             "knn": {
                 "field": "dense_vector",
                 "query_vector": query_vector,
-                "k": 1000,  # Find top 1000 nearest neighbors
-                "num_candidates": 2000,  # Explore 2000 candidates (2-3x of k for better speed/accuracy trade-off)
-                "filter": {
-                    "range": {
-                        "word_count": {
-                            "gte": 1000  # Filter out short documents (ORDERs, docket entries)
-                        }
-                    }
-                }
+                "k": candidates,
+                "num_candidates": max(num_candidates, candidates),
+                "filter": knn_filter
             },
-            "_source": ["id", "name", "decision_date", "court_name",
-                       "jurisdiction_name", "word_count"]
+            "_source": source
         }
 
-        response = self.es.search(index=self.index_name, body=es_query)
+        if candidates > k:
+            es_query["rescore"] = {
+                "window_size": candidates,
+                "query": {
+                    "rescore_query": {
+                        "script_score": {
+                            "query": {"match_all": {}},
+                            "script": {
+                                # Same scale as the kNN cosine score
+                                "source": "(cosineSimilarity(params.query_vector, 'dense_vector') + 1.0) / 2.0",
+                                "params": {"query_vector": query_vector}
+                            }
+                        }
+                    },
+                    "query_weight": 0,
+                    "rescore_query_weight": 1
+                }
+            }
+
+        return es_query
+
+    def search_vector(self, query_vector, k, num_candidates, court_name=None, start_date=None, end_date=None,
+                      with_rerank_text=False):
+        """
+        Run one KNN search, locally (DENSE_BACKEND=hnsw / binary) or on ES
 
+        Args:
+            query_vector: Query embedding as a list of floats
+            k: Number of nearest neighbors to return
+            num_candidates: Number of candidates explored per shard (ES only)
+            court_name, start_date, end_date: Optional filters
+            with_rerank_text: Also return rerank_text with every hit
+
+        Returns:
+            ES search response (ES-shaped for the local backend)
+        """
+        if self.local is not None:
+            return self.local.search_response(
+                query_vector, k, min_word_count=MIN_WORD_COUNT,
+                court_name=court_name, start_date=start_date, end_date=end_date,
+                with_rerank_text=with_rerank_text
+            )
+
+        es_query = self.build_knn_query(
+            query_vector, k=k, num_candidates=num_candidates,
+            court_name=court_name, start_date=start_date, end_date=end_date,
+            with_rerank_text=with_rerank_text
+        )
+        return self.es.search(index=self.index_name, body=es_query)
+
+    def get_rerank_texts(self, hits):
+        """
+        rerank_text of each hit, fetched in one mget (or from the local
+        vector store) for the hits whose _source does not carry it
+
+        Args:
+            hits: ES hits (one page of results)
+
+        Returns:
+            list of strings, one per hit
+        """
+        missing = [hit["_source"].get("id") for hit in hits if "rerank_text" not in hit["_source"]]
+        if self.local is not None:
+            store = self.local.store
+            texts = store.rerank_texts(store.rows_for_ids(missing))
+            fetched = {str(case_id): {"rerank_text": text} for case_id, text in zip(missing, texts)}
+        else:
+            fetched = self.get_documents_by_ids(missing, source_includes=["rerank_text"])
+
+        texts = []
+        for hit in hits:
+            doc = hit["_source"]
+            if "rerank_text" in doc:
+                texts.append(doc["rerank_text"] or "")
+            else:
+                texts.append(fetched.get(str(doc.get("id")), {}).get("rerank_text") or "")
+        return texts
+
+    def format_response(self, response, size=10, from_=0, query=None):
+        """
+        Convert a raw KNN response into the API result format,
+        paginating in the application layer
+
+        Args:
+            response: ES search response (or one entry of an msearch response)
+            size: Number of results to return per page
+            from_: Offset for pagination
+            query: Query string, used to build snippets for the returned page
+
+        Returns:
+            dict with 'total', 'results' keys
+        """
         # Get all hits returned by KNN (up to k=1000)
         all_hits = response["hits"]["hits"]
         total_available = len(all_hits)
@@ -81,7 +253,11 @@ class DenseSearcher:
         # Paginate: slice from from_ to from_ + size
         paginated_hits = all_hits[from_:from_ + size]
 
-        for hit in paginated_hits:
+        snippets = [None] * len(paginated_hits)
+        if query:
+            snippets = self.snippet_generator.generate(query, self.get_rerank_texts(paginated_hits))
+
+        for hit, snippet in zip(paginated_hits, snippets):
             doc = hit["_source"]
             results["results"].append({
                 "id": doc.get("id"),
@@ -90,75 +266,129 @@ class DenseSearcher:
                 "decision_date": doc.get("decision_date"),
                 "court_name": doc.get("court_name"),
                 "jurisdiction_name": doc.get("jurisdiction_name"),
-                "word_count": doc.get("word_count")
+                "word_count": doc.get("word_count"),
+                "snippet": snippet
             })
 
         return results
 
-    def get_document_by_id(self, doc_id):
+    def format_candidates(self, response):
         """
-        Get full document by ID
+        Convert a raw KNN response into a list of candidate documents
+        (with '_score' kept) for reranking
 
         Args:
-            doc_id: Document ID
+            response: ES search response (or one entry of an msearch response)
 
         Returns:
-            dict with document data or None if not found
+            list of dicts with candidate metadata and rerank_text
         """
-        response = self.es.search(
-            index=self.index_name,
-            body={
-                "query": {"term": {"id": doc_id}},
-                "size": 1
-            }
+        results = []
+        for hit in response["hits"]["hits"]:
+            doc = hit["_source"]
+            doc["_score"] = hit["_score"]
+            results.append(doc)
+
+        return results
+
+    def search(self, query, size=10, from_=0, court_name=None, start_date=None, end_date=None):
+        """
+        Search using dense vectors (KNN with application-layer pagination)
+        Limited to top 1000 results for performance
+
+        Args:
+            query: Query string
+            size: Number of results to return per page
+            from_: Offset for pagination
+            court_name: Optional court filter
+            start_date: Optional lower bound for decision_date
+            end_date: Optional upper bound for decision_date
+
+        Returns:
+            dict with 'total', 'results' keys
+        """
+        query_vector = self.encode_query(query)
+
+        # Use KNN to retrieve top 1000 results, then paginate in application layer
+        # Explore 2000 candidates (2-3x of k for better speed/accuracy trade-off)
+        response = self.search_vector(
+            query_vector, k=1000, num_candidates=2000,
+            court_name=court_name, start_date=start_date, end_date=end_date
         )
 
-        if response["hits"]["total"]["value"] == 0:
+        return self.format_response(response, size=size, from_=from_, query=query)
+
+    def get_document_by_id(self, doc_id):
+        """
+        Get full document by ID (realtime GET on the case-id keyed _id)
+
+        Args:
+            doc_id: Document ID
+
+        Returns:
+            dict with document data (without dense_vector) or None if not found
+        """
+        try:
+            response = self.es.get(
+                index=self.index_name,
+                id=str(doc_id),
+                source_excludes=["dense_vector"]
+            )
+        except NotFoundError:
             return None
 
-        return response["hits"]["hits"][0]["_source"]
+        return response["_source"]
 
-    def search_with_full_text(self, query, size=TOP_K_RERANK):
+    def get_documents_by_ids(self, doc_ids, source_excludes=None, source_includes=None):
         """
-        Search and return results with full_text for reranking
+        Get several documents in one mget round-trip
 
         Args:
-            query: Query string
-            size: Number of candidates to retrieve (default: TOP_K_RERANK)
+            doc_ids: List of document IDs
+            source_excludes: Extra _source fields to leave out
+                             (dense_vector is always excluded)
+            source_includes: Only return these _source fields
 
         Returns:
-            list of dicts with full document data
+            dict mapping str(doc_id) -> document data, missing ids omitted
         """
-        query_vector = self.encoder.encode_query(query).tolist()
+        if not doc_ids:
+            return {}
 
-        es_query = {
-            "size": size,
-            "knn": {
-                "field": "dense_vector",
-                "query_vector": query_vector,
-                "k": size,
-                "num_candidates": size * 2,
-                "filter": {
-                    "range": {
-                        "word_count": {
-                            "gte": 1000  # Filter out short documents (ORDERs, docket entries)
-                        }
-                    }
-                }
-            },
-            "_source": ["id", "name", "decision_date", "court_name",
-                       "jurisdiction_name", "word_count", "full_text"]
+        response = self.es.mget(
+            index=self.index_name,
+            ids=[str(doc_id) for doc_id in doc_ids],
+            source_excludes=["dense_vector"] + list(source_excludes or []),
+            source_includes=source_includes
+        )
+
+        return {
+            entry["_id"]: entry["_source"]
+            for entry in response["docs"]
+            if entry.get("found")
         }
 
-        response = self.es.search(index=self.index_name, body=es_query)
+    def search_for_rerank(self, query, size=TOP_K_RERANK, court_name=None, start_date=None, end_date=None):
+        """
+        Search and return candidates with rerank_text for reranking
 
-        results = []
-        for hit in response["hits"]["hits"]:
-            doc = hit["_source"]
-            doc["_score"] = hit["_score"]
-            results.append(doc)
+        Args:
+            query: Query string
+            size: Number of candidates to retrieve (default: TOP_K_RERANK)
+            court_name, start_date, end_date: Optional filters
 
-        return results
+        Returns:
+            list of dicts with candidate metadata and rerank_text
+        """
+        query_vector = self.encode_query(query)
+
+        response = self.search_vector(
+            query_vector, k=size, num_candidates=size * 2,
+            court_name=court_name, start_date=start_date, end_date=end_date,
+            with_rerank_text=True
+        )
+
+        return self.format_candidates(response)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""
+Hybrid Searcher over the combined index
+BM25 query and filtered KNN fused by Elasticsearch (rank: rrf) in one request
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from elasticsearch import ApiError
+
+from config import ES_INDEX_COMBINED, HYBRID_RRF_WINDOW, HYBRID_RRF_RANK_CONSTANT
+from search.bm25_searcher import BM25Searcher
+from search.dense_searcher import DenseSearcher
+from search.bm25_dense_for_rag import reciprocal_rank_fusion
+
+
+class HybridSearcher:
+    def __init__(self, es_client=None, encoder=None):
+        """
+        Same interface as HybridFusion, but both retrievers run against the
+        combined index (python -m indexing.combined_indexer), so a hybrid
+        search is one ES request instead of two searches fused in Python
+
+        Args:
+            es_client: Elasticsearch client instance (optional, for connection sharing)
+            encoder: DualEncoder instance, creates new one if None
+        """
+        self.bm25_searcher = BM25Searcher(es_client=es_client)
+        self.es = self.bm25_searcher.es
+        # The kNN half runs inside the combined-index request, never locally
+        self.dense_searcher = DenseSearcher(es_client=self.es, encoder=encoder, use_local=False)
+        self.index_name = ES_INDEX_COMBINED
+        self.bm25_searcher.index_name = self.index_name
+        self.dense_searcher.index_name = self.index_name
+        # Cleared if the cluster rejects rank: rrf (before ES 8.8, or not licensed)
+        self.native_rrf = True
+
+    def build_query(self, query, query_vector, size=10, window=HYBRID_RRF_WINDOW,
+                    rank_constant=HYBRID_RRF_RANK_CONSTANT, court_name=None, start_date=None, end_date=None):
+        """
+        Build the ES request body: BM25 query + KNN, fused with RRF
+
+        Args:
+            query: Query string
+            query_vector: Query embedding as a list of floats
+            size: Number of fused results to return
+            window: Candidates taken from each retriever before fusion
+            rank_constant: RRF constant k
+            court_name, start_date, end_date: Filters, applied to both
+                                              the BM25 query and the KNN
+
+        Returns:
+            dict with the ES query body
+        """
+        lexical = self.bm25_searcher.build_query(
+            query, size=window, court_name=court_name, start_date=start_date, end_date=end_date
+        )
+        # No oversampling: RRF fuses ranks and cannot take a rescore section,
+        # so extra quantized candidates would only cost time
+        knn = self.dense_searcher.build_knn_query(
+            query_vector, k=window, num_candidates=window * 2, rescore=False
+        )["knn"]
+
+        # Filtered KNN: the same court / date filters as the BM25 query
+        filters = lexical["query"]["bool"].get("filter", [])
+        if filters:
+            knn["filter"] = {"bool": {"filter": [knn["filter"]] + filters}}
+
+        return {
+            "query": lexical["query"],
+            "knn": knn,
+            "rank": {
+                "rrf": {
+                    "window_size": window,
+                    "rank_constant": rank_constant
+                }
+            },
+            "size": size,
+            "_source": lexical["_source"]
+        }
+
+    def format_response(self, response):
+        """
+        Convert a fused ES response into the HybridFusion result format
+        """
+        results = []
+        for hit in response["hits"]["hits"]:
+            doc = hit["_source"]
+            results.append({
+                "id": doc.get("id"),
+                "score": hit["_score"],
+                "rrf_score": hit["_score"],
+                "name": doc.get("name"),
+                "decision_date": doc.get("decision_date"),
+                "court_name": doc.get("court_name"),
+                "jurisdiction_name": doc.get("jurisdiction_name"),
+                "word_count": doc.get("word_count"),
+            })
+
+        return {
+            "total": len(results),
+            "results": results,
+            "method": "hybrid_rrf"
+        }
+
+    def search_fused(self, query, query_vector, size=10, window=HYBRID_RRF_WINDOW,
+                     rank_constant=HYBRID_RRF_RANK_CONSTANT, **filters):
+        """
+        Fallback when the cluster cannot fuse: both searches in one msearch
+        round-trip on the combined index, fused in Python
+        """
+        body = self.build_query(query, query_vector, size=window, window=window,
+                                rank_constant=rank_constant, **filters)
+        lexical = {"query": body["query"], "size": window, "_source": body["_source"]}
+        knn = {"knn": body["knn"], "size": window, "_source": body["_source"]}
+
+        response = self.es.msearch(
+            searches=[{"index": self.index_name}, lexical, {"index": self.index_name}, knn]
+        )
+        for item in response["responses"]:
+            if "error" in item:
+                raise RuntimeError(f"Hybrid search failed: {item['error']}")
+
+        bm25_results = self.bm25_searcher.format_response(response["responses"][0])["results"]
+        dense_results = self.dense_searcher.format_response(response["responses"][1], size=window)["results"]
+        fused_results = reciprocal_rank_fusion(bm25_results, dense_results, k=rank_constant)
+
+        return {
+            "total": len(fused_results),
+            "results": fused_results[:size],
+            "method": "hybrid_fusion"
+        }
+
+    def search(self, query, size=10, court_name=None, start_date=None, end_date=None,
+               window=HYBRID_RRF_WINDOW, rank_constant=HYBRID_RRF_RANK_CONSTANT):
+        """
+        Hybrid search (BM25 + KNN) with reciprocal rank fusion
+
+        Args:
+            query: Query string
+            size: Number of final results to return
+            court_name: Optional exact court name filter
+            start_date: Optional lower bound for decision_date
+            end_date: Optional upper bound for decision_date
+            window: Candidates from each retriever (default: HYBRID_RRF_WINDOW)
+            rank_constant: RRF constant (default: HYBRID_RRF_RANK_CONSTANT)
+
+        Returns:
+            dict with 'total', 'results' keys
+        """
+        query_vector = self.dense_searcher.encode_query(query)
+        filters = {"court_name": court_name, "start_date": start_date, "end_date": end_date}
+
+        if self.native_rrf:
+            body = self.build_query(query, query_vector, size=size, window=window,
+                                    rank_constant=rank_constant, **filters)
+            try:
+                response = self.es.search(index=self.index_name, body=body)
+                return self.format_response(response)
+            except ApiError as e:
+                message = str(e).lower()
+                if e.meta.status not in (400, 403) or not any(word in message for word in ("rank", "rrf", "license")):
+                    raise
+                print(f"Warning: Elasticsearch rejected rank: rrf ({e.message}); fusing in Python instead")
+                self.native_rrf = False
+
+        return self.search_fused(query, query_vector, size=size, window=window,
+                                 rank_constant=rank_constant, **filters)
+
+
+if __name__ == "__main__":
+    print("Loading hybrid searcher...")
+    searcher = HybridSearcher()
+
+    query = "contract formation requirements"
+    print(f"\nQuery: {query}")
+    results = searcher.search(query, size=10)
+
+    print(f"\nFound {results['total']} fused results ({results['method']})")
+    for i, result in enumerate(results['results'], 1):
+        print(f"{i}. {result['name']} (RRF score: {result['rrf_score']:.4f})")
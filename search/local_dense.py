@@ -0,0 +1,299 @@
+"""
+In-process dense retrieval over the local vector store
+
+Two backends over storage/vector_store.py, used instead of the ES dense
+index:
+    HNSWDenseIndex   - hnswlib graph search (DENSE_BACKEND=hnsw)
+    BinaryDenseIndex - Hamming scan of the 1-bit codes, exact float rescoring
+                       of the best candidates (DENSE_BACKEND=binary)
+
+Both apply the word_count / court / date filters as a row mask. Results are
+hydrated from the store's meta.jsonl and returned in the shape of an ES
+response, so DenseSearcher's format_response / format_candidates work on
+them unchanged.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import (
+    VECTOR_STORE_DIR, DENSE_INDEX_DIM, HNSW_EF_SEARCH, LOCAL_EXACT_MAX_ROWS, BINARY_RESCORE_CANDIDATES,
+)
+from storage.vector_store import VectorStore
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# One loaded index per (backend, store path), shared by every DenseSearcher in the process
+_indices = {}
+
+# HNSW filters letting through at least this fraction of the rows are
+# applied after an unfiltered, oversampled graph search (no per-node Python
+# filter callback); the word_count filter alone keeps most of the corpus
+HNSW_POSTFILTER_MIN_FRACTION = 0.3
+
+if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+    popcount = np.bitwise_count
+else:
+    # Set bits of every 16-bit value
+    POPCOUNT16 = np.array([bin(value).count("1") for value in range(65536)], dtype=np.uint8)
+
+    def popcount(words):
+        return POPCOUNT16[words.view(np.uint16)].reshape(len(words), 4).sum(axis=1, dtype=np.uint8)
+
+
+def to_response(store, rows, scores, with_rerank_text=False):
+    """
+    ES-shaped response for the given rows (best first)
+    """
+    hits = [
+        {"_id": str(doc.get("id")), "_score": float(score), "_source": doc}
+        for doc, score in zip(store.hydrate(rows, with_rerank_text=with_rerank_text), scores)
+    ]
+    return {"hits": {"hits": hits}}
+
+
+def exact_search(store, query_vector, k, rows=None):
+    """
+    Exact cosine top-k over the given rows (all rows if None)
+
+    Returns:
+        (rows, cosine similarities), best first
+    """
+    if rows is None:
+        rows = np.arange(len(store))
+    if len(rows) == 0:
+        return rows, np.zeros(0, dtype=np.float32)
+
+    # Fancy indexing reads only the selected rows from the memory map
+    similarities = np.asarray(store.vectors[rows]) @ query_vector
+    top = min(k, len(rows))
+    best = np.argpartition(-similarities, top - 1)[:top]
+    best = best[np.argsort(-similarities[best])]
+    return rows[best], similarities[best]
+
+
+def to_words(codes):
+    """
+    Packed bit codes (n, bytes) as word-major uint64 (words, n), zero-padded
+    to whole words: the Hamming scan then walks contiguous columns
+    """
+    codes = np.atleast_2d(codes)
+    padding = -codes.shape[1] % 8
+    if padding:
+        codes = np.pad(codes, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(np.ascontiguousarray(codes).view(np.uint64).T)
+
+
+def hamming_distances(words, query_words):
+    """
+    Hamming distance between the query and every case
+
+    Args:
+        words: (words, n) uint64 codes from to_words
+        query_words: (words, 1) uint64 code of the query, from to_words
+
+    Returns:
+        (n,) uint16 array
+    """
+    distances = np.zeros(words.shape[1], dtype=np.uint16)
+    for word, query_word in zip(words, query_words[:, 0]):
+        distances += popcount(word ^ query_word)
+    return distances
+
+
+class LocalDenseIndex:
+    def __init__(self, path=VECTOR_STORE_DIR):
+        """
+        Open the vector store
+
+        Args:
+            path: Store directory written by indexing.build_vector_store
+
+        Raises:
+            RuntimeError: if the store has not been built
+            ValueError: if the store does not match DENSE_INDEX_DIM
+        """
+        self.store = VectorStore.open_if_exists(path)
+        if self.store is None:
+            raise RuntimeError(f"No vector store at {path}; run python -m indexing.build_vector_store")
+        if self.store.dim != DENSE_INDEX_DIM:
+            raise ValueError(f"Vector store at {path} holds {self.store.dim}-d vectors, "
+                             f"the index uses {DENSE_INDEX_DIM}")
+
+    def search_candidates(self, query_vector, k, mask):
+        """
+        Approximate top-k among the rows in mask (all rows if None); implemented by each backend
+
+        Returns:
+            (rows, cosine similarities), best first
+        """
+        raise NotImplementedError
+
+    def search(self, query_vector, k, mask=None):
+        """
+        Top-k rows for one query, restricted to mask
+
+        A selective filter (at most LOCAL_EXACT_MAX_ROWS allowed rows) is
+        searched exactly: cheap at that size, and never misses.
+
+        Args:
+            query_vector: Query vector (DENSE_INDEX_DIM,)
+            k: Number of results
+            mask: Boolean row mask from VectorStore.filter_mask, or None
+
+        Returns:
+            (rows, cosine similarities), best first
+        """
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+
+        allowed = len(self.store)
+        if mask is not None:
+            allowed = int(np.count_nonzero(mask))
+            if allowed <= LOCAL_EXACT_MAX_ROWS:
+                return exact_search(self.store, query_vector, k, np.flatnonzero(mask))
+
+        k = min(k, allowed)
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return self.search_candidates(query_vector, k, mask)
+
+    def search_response(self, query_vector, k, min_word_count=None, court_name=None,
+                        start_date=None, end_date=None, with_rerank_text=False):
+        """
+        Filtered search returned as an ES-shaped response
+
+        Scores use the ES cosine scale (1 + cosine) / 2. rerank_text is only
+        included with with_rerank_text (rerank candidates).
+
+        Raises:
+            ValueError: if a date is malformed
+        """
+        mask = self.store.filter_mask(
+            min_word_count=min_word_count, court_name=court_name, start_date=start_date, end_date=end_date
+        )
+        rows, similarities = self.search(query_vector, k, mask)
+        return to_response(self.store, rows, (1.0 + similarities) / 2.0, with_rerank_text=with_rerank_text)
+
+
+class HNSWDenseIndex(LocalDenseIndex):
+    def __init__(self, path=VECTOR_STORE_DIR, ef_search=HNSW_EF_SEARCH):
+        """
+        Load the vector store and its HNSW graph
+
+        The store's arrays are memory-mapped; hnswlib reads the graph
+        (links + vectors) into RAM.
+
+        Args:
+            path: Store directory written by indexing.build_vector_store
+            ef_search: Minimum size of the dynamic candidate list per query
+
+        Raises:
+            RuntimeError: if hnswlib is missing or the store has no graph
+            ValueError: if the store does not match DENSE_INDEX_DIM
+        """
+        if hnswlib is None:
+            raise RuntimeError("DENSE_BACKEND=hnsw needs hnswlib (pip install hnswlib)")
+        super().__init__(path)
+
+        graph_path = os.path.join(path, "hnsw.bin")
+        if not os.path.isfile(graph_path):
+            raise RuntimeError(f"{graph_path} not found; install hnswlib and rebuild the vector store")
+        self.index = hnswlib.Index(space="ip", dim=self.store.dim)
+        self.index.load_index(graph_path, max_elements=len(self.store))
+        self.ef_search = ef_search
+
+    def knn(self, query_vector, k, ef, filter=None):
+        self.index.set_ef(max(ef, k))
+        labels, distances = self.index.knn_query(query_vector, k=k, filter=filter)
+        # 'ip' distance is 1 - dot product
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def search_candidates(self, query_vector, k, mask):
+        """
+        Graph search. A broad mask (HNSW_POSTFILTER_MIN_FRACTION of the rows
+        or more) is applied to an unfiltered search for enough extra
+        neighbors to expect k allowed ones, with ef scaled up by the same
+        factor so the allowed candidates explored (and the recall) match a
+        filtered search. If too few pass, or the mask is narrower, nodes
+        outside it are skipped during the traversal (hnswlib filter, one
+        Python call per visited node).
+        """
+        ef = max(k * 2, self.ef_search)
+        if mask is None:
+            return self.knn(query_vector, k, ef)
+
+        fraction = np.count_nonzero(mask) / len(self.store)
+        if fraction >= HNSW_POSTFILTER_MIN_FRACTION:
+            oversampled = min(int(np.ceil(k / fraction * 1.2)), len(self.store))
+            labels, similarities = self.knn(query_vector, oversampled, int(ef / fraction))
+            keep = mask[labels]
+            if np.count_nonzero(keep) >= k:
+                return labels[keep][:k], similarities[keep][:k]
+
+        return self.knn(query_vector, k, ef, filter=mask.__getitem__)
+
+
+class BinaryDenseIndex(LocalDenseIndex):
+    def __init__(self, path=VECTOR_STORE_DIR, candidates=BINARY_RESCORE_CANDIDATES):
+        """
+        Open the vector store and its binary codes
+
+        The codes (d / 8 bytes per case, ~20 MB for 200k cases at 768-d) are
+        held in RAM as 64-bit words, one contiguous array per word, so the
+        scan is a few XOR + popcount passes; the float vectors stay
+        memory-mapped and only the candidates' rows are read.
+
+        Args:
+            path: Store directory written by indexing.build_vector_store
+            candidates: Cases kept by the Hamming scan and rescored exactly
+
+        Raises:
+            RuntimeError: if the store has no binary codes
+            ValueError: if the store does not match DENSE_INDEX_DIM
+        """
+        super().__init__(path)
+        if self.store.binary_codes is None:
+            raise RuntimeError(f"No binary codes in {path}; rebuild it with python -m indexing.build_vector_store")
+        self.words = to_words(self.store.binary_codes)
+        self.candidates = candidates
+
+    def search_candidates(self, query_vector, k, mask):
+        """
+        Hamming scan over all codes, then exact cosine on the best
+        max(k, candidates) rows in mask
+
+        Rows outside the mask are pushed to the largest distance rather than
+        gathered out of the code matrix first (a full copy per query).
+        """
+        query_words = to_words(np.packbits(query_vector > self.store.binary_mean))
+        distances = hamming_distances(self.words, query_words)
+
+        allowed = len(distances)
+        if mask is not None:
+            np.copyto(distances, np.iinfo(distances.dtype).max, where=~mask)
+            allowed = int(np.count_nonzero(mask))
+
+        keep = min(max(k, self.candidates), allowed)
+        nearest = np.argpartition(distances, keep - 1)[:keep]
+        if mask is not None:
+            nearest = nearest[mask[nearest]]  # ties at the cut-off distance
+        # Sorted rows read the memory-mapped vectors front to back
+        return exact_search(self.store, query_vector, k, np.sort(nearest))
+
+
+BACKENDS = {"hnsw": HNSWDenseIndex, "binary": BinaryDenseIndex}
+
+
+def shared_index(backend, path=VECTOR_STORE_DIR):
+    """
+    The process-wide local index of the given backend for path, loaded on first use
+    """
+    if (backend, path) not in _indices:
+        _indices[(backend, path)] = BACKENDS[backend](path)
+    return _indices[(backend, path)]
@@ -0,0 +1,159 @@
+"""
+In-process snippet generator
+Picks the best-matching window of a document's stored leading text by
+query-term overlap, for methods that do not go through ES highlighting
+(dense, dense_rerank, bm25_rerank)
+"""
+import re
+import html
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import SNIPPET_WINDOW_WORDS
+
+WORD_RE = re.compile(r"[A-Za-z0-9]+(?:['’][A-Za-z]+)?")
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "if", "in",
+    "into", "is", "it", "no", "not", "of", "on", "or", "such", "that", "the",
+    "their", "then", "there", "these", "they", "this", "to", "was", "will",
+    "with", "what", "when", "which", "who", "how", "does", "do", "under",
+}
+
+
+def normalize_term(word):
+    """
+    Lowercase and strip common English suffixes so 'contracts',
+    'contracting' and 'contract' match each other
+    """
+    word = word.lower()
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+class SnippetGenerator:
+    def __init__(self, window_words=SNIPPET_WINDOW_WORDS):
+        """
+        Args:
+            window_words: Snippet length in words (~200 characters for 30 words)
+        """
+        self.window_words = window_words
+
+    def query_terms(self, query):
+        """
+        Normalized, de-duplicated query terms without stop words
+        """
+        terms = []
+        for word in WORD_RE.findall(query):
+            if word.lower() in STOP_WORDS:
+                continue
+            term = normalize_term(word)
+            if term not in terms:
+                terms.append(term)
+        return terms
+
+    def generate(self, query, texts):
+        """
+        Build one snippet per text, scoring every window of every text
+        in a single vectorized pass
+
+        Args:
+            query: Query string
+            texts: List of document texts (leading text is enough)
+
+        Returns:
+            List of snippet strings (HTML-escaped, matches wrapped in <mark>),
+            None for empty texts
+        """
+        terms = self.query_terms(query)
+        term_set = set(terms)
+
+        # Tokenize every document once, remembering character spans
+        doc_spans = []
+        hit_flags = []
+        for text in texts:
+            spans = [(m.start(), m.end()) for m in WORD_RE.finditer(text or "")]
+            doc_spans.append(spans)
+            hit_flags.extend(
+                normalize_term(text[start:end]) in term_set for start, end in spans
+            )
+
+        lengths = np.array([len(spans) for spans in doc_spans], dtype=np.int64)
+        doc_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(texts) else np.zeros(0, dtype=np.int64)
+        doc_ends = doc_starts + lengths
+
+        # Window score for every start position = matches within the next
+        # window_words tokens, clipped at the document boundary
+        hits = np.asarray(hit_flags, dtype=np.int32)
+        cumulative = np.concatenate(([0], np.cumsum(hits)))
+        doc_of_token = np.repeat(np.arange(len(texts)), lengths)
+        positions = np.arange(len(hits))
+        window_ends = np.minimum(positions + self.window_words, doc_ends[doc_of_token])
+        window_scores = cumulative[window_ends] - cumulative[positions]
+
+        snippets = []
+        for i, text in enumerate(texts):
+            spans = doc_spans[i]
+            if not spans:
+                snippets.append(None)
+                continue
+
+            doc_hits = hits[doc_starts[i]:doc_ends[i]]
+            scores = window_scores[doc_starts[i]:doc_ends[i]]
+            best = int(np.argmax(scores))  # first window wins ties -> leading text
+
+            # Slide forward so the first match is not glued to the left edge
+            # (without running past the end of the text); the window only
+            # gains matches by moving towards them
+            if scores[best] > 0:
+                first_hit = int(np.argmax(doc_hits[best:]))
+                shifted = best + max(0, first_hit - self.window_words // 4)
+                best = max(best, min(shifted, len(spans) - self.window_words))
+
+            window = spans[best:best + self.window_words]
+            snippets.append(self._render(text, window, term_set, best > 0,
+                                         best + self.window_words < len(spans)))
+
+        return snippets
+
+    def _render(self, text, window, term_set, cut_before, cut_after):
+        """
+        Turn a window of token spans into escaped text with <mark> tags
+        """
+        parts = []
+        cursor = window[0][0]
+        for start, end in window:
+            parts.append(html.escape(text[cursor:start]))
+            word = text[start:end]
+            if normalize_term(word) in term_set:
+                parts.append(f"<mark>{html.escape(word)}</mark>")
+            else:
+                parts.append(html.escape(word))
+            cursor = end
+
+        # Keep punctuation attached to the last word
+        parts.append(html.escape(re.match(r"\S*", text[cursor:]).group()))
+
+        snippet = " ".join("".join(parts).split())
+        if cut_before:
+            snippet = "… " + snippet
+        if cut_after:
+            snippet = snippet + " …"
+        return snippet
+
+
+if __name__ == "__main__":
+    generator = SnippetGenerator()
+
+    texts = [
+        "The parties entered into a written agreement. The court held that contract "
+        "formation requires offer, acceptance and consideration, and found none here.",
+        "Appeal from a judgment of sentence for burglary."
+    ]
+    for snippet in generator.generate("contract formation requirements", texts):
+        print(snippet)
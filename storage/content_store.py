@@ -0,0 +1,184 @@
+"""
+Local, read-only content store for case text
+
+Layout of a store directory:
+    content.bin  - one compressed blob per case, back to back
+    ids.npy      - int64 case ids, sorted (binary-searched at lookup time)
+    starts.npy   - int64 byte offset of each case's blob in content.bin
+    lengths.npy  - int64 byte length of each blob
+    meta.json    - codec and document count
+
+Each blob is a compressed JSON object holding the case's text fields
+(full_text, head_matter) and the character offsets of its head matter and
+opinions within full_text (see indexing.corpus.build_sections). Blobs are
+compressed with zstd when the `zstandard` package is installed and with
+zlib otherwise; meta.json records which.
+
+content.bin is memory-mapped, so reads are a page-cache lookup plus a
+decompress instead of an Elasticsearch round-trip. A rebuild writes a new
+directory and swaps it in (storage.staging), never touching mapped files.
+"""
+import os
+import json
+import mmap
+import zlib
+
+import numpy as np
+
+from storage.staging import staging_dir, replace_dir
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Text fields kept in the store
+CONTENT_FIELDS = ["full_text", "head_matter"]
+
+
+class ContentStore:
+    def __init__(self, path):
+        """
+        Open an existing content store
+
+        Args:
+            path: Store directory written by ContentStoreWriter
+        """
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+
+        self.ids = np.load(os.path.join(path, "ids.npy"))
+        self.starts = np.load(os.path.join(path, "starts.npy"))
+        self.lengths = np.load(os.path.join(path, "lengths.npy"))
+
+        if self.meta["codec"] == "zstd":
+            if zstandard is None:
+                raise RuntimeError(
+                    f"Content store at {path} is zstd-compressed; install the zstandard package"
+                )
+            self._decompress = zstandard.ZstdDecompressor().decompress
+        else:
+            self._decompress = zlib.decompress
+
+        self._file = open(os.path.join(path, "content.bin"), "rb")
+        if os.path.getsize(self._file.name) > 0:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+
+    @classmethod
+    def open_if_exists(cls, path):
+        """
+        Open the store at path, or return None if it has not been built
+        """
+        if not path or not os.path.isfile(os.path.join(path, "meta.json")):
+            return None
+        return cls(path)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, case_id):
+        """
+        Read a case's text fields
+
+        Args:
+            case_id: Case id (int or numeric string)
+
+        Returns:
+            dict with the CONTENT_FIELDS and 'sections' (empty for stores
+            built before sections were recorded), or None if the case is
+            not stored
+        """
+        try:
+            key = int(case_id)
+        except (TypeError, ValueError):
+            return None
+
+        pos = np.searchsorted(self.ids, key)
+        if pos >= len(self.ids) or self.ids[pos] != key:
+            return None
+
+        start = int(self.starts[pos])
+        blob = self._data[start:start + int(self.lengths[pos])]
+        content = json.loads(self._decompress(blob))
+        content.setdefault("sections", [])
+        return content
+
+    def get_text(self, case_id):
+        """
+        Read a case's full_text, or None if the case is not stored
+        """
+        content = self.get(case_id)
+        return content.get("full_text") if content else None
+
+
+class ContentStoreWriter:
+    # Fields read from normalized documents (see indexing.ingest)
+    columns = ["id"] + CONTENT_FIELDS + ["sections"]
+
+    def __init__(self, path):
+        """
+        Stream case text into a new store directory
+
+        Args:
+            path: Output directory, replaced as a whole by close()
+        """
+        self.target = path
+        self.path = staging_dir(path)
+        self.codec = "zstd" if zstandard is not None else "zlib"
+        if zstandard is not None:
+            self._compress = zstandard.ZstdCompressor(level=9).compress
+        else:
+            self._compress = lambda data: zlib.compress(data, 6)
+
+        self.content_file = open(os.path.join(self.path, "content.bin"), "wb")
+        self.ids = []
+        self.starts = []
+        self.lengths = []
+        self.offset = 0
+
+    def add(self, doc):
+        """
+        Append one case
+
+        Args:
+            doc: Document dict with 'id', the CONTENT_FIELDS and 'sections'
+        """
+        if doc.get("id") is None:
+            return
+
+        content = {field: doc.get(field) or "" for field in CONTENT_FIELDS}
+        content["sections"] = doc.get("sections") or []
+        payload = json.dumps(content)
+        blob = self._compress(payload.encode("utf-8"))
+        self.content_file.write(blob)
+
+        self.ids.append(int(doc["id"]))
+        self.starts.append(self.offset)
+        self.lengths.append(len(blob))
+        self.offset += len(blob)
+
+    def close(self):
+        """
+        Write the sorted id -> offset index and metadata, then swap the
+        new store in for the one at the target path
+        """
+        self.content_file.close()
+
+        ids = np.asarray(self.ids, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+
+        np.save(os.path.join(self.path, "ids.npy"), ids[order])
+        np.save(os.path.join(self.path, "starts.npy"), np.asarray(self.starts, dtype=np.int64)[order])
+        np.save(os.path.join(self.path, "lengths.npy"), np.asarray(self.lengths, dtype=np.int64)[order])
+
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({
+                "codec": self.codec,
+                "fields": CONTENT_FIELDS,
+                "num_docs": len(ids),
+                "num_bytes": self.offset,
+            }, f, indent=2)
+
+        replace_dir(self.path, self.target)
@@ -0,0 +1,50 @@
+"""
+Build a store directory next to the live one and swap it into place
+
+Stores are memory-mapped by running API workers, so a rebuild must never
+write into the files they have open. Writers build into staging_dir(path)
+and call replace_dir when done: the old directory is renamed aside and
+deleted, and processes that still map its files keep reading the old
+inodes until they reopen the store.
+"""
+import os
+import shutil
+import tempfile
+
+
+def staging_dir(path):
+    """
+    Create an empty sibling directory of path to build its replacement in
+
+    Args:
+        path: Live store directory (need not exist yet)
+
+    Returns:
+        Path of the staging directory
+    """
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=os.path.basename(path) + ".tmp-", dir=parent)
+    os.chmod(staging, 0o755)  # mkdtemp is private to the building user
+    return staging
+
+
+def replace_dir(staging, path):
+    """
+    Move a fully written staging directory to path, deleting the old one
+
+    Between the two renames path does not exist, which readers treat like
+    a store that has not been built; the old files are never modified.
+    """
+    path = os.path.abspath(path)
+    retired = f"{path}.old-{os.getpid()}"
+    if os.path.exists(retired):
+        shutil.rmtree(retired)
+
+    if os.path.exists(path):
+        os.rename(path, retired)
+    os.rename(staging, path)
+
+    if os.path.exists(retired):
+        shutil.rmtree(retired)
@@ -0,0 +1,223 @@
+"""
+Local, read-only store of the corpus vectors for in-process dense search
+
+Layout of a store directory (written by indexing.build_vector_store):
+    vectors.npy       - (n, d) float32 unit vectors, one row per case
+    ids.npy           - int64 case id of each row
+    word_count.npy    - int32 word count of each row
+    dates.npy         - int32 decision date as YYYYMMDD (0 when unknown)
+    courts.npy        - int32 index into courts.json (-1 when unknown)
+    courts.json       - court names
+    meta.jsonl        - one JSON line per row with the fields a result needs
+    meta_offsets.npy  - int64 byte offset of each row's line in meta.jsonl
+    rerank_text.bin   - UTF-8 rerank_text of every row, back to back
+    rerank_text_offsets.npy - int64 (n + 1) byte offsets into rerank_text.bin
+    hnsw.bin          - hnswlib graph over vectors.npy (optional)
+    binary_codes.npy  - (n, d / 8) uint8 sign bits of the centered vectors
+    binary_mean.npy   - float32 mean subtracted before taking the signs
+    manifest.json     - encoder model, dim, projection and row count
+    stale.json        - written by indexing.incremental when the indices moved
+                        past the store (it is rebuilt, never patched)
+
+Everything except the hnswlib graph and the binary codes is memory-mapped,
+so every worker process shares one copy through the OS page cache.
+"""
+import os
+import re
+import json
+import mmap
+
+import numpy as np
+
+from indexing.corpus import date_key
+
+# Fields kept in meta.jsonl: what a search result needs. rerank_text is kept
+# apart and read only for a result page or rerank candidates
+HYDRATE_FIELDS = ["id", "name", "decision_date", "court_name", "jurisdiction_name", "word_count"]
+
+
+def mark_stale(path, reason):
+    """
+    Record that the store at path no longer matches the indices (a rebuild
+    replaces the directory and drops the mark)
+
+    Returns:
+        True if a store exists at path and was marked
+    """
+    if not os.path.isfile(os.path.join(path, "manifest.json")):
+        return False
+    with open(os.path.join(path, "stale.json"), "w") as f:
+        json.dump({"reason": reason}, f)
+    return True
+
+
+def map_file(path):
+    """
+    Open path and memory-map it read-only (empty files cannot be mapped)
+
+    Returns:
+        (file object, mmap or b"")
+    """
+    f = open(path, "rb")
+    if os.path.getsize(path) > 0:
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return f, b""
+
+
+def phrase_tokens(text):
+    """
+    Lowercased word tokens, roughly what the ES standard analyzer produces
+    """
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def contains_phrase(text, phrase):
+    """
+    True if the tokens of phrase occur consecutively in text (ES match_phrase)
+    """
+    tokens, wanted = phrase_tokens(text), phrase_tokens(phrase)
+    if not wanted:
+        return False
+    return any(tokens[start:start + len(wanted)] == wanted for start in range(len(tokens) - len(wanted) + 1))
+
+
+class VectorStore:
+    def __init__(self, path):
+        """
+        Open an existing vector store
+
+        Args:
+            path: Store directory written by indexing.build_vector_store
+        """
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(path, "courts.json"), "r", encoding="utf-8") as f:
+            self.courts = json.load(f)
+        self.stale = None
+        if os.path.isfile(os.path.join(path, "stale.json")):
+            with open(os.path.join(path, "stale.json"), "r") as f:
+                self.stale = json.load(f).get("reason")
+            print(f"Warning: vector store at {path} is stale ({self.stale}); dense results miss new "
+                  "cases and include deleted ones until python -m indexing.build_vector_store is rerun")
+
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.word_count = np.load(os.path.join(path, "word_count.npy"), mmap_mode="r")
+        self.dates = np.load(os.path.join(path, "dates.npy"), mmap_mode="r")
+        self.court_ids = np.load(os.path.join(path, "courts.npy"), mmap_mode="r")
+        self.meta_offsets = np.load(os.path.join(path, "meta_offsets.npy"), mmap_mode="r")
+        self.text_offsets = np.load(os.path.join(path, "rerank_text_offsets.npy"), mmap_mode="r")
+        self._id_order = None  # argsort of ids, built on first rows_for_ids call
+        self._sorted_ids = None
+        self._word_count_masks = {}  # min_word_count -> read-only row mask
+
+        # Small enough to hold in RAM (96 bytes per case at 768-d), scanned in full per query
+        self.binary_codes = None
+        self.binary_mean = None
+        if os.path.isfile(os.path.join(path, "binary_codes.npy")):
+            self.binary_codes = np.load(os.path.join(path, "binary_codes.npy"))
+            self.binary_mean = np.load(os.path.join(path, "binary_mean.npy"))
+
+        self._file, self._meta = map_file(os.path.join(path, "meta.jsonl"))
+        self._text_file, self._texts = map_file(os.path.join(path, "rerank_text.bin"))
+
+    @classmethod
+    def open_if_exists(cls, path):
+        """
+        Open the store at path, or return None if it has not been built
+        """
+        if not path or not os.path.isfile(os.path.join(path, "manifest.json")):
+            return None
+        return cls(path)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def word_count_mask(self, min_word_count):
+        """
+        Read-only mask of the rows with at least min_word_count words,
+        computed once per threshold (every dense query applies one)
+        """
+        if min_word_count not in self._word_count_masks:
+            mask = np.asarray(self.word_count) >= min_word_count
+            mask.flags.writeable = False
+            self._word_count_masks[min_word_count] = mask
+        return self._word_count_masks[min_word_count]
+
+    def filter_mask(self, min_word_count=None, court_name=None, start_date=None, end_date=None):
+        """
+        Boolean mask of the rows passing the filters, or None if there are none
+
+        With only min_word_count the shared word_count_mask is returned: do
+        not modify it.
+
+        Raises:
+            ValueError: if a date is malformed
+        """
+        mask = None
+
+        def both(current, condition):
+            return condition if current is None else current & condition
+
+        if min_word_count:
+            mask = self.word_count_mask(min_word_count)
+        if court_name:
+            # Same as the ES match_phrase on court_name: every court whose
+            # name contains the phrase ("Superior Court" matches one court,
+            # "Court" all of them)
+            codes = [code for code, name in enumerate(self.courts) if contains_phrase(name, court_name)]
+            mask = both(mask, np.isin(np.asarray(self.court_ids), codes))
+        if start_date:
+            mask = both(mask, np.asarray(self.dates) >= date_key(start_date))
+        if end_date:
+            dates = np.asarray(self.dates)
+            mask = both(mask, (dates <= date_key(end_date, end=True)) & (dates > 0))
+        return mask
+
+    def hydrate(self, rows, with_rerank_text=False):
+        """
+        Result metadata of the given rows, in order
+        """
+        docs = []
+        for row in rows:
+            start = int(self.meta_offsets[row])
+            end = self._meta.find(b"\n", start)
+            docs.append(json.loads(self._meta[start:end if end >= 0 else None]))
+        if with_rerank_text:
+            for doc, text in zip(docs, self.rerank_texts(rows)):
+                doc["rerank_text"] = text
+        return docs
+
+    def rerank_texts(self, rows):
+        """
+        rerank_text of the given rows, in order ("" for row -1, see rows_for_ids)
+        """
+        return [
+            self._texts[int(self.text_offsets[row]):int(self.text_offsets[row + 1])].decode("utf-8")
+            if row >= 0 else ""
+            for row in rows
+        ]
+
+    def rows_for_ids(self, case_ids):
+        """
+        Row of each case id, or -1 for ids not in the store
+        """
+        if self._id_order is None:
+            self._id_order = np.argsort(self.ids, kind="stable")
+            self._sorted_ids = np.asarray(self.ids)[self._id_order]
+        keys = np.asarray([int(case_id) for case_id in case_ids], dtype=np.int64)
+        if len(self._sorted_ids) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._sorted_ids, keys), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[pos] == keys, self._id_order[pos], -1)
+
+    def close(self):
+        for data, f in ((self._meta, self._file), (self._texts, self._text_file)):
+            if isinstance(data, mmap.mmap):
+                data.close()
+            f.close()
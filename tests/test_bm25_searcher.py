@@ -0,0 +1,38 @@
+import base64
+
+import pytest
+
+from search.bm25_searcher import query_fingerprint, encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    fingerprint = query_fingerprint("murder", court_name="Supreme Court of Pennsylvania", start_date="1900")
+    sort_values = [12.5, 4711]
+    cursor = encode_cursor("pit-id==", sort_values, fingerprint)
+
+    assert decode_cursor(cursor, fingerprint) == ("pit-id==", sort_values)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor("a/b+c" * 20, [1.0, 2], query_fingerprint("q"))
+    assert "/" not in cursor and "+" not in cursor
+
+
+def test_cursor_from_another_query_is_rejected():
+    cursor = encode_cursor("pit", [1.0, 2], query_fingerprint("murder"))
+
+    with pytest.raises(ValueError, match="does not belong"):
+        decode_cursor(cursor, query_fingerprint("contract"))
+    with pytest.raises(ValueError, match="does not belong"):
+        decode_cursor(cursor, query_fingerprint("murder", end_date="1950"))
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64 at all!",
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    base64.urlsafe_b64encode(b'{"pit": "x"}').decode(),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="invalid cursor"):
+        decode_cursor(cursor, query_fingerprint("murder"))
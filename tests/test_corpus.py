@@ -0,0 +1,40 @@
+import pytest
+
+from indexing.corpus import date_bound, date_key
+
+
+def test_date_bound_full_date_is_unchanged():
+    assert date_bound("1850-03-15") == "1850-03-15"
+    assert date_bound("1850-03-15", end=True) == "1850-03-15"
+
+
+def test_date_bound_month_starts_and_ends_the_month():
+    assert date_bound("1850-04") == "1850-04-01"
+    assert date_bound("1850-04", end=True) == "1850-04-30"
+    assert date_bound("1850-12", end=True) == "1850-12-31"
+
+
+def test_date_bound_february_end_follows_leap_years():
+    assert date_bound("1900-02", end=True) == "1900-02-28"
+    assert date_bound("2000-02", end=True) == "2000-02-29"
+    assert date_bound("1852-02", end=True) == "1852-02-29"
+
+
+def test_date_bound_year_starts_and_ends_the_year():
+    assert date_bound("1791") == "1791-01-01"
+    assert date_bound("1791", end=True) == "1791-12-31"
+
+
+def test_date_bound_empty_is_none():
+    assert date_bound(None) is None
+    assert date_bound("", end=True) is None
+
+
+def test_date_bound_rejects_malformed_dates():
+    with pytest.raises(ValueError):
+        date_bound("not a date")
+
+
+def test_date_key_is_an_integer_of_the_bound():
+    assert date_key("1850-04", end=True) == 18500430
+    assert date_key(None) is None
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from search.local_dense import to_words, hamming_distances
+
+
+def brute_force(codes, query_code):
+    bits = np.unpackbits(codes, axis=1)
+    query_bits = np.unpackbits(query_code[None, :], axis=1)
+    return (bits != query_bits).sum(axis=1)
+
+
+@pytest.mark.parametrize("code_bytes", [1, 8, 12, 96])
+def test_hamming_distances_match_brute_force(code_bytes):
+    rng = np.random.default_rng(code_bytes)
+    codes = rng.integers(0, 256, size=(257, code_bytes), dtype=np.uint8)
+    query_code = rng.integers(0, 256, size=code_bytes, dtype=np.uint8)
+
+    distances = hamming_distances(to_words(codes), to_words(query_code))
+
+    assert distances.dtype == np.uint16
+    assert distances.tolist() == brute_force(codes, query_code).tolist()
+
+
+def test_hamming_distance_extremes():
+    codes = np.array([[0x00] * 16, [0xFF] * 16], dtype=np.uint8)
+    query_code = np.zeros(16, dtype=np.uint8)
+
+    assert hamming_distances(to_words(codes), to_words(query_code)).tolist() == [0, 128]
@@ -0,0 +1,57 @@
+import pytest
+from flask import Flask
+
+from api.routes import register_routes
+from config import BATCH_MAX_QUERIES
+
+
+def unused():
+    raise AssertionError("validation must fail before any searcher is needed")
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    register_routes(app, None, unused, unused, unused, unused)
+    return app.test_client()
+
+
+@pytest.mark.parametrize("body", [
+    None,
+    [],
+    {},
+    {"queries": "murder"},
+    {"queries": {"query": "murder"}},
+])
+def test_batch_requires_a_queries_list(client, body):
+    response = client.post("/cases/batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "queries field is required in request body"
+
+
+def test_batch_rejects_non_json(client):
+    response = client.post("/cases/batch", data="queries", content_type="text/plain")
+    assert response.status_code == 400
+
+
+def test_batch_limits_the_number_of_queries(client):
+    queries = [{"query": "murder"}] * (BATCH_MAX_QUERIES + 1)
+    response = client.post("/cases/batch", json={"queries": queries})
+    assert response.status_code == 400
+    assert str(BATCH_MAX_QUERIES) in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("entry, message", [
+    ("murder", "every query must be an object"),
+    ({"query": ["murder"]}, "must be strings"),
+    ({"query": "murder", "court": 5}, "must be strings"),
+    ({"query": "murder", "size": "ten"}, "size and page must be integers"),
+    ({"query": "murder", "page": None}, "size and page must be integers"),
+    ({"query": "   "}, "every query needs a query field"),
+    ({"method": "bm25"}, "every query needs a query field"),
+    ({"query": "murder", "method": "tfidf"}, "method must be"),
+])
+def test_batch_rejects_malformed_entries(client, entry, message):
+    response = client.post("/cases/batch", json={"queries": [{"query": "contract"}, entry]})
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
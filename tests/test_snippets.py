@@ -0,0 +1,41 @@
+from search.snippets import SnippetGenerator
+
+
+def test_generate_without_texts():
+    assert SnippetGenerator().generate("contract", []) == []
+
+
+def test_generate_empty_texts_give_none():
+    assert SnippetGenerator().generate("contract", ["", None, "  ,; "]) == [None, None, None]
+
+
+def test_generate_short_text_is_returned_whole():
+    snippets = SnippetGenerator(window_words=30).generate("contract", ["A contract was formed."])
+    assert snippets == ["A <mark>contract</mark> was formed."]
+
+
+def test_generate_short_text_without_matches():
+    snippets = SnippetGenerator(window_words=30).generate("burglary", ["A contract was formed."])
+    assert snippets == ["A contract was formed."]
+
+
+def test_generate_keeps_one_snippet_per_text():
+    texts = ["", "Offer and acceptance.", None, "The contracts were void."]
+    snippets = SnippetGenerator(window_words=30).generate("contract", texts)
+
+    assert snippets[0] is None and snippets[2] is None
+    assert snippets[1] == "Offer and acceptance."
+    assert snippets[3] == "The <mark>contracts</mark> were void."
+
+
+def test_generate_escapes_html():
+    snippets = SnippetGenerator().generate("contract", ["The <b>contract</b> & terms"])
+    assert snippets == ["The &lt;b&gt;<mark>contract</mark>&lt;/b&gt; &amp; terms"]
+
+
+def test_generate_marks_cut_text():
+    text = " ".join(f"word{i}" for i in range(20)) + " contract " + " ".join(f"word{i}" for i in range(20))
+    snippet = SnippetGenerator(window_words=8).generate("contract", [text])[0]
+
+    assert snippet.startswith("… ") and snippet.endswith(" …")
+    assert "<mark>contract</mark>" in snippet
@@ -0,0 +1,51 @@
+from api.text_ranges import char_range, paragraph_range, PARAGRAPH_SNAP_CHARS
+
+TEXT = "first paragraph\nsecond paragraph\nthird\n"
+
+
+def test_char_range_covering_the_text():
+    assert char_range(TEXT, 0, 1000) == (0, len(TEXT))
+
+
+def test_char_range_clamps_start():
+    assert char_range(TEXT, -5, 3)[0] == 0
+    assert char_range(TEXT, 1000, 10) == (len(TEXT), len(TEXT))
+
+
+def test_char_range_negative_length_is_empty_or_snapped():
+    start, end = char_range(TEXT, 5, -10)
+    assert start == 5 and start <= end <= len(TEXT)
+
+
+def test_char_range_snaps_forward_to_a_paragraph_break():
+    assert char_range(TEXT, 0, 5) == (0, TEXT.index("\n") + 1)
+
+
+def test_char_range_snaps_back_without_a_break_ahead():
+    text = "a" * 10 + "\n" + "b" * (PARAGRAPH_SNAP_CHARS + 100)
+    assert char_range(text, 0, 20) == (0, 11)
+
+
+def test_char_range_without_breaks_cuts_at_length():
+    text = "x" * (PARAGRAPH_SNAP_CHARS * 3)
+    assert char_range(text, 100, 50) == (100, 150)
+
+
+def test_paragraph_range_counts_paragraphs():
+    start, end, total = paragraph_range(TEXT, 1, 1)
+    assert total == 3
+    assert TEXT[start:end] == "second paragraph\n"
+
+
+def test_paragraph_range_past_the_end_is_empty():
+    assert paragraph_range(TEXT, 10, 5) == (len(TEXT), len(TEXT), 3)
+
+
+def test_paragraph_range_clamps_first_and_count():
+    assert paragraph_range(TEXT, -3, 100) == (0, len(TEXT), 3)
+    start, end, _ = paragraph_range(TEXT, 0, -1)
+    assert start == end == 0
+
+
+def test_paragraph_range_of_empty_text():
+    assert paragraph_range("", 0, 5) == (0, 0, 1)
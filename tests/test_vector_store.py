@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pytest
+
+from config import DENSE_INDEX_DIM
+from indexing.build_vector_store import build_vector_store
+from storage.vector_store import VectorStore
+
+CASES = [
+    {"id": "30", "name": "C", "decision_date": "1900-01-02", "court_name": "Superior Court", "word_count": 300},
+    {"id": "10", "name": "A", "decision_date": "1850", "court_name": "Supreme Court", "word_count": 100},
+    {"id": "20", "name": "B", "decision_date": None, "court_name": None, "word_count": 200},
+]
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    shards = tmp_path_factory.mktemp("embeddings")
+    rng = np.random.default_rng(0)
+    np.save(shards / "pa__1.npy", rng.standard_normal((len(CASES), DENSE_INDEX_DIM)).astype(np.float32))
+    with open(shards / "pa__1.meta.jsonl", "w") as f:
+        for case in CASES:
+            f.write(json.dumps(dict(case, rerank_text=f"text of {case['name']}")) + "\n")
+    with open(shards / "manifest.json", "w") as f:
+        json.dump({"model": "test", "dim": DENSE_INDEX_DIM, "dtype": "float32", "num_vectors": len(CASES),
+                   "shards": [{"name": "pa__1", "num_vectors": len(CASES)}]}, f)
+
+    output = tmp_path_factory.mktemp("store") / "vector_store"
+    build_vector_store(str(shards), str(output))
+    store = VectorStore(str(output))
+    yield store
+    store.close()
+
+
+def test_rows_for_ids_finds_every_stored_id(store):
+    assert store.rows_for_ids(["10", "20", "30"]).tolist() == [1, 2, 0]
+
+
+def test_rows_for_ids_marks_missing_ids(store):
+    assert store.rows_for_ids(["10", "99", 0, "30", "15"]).tolist() == [1, -1, -1, 0, -1]
+
+
+def test_rows_for_ids_beyond_the_largest_id(store):
+    assert store.rows_for_ids([10 ** 12]).tolist() == [-1]
+
+
+def test_rows_for_ids_of_nothing(store):
+    assert store.rows_for_ids([]).tolist() == []
+
+
+def test_missing_rows_have_no_rerank_text(store):
+    rows = store.rows_for_ids(["20", "99"])
+    assert store.rerank_texts(rows) == ["text of B", ""]